@@ -9,10 +9,18 @@ from llama_index.core.tools import FunctionTool, QueryEngineTool, ToolMetadata
 from llama_index.experimental.query_engine import PandasQueryEngine
 from llama_index.llms.groq import Groq
 from llama_index.core.agent import FunctionAgent
+import app_logging
 import dashboard_generator
+import facts_pack
+import prompt_budget
+import tracing
 import pandas as pd
 
 
+# Instruction following the facts pack in the dashboard prompt
+DASHBOARD_FACTS_USAGE = "Use numeric columns for KPIs and charts, categorical columns for groups."
+
+
 class DashboardAgent:
     """
     Specialized agent for generating interactive HTML dashboards.
@@ -27,7 +35,7 @@ class DashboardAgent:
         self.pandas_query_engine = PandasQueryEngine(
             df=self.df,
             llm=self.llm,
-            verbose=True,
+            verbose=app_logging.QUERY_ENGINE_VERBOSE,
             synthesize_response=True
         )
         data_tool = QueryEngineTool(
@@ -72,11 +80,11 @@ class DashboardAgent:
             config = f'{{"title": "{title}", "preferred_charts": "{chart_types}"}}'
             return dashboard_generator.create_dashboard_from_data(self.df, config)
         
-        tools = [
+        tools = tracing.traced_tools([
             data_tool,
             FunctionTool.from_defaults(fn=create_interactive_dashboard, name="create_interactive_dashboard"),
             FunctionTool.from_defaults(fn=create_custom_dashboard, name="create_custom_dashboard"),
-        ]
+        ])
         
         self.agent = FunctionAgent(
             tools=tools,
@@ -136,13 +144,7 @@ You help users create beautiful, interactive HTML dashboards like Power BI or Ta
     
     async def run(self, query: str) -> str:
         """Execute the dashboard generation task with user query context."""
-        # Get data summary to include in prompt
-        data_info = {
-            "columns": list(self.df.columns),
-            "row_count": len(self.df),
-            "numeric_cols": list(self.df.select_dtypes(include=['number']).columns),
-            "categorical_cols": list(self.df.select_dtypes(include=['object']).columns),
-        }
+        data_section, facts_tokens = facts_pack.prompt_section(self.df, query, DASHBOARD_FACTS_USAGE)
         
         # Augment system prompt with data context and user request
         context_prompt = f"""
@@ -150,11 +152,7 @@ You help users create beautiful, interactive HTML dashboards like Power BI or Ta
 
 === DATA IS ALREADY LOADED - GENERATE DASHBOARD NOW ===
 
-The user has uploaded data with:
-- Columns: {', '.join(data_info['columns'])}
-- Total Rows: {data_info['row_count']}
-- Numeric Columns (for KPIs/charts): {', '.join(data_info['numeric_cols']) or 'None'}
-- Categorical Columns (for groups): {', '.join(data_info['categorical_cols']) or 'None'}
+{data_section}
 
 IMPORTANT: Data is already loaded! DO NOT ask the user to upload data.
 You MUST analyze this data and generate the dashboard immediately.
@@ -170,6 +168,8 @@ You MUST analyze this data and generate the dashboard immediately.
 
 DO NOT ask any questions. GENERATE THE DASHBOARD NOW.
 """
+        prompt_budget.log_prompt_size("Dashboard agent", context_prompt, facts_tokens)
+
         # Create a new agent instance with augmented prompt for this request
         from llama_index.core.agent import FunctionAgent
         augmented_agent = FunctionAgent(
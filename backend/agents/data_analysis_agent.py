@@ -9,7 +9,11 @@ from llama_index.core.tools import FunctionTool, QueryEngineTool, ToolMetadata
 from llama_index.experimental.query_engine import PandasQueryEngine
 from llama_index.llms.groq import Groq
 from llama_index.core.agent import FunctionAgent
+import app_logging
 import dynamic_visualization
+import facts_pack
+import prompt_budget
+import tracing
 import pandas as pd
 
 
@@ -27,7 +31,7 @@ class DataAnalysisGraphAgent:
         self.pandas_query_engine = PandasQueryEngine(
             df=self.df,
             llm=self.llm,
-            verbose=True,
+            verbose=app_logging.QUERY_ENGINE_VERBOSE,
             synthesize_response=True
         )
         data_tool = QueryEngineTool(
@@ -79,7 +83,7 @@ class DataAnalysisGraphAgent:
             """Create a scatter plot showing correlation between two variables."""
             return dynamic_visualization.create_scatter_chart(self.df, x_column, y_column, title)
         
-        tools = [
+        tools = tracing.traced_tools([
             data_tool,
             FunctionTool.from_defaults(fn=generate_custom_chart, name="generate_custom_chart"),
             FunctionTool.from_defaults(fn=create_bar_chart, name="create_bar_chart"),
@@ -87,7 +91,7 @@ class DataAnalysisGraphAgent:
             FunctionTool.from_defaults(fn=create_pie_chart, name="create_pie_chart"),
             FunctionTool.from_defaults(fn=create_histogram, name="create_histogram"),
             FunctionTool.from_defaults(fn=create_scatter_plot, name="create_scatter_plot"),
-        ]
+        ])
         
         self.agent = FunctionAgent(
             tools=tools,
@@ -150,14 +154,7 @@ You help users analyze data and create beautiful, informative charts.
     
     async def run(self, query: str) -> str:
         """Execute the data analysis or graph generation task with user query context."""
-        # Get data summary to include in prompt
-        data_info = {
-            "columns": list(self.df.columns),
-            "row_count": len(self.df),
-            "numeric_cols": list(self.df.select_dtypes(include=['number']).columns),
-            "categorical_cols": list(self.df.select_dtypes(include=['object']).columns),
-            "sample": self.df.head(3).to_dict()
-        }
+        data_section, facts_tokens = facts_pack.prompt_section(self.df, query)
         
         # Augment system prompt with data context and user request
         context_prompt = f"""
@@ -165,12 +162,7 @@ You help users analyze data and create beautiful, informative charts.
 
 === DATA IS ALREADY LOADED - ANALYZE NOW ===
 
-The user has uploaded data with:
-- Columns: {', '.join(data_info['columns'])}
-- Total Rows: {data_info['row_count']}
-- Numeric Columns: {', '.join(data_info['numeric_cols']) or 'None'}
-- Categorical Columns: {', '.join(data_info['categorical_cols']) or 'None'}
-- Sample Data: {data_info['sample']}
+{data_section}
 
 IMPORTANT: Data is already loaded! DO NOT ask the user to share data.
 You MUST analyze this data and create visualizations immediately.
@@ -179,12 +171,14 @@ You MUST analyze this data and create visualizations immediately.
 "{query}"
 
 === YOUR IMMEDIATE ACTIONS ===
-1. Use data_analysis_tool to get statistics and insights about the data
+1. Use data_analysis_tool for any statistics and insights not already in the facts above
 2. Create 2-4 visualizations using chart functions (bar, line, pie, histogram, scatter)
 3. Provide key findings and insights
 
 DO NOT ask any questions. ANALYZE THE DATA NOW and create charts!
 """
+        prompt_budget.log_prompt_size("Data analysis agent", context_prompt, facts_tokens)
+
         # Create a new agent instance with augmented prompt for this request
         from llama_index.core.agent import FunctionAgent
         augmented_agent = FunctionAgent(
@@ -10,9 +10,14 @@ from llama_index.experimental.query_engine import PandasQueryEngine
 from llama_index.core import Settings
 from llama_index.llms.groq import Groq
 from llama_index.core.agent import FunctionAgent
+import app_logging
 import report_generator
+import report_schema
+from report_schema import ReportPayload
 import dynamic_visualization
-from typing import List
+import facts_pack
+import prompt_budget
+import tracing
 import pandas as pd
 
 
@@ -30,7 +35,7 @@ class PDFReportAgent:
         self.pandas_query_engine = PandasQueryEngine(
             df=self.df,
             llm=self.llm,
-            verbose=True,
+            verbose=app_logging.QUERY_ENGINE_VERBOSE,
             synthesize_response=True
         )
         data_tool = QueryEngineTool(
@@ -51,29 +56,37 @@ class PDFReportAgent:
             """
             return dynamic_visualization.execute_plot_code(self.df, code)
         
-        # PDF Generation Tool
-        def generate_pdf_report(summary_text: str, image_filenames: List[str]) -> str:
+        # Batch Visualization Tool - all report charts in one call
+        generate_report_charts = dynamic_visualization.chart_batch_tool(self.df, "the PDF report", "generate_report_chart")
+        
+        # PDF Generation Tool - one structured, validated payload
+        def generate_pdf_report(report: ReportPayload) -> str:
             """
-            Generate a professional PDF report with the provided summary and images.
+            Generate a professional PDF report from a structured report payload.
             
             Args:
-                summary_text: Comprehensive report content with sections like:
-                    - Executive Summary
-                    - Data Overview
-                    - Key Findings
-                    - Recommendations
-                image_filenames: List of image file paths to include in the report
+                report: The full report content:
+                    - title, optional subtitle
+                    - executive_summary: 2-3 paragraphs
+                    - kpis: headline metrics [{label, value, change}]
+                    - sections: [{title, paragraphs, bullets, figures: [{path, caption}]}]
+                      using image paths returned by the chart tools
+                    - key_findings, recommendations: lists of short sentences
             
             Returns:
-                Path to the generated PDF file
+                Path to the generated PDF file, or a list of fields to fix
             """
-            return report_generator.create_pdf_report(summary_text, image_filenames)
+            payload, error = report_schema.validate_report(report)
+            if error:
+                return error
+            return report_generator.create_pdf_report(payload)
         
-        tools = [
+        tools = tracing.traced_tools([
             data_tool,
             FunctionTool.from_defaults(fn=generate_report_chart, name="generate_report_chart"),
+            FunctionTool.from_defaults(fn=generate_report_charts, name="generate_report_charts"),
             FunctionTool.from_defaults(fn=generate_pdf_report, name="generate_pdf_report"),
-        ]
+        ])
         
         self.agent = FunctionAgent(
             tools=tools,
@@ -86,7 +99,7 @@ When user has uploaded data and mentions PDF/report:
 1. IMMEDIATELY ANALYZE the data - do not ask questions
 2. GENERATE charts with descriptive names
 3. CREATE the PDF report with all sections
-4. Use generate_pdf_report tool
+4. Use generate_pdf_report ONCE with the complete structured report
 
 **CONVERSATION MODE** only for vague requests like "help me with a Report Generation"
 - Ask what metrics matter most
@@ -112,13 +125,16 @@ For each chart, use DESCRIPTIVE NAMES:
 - GOOD: "monthly_revenue_trend_line.png"
 - GOOD: "product_category_distribution_pie.png"
 
+Create ALL charts with ONE generate_report_charts call (list of chart specs).
+Only fall back to generate_report_chart for a chart the specs cannot express.
+
 Create 3-5 charts covering:
 - Distribution/breakdown charts (pie, bar)
 - Trend analysis (line charts if time data exists)
 - Comparison charts (grouped bar)
 - Top/Bottom performers
 
-**STEP 3: WRITE CONTENT**
+**STEP 3: WRITE CONTENT** (fill the generate_pdf_report fields)
 Before writing, mentally review for:
 - Spelling correctness
 - Grammar accuracy  
@@ -152,8 +168,9 @@ STRUCTURE:
 **STEP 4: INTEGRATE CHARTS**
 Each chart must have:
 - Descriptive title matching its content
-- Brief description explaining insights
-- Proper placement in relevant section
+- Brief description explaining insights (the figure caption)
+- Proper placement: list it under "figures" of the section it supports,
+  using the exact image path returned by the chart tool
 
 === WRITING QUALITY ===
 - Use professional business language
@@ -182,12 +199,7 @@ Examples:
     
     async def run(self, query: str) -> str:
         """Execute the PDF report generation task with user query context."""
-        # Get data summary to include in prompt
-        data_info = {
-            "columns": list(self.df.columns),
-            "row_count": len(self.df),
-            "sample": self.df.head(3).to_dict()
-        }
+        data_section, facts_tokens = facts_pack.prompt_section(self.df, query)
         
         # Augment system prompt with data context and user request
         context_prompt = f"""
@@ -195,10 +207,7 @@ Examples:
 
 === DATA IS ALREADY LOADED - GENERATE REPORT NOW ===
 
-The user has uploaded data with:
-- Columns: {', '.join(data_info['columns'])}
-- Total Rows: {data_info['row_count']}
-- Sample Data: {data_info['sample']}
+{data_section}
 
 IMPORTANT: Data is already loaded! DO NOT ask the user to upload data.
 You MUST analyze this data and generate the PDF report immediately.
@@ -207,12 +216,16 @@ You MUST analyze this data and generate the PDF report immediately.
 "{query}"
 
 === YOUR IMMEDIATE ACTIONS ===
-1. Use data_analysis_tool to get statistics and insights
-2. Use generate_report_chart to create 3-5 visualizations with descriptive titles
-3. Use generate_pdf_report to create the final PDF with all content and charts
+1. Use data_analysis_tool for any statistics and insights not already in the facts above
+2. Use generate_report_charts ONCE to create 3-5 visualizations with descriptive titles
+3. Use generate_pdf_report once with title, executive_summary, kpis, sections
+   (paragraphs, bullets, figures), key_findings and recommendations.
+   If it returns fields to fix, correct only those fields and call it again.
 
 DO NOT ask any questions. GENERATE THE REPORT NOW.
 """
+        prompt_budget.log_prompt_size("PDF agent", context_prompt, facts_tokens)
+
         # Create a new agent instance with augmented prompt for this request
         from llama_index.core.agent import FunctionAgent
         augmented_agent = FunctionAgent(
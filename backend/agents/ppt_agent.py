@@ -9,12 +9,25 @@ from llama_index.core.tools import FunctionTool, QueryEngineTool, ToolMetadata
 from llama_index.experimental.query_engine import PandasQueryEngine
 from llama_index.llms.groq import Groq
 from llama_index.core.agent import FunctionAgent
+import app_logging
 import report_generator
+import report_schema
+from report_schema import ReportPayload
 import dynamic_visualization
-from typing import List
+import facts_pack
+import prompt_budget
+import tracing
 import pandas as pd
 
 
+# Instruction following the facts pack when a deck is built from data
+DATA_PPT_USAGE = """You can use this data to create data-driven presentations if relevant.
+For data-driven slides, create ALL charts with ONE generate_slide_charts call,
+then call generate_data_ppt ONCE with a structured report: title, executive_summary,
+kpis, sections (short paragraphs, bullets, figures with the returned image paths),
+key_findings and recommendations. If it returns fields to fix, correct only those."""
+
+
 class PPTAgent:
     """
     Specialized agent for generating PowerPoint presentations.
@@ -29,7 +42,7 @@ class PPTAgent:
         self.pandas_query_engine = PandasQueryEngine(
             df=self.df,
             llm=self.llm,
-            verbose=True,
+            verbose=app_logging.QUERY_ENGINE_VERBOSE,
             synthesize_response=True
         )
         data_tool = QueryEngineTool(
@@ -50,19 +63,30 @@ class PPTAgent:
             """
             return dynamic_visualization.execute_plot_code(self.df, code)
         
-        # Data-driven PPT Generation
-        def generate_data_ppt(summary_text: str, image_filenames: List[str]) -> str:
+        # Batch chart generation - all slide charts in one call
+        generate_slide_charts = dynamic_visualization.chart_batch_tool(self.df, "the slides", "generate_slide_chart", example="px.pie")
+        
+        # Data-driven PPT Generation - one structured, validated payload
+        def generate_data_ppt(report: ReportPayload) -> str:
             """
             Generate a PowerPoint presentation from data analysis with charts.
             
             Args:
-                summary_text: Content for slides organized as clear sections
-                image_filenames: List of chart/image paths to include
+                report: The full deck content:
+                    - title, optional subtitle
+                    - executive_summary: short overview
+                    - kpis: headline metrics [{label, value, change}]
+                    - sections: [{title, paragraphs, bullets, figures: [{path, caption}]}]
+                      using image paths returned by the chart tools
+                    - key_findings, recommendations: lists of short sentences
             
             Returns:
-                Path to the generated PPTX file
+                Path to the generated PPTX file, or a list of fields to fix
             """
-            return report_generator.create_ppt_report(summary_text, image_filenames)
+            payload, error = report_schema.validate_report(report)
+            if error:
+                return error
+            return report_generator.create_ppt_report(payload)
         
         # Text-based PPT Generation (no data required)
         def generate_text_ppt(content: str, title: str = "Presentation") -> str:
@@ -79,12 +103,13 @@ class PPTAgent:
             """
             return report_generator.create_ppt_report(content, [], None, title)
         
-        tools = [
+        tools = tracing.traced_tools([
             data_tool,
             FunctionTool.from_defaults(fn=generate_slide_chart, name="generate_slide_chart"),
+            FunctionTool.from_defaults(fn=generate_slide_charts, name="generate_slide_charts"),
             FunctionTool.from_defaults(fn=generate_data_ppt, name="generate_data_ppt"),
             FunctionTool.from_defaults(fn=generate_text_ppt, name="generate_text_ppt"),
-        ]
+        ])
         
         self.agent = FunctionAgent(
             tools=tools,
@@ -199,24 +224,16 @@ Slides:
     
     async def run(self, query: str) -> str:
         """Execute the PPT generation task with user query context."""
-        # Get data summary to include in prompt
-        data_info = {
-            "columns": list(self.df.columns),
-            "row_count": len(self.df),
-        }
-        
         # Check if we have real data or empty placeholder
         has_real_data = len(self.df) > 1 or 'info' not in self.df.columns
         
         # Augment system prompt with data context and user request
+        facts_tokens = 0
         if has_real_data:
+            data_section, facts_tokens = facts_pack.prompt_section(self.df, query, DATA_PPT_USAGE)
             data_context = f"""
 === DATA IS ALREADY LOADED ===
-The user has uploaded data with:
-- Columns: {', '.join(data_info['columns'])}
-- Total Rows: {data_info['row_count']}
-
-You can use this data to create data-driven presentations if relevant.
+{data_section}
 """
         else:
             data_context = """
@@ -237,6 +254,8 @@ Analyze the user's content and IMMEDIATELY create the PowerPoint presentation.
 Use generate_text_ppt(content, title) with properly formatted content.
 DO NOT ask questions - generate the PPT now.
 """
+        prompt_budget.log_prompt_size("PPT agent", context_prompt, facts_tokens)
+
         # Create a new agent instance with augmented prompt for this request
         from llama_index.core.agent import FunctionAgent
         augmented_agent = FunctionAgent(
@@ -5,20 +5,31 @@ With conversation history and query caching for consistent responses
 import os
 import asyncio
 import hashlib
+import time
+import uuid
+import logging
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 from llama_index.core import Settings
-from llama_index.llms.groq import Groq
 import pandas as pd
 from typing import Dict, List, Tuple, Optional
 
 # Import router and specialized agents
 from agent_router import AgentRouter, AgentType
+from fast_path import FastPath
+import app_logging
+import llm_client
+import metrics
+import rate_limiter
+import request_context
+import tracing
 from agents.pdf_agent import PDFReportAgent
 from agents.ppt_agent import PPTAgent
 from agents.dashboard_agent import DashboardAgent
 from agents.data_analysis_agent import DataAnalysisGraphAgent
 
+logger = app_logging.get_logger(__name__)
+
 # Thread pool for CPU-bound tasks
 executor = ThreadPoolExecutor(max_workers=4)
 
@@ -30,6 +41,9 @@ class ConversationHistory:
         self.history: List[Dict] = []  # List of {query, response, timestamp, agent_type}
         self.cache: Dict[str, Dict] = {}  # hash -> {response, timestamp, agent_type}
         self.max_history = max_history
+        # Changes not yet written to the state backend (see merged)
+        self.unsaved: List[Dict] = []
+        self.cleared = False
     
     def _hash_query(self, query: str) -> str:
         """Create a normalized hash of the query for caching."""
@@ -42,9 +56,11 @@ class ConversationHistory:
         query_hash = self._hash_query(query)
         if query_hash in self.cache:
             cached = self.cache[query_hash]
-            print(f"DEBUG: Cache HIT for query hash {query_hash[:8]}...")
+            logger.debug("Cache HIT for query hash %s", query_hash[:8], extra=app_logging.SAMPLED)
+            metrics.conversation_cache_lookups.inc(result="hit")
             return cached
-        print(f"DEBUG: Cache MISS for query hash {query_hash[:8]}...")
+        logger.debug("Cache MISS for query hash %s", query_hash[:8], extra=app_logging.SAMPLED)
+        metrics.conversation_cache_lookups.inc(result="miss")
         return None
     
     def add_to_history(self, query: str, response: str, agent_type: str) -> None:
@@ -59,19 +75,25 @@ class ConversationHistory:
             "agent_type": agent_type
         }
         self.history.append(entry)
+        self.unsaved.append(entry)
         
         # Trim history if too long
         if len(self.history) > self.max_history:
             self.history = self.history[-self.max_history:]
         
         # Add to cache
-        query_hash = self._hash_query(query)
-        self.cache[query_hash] = {
-            "response": response,
-            "timestamp": timestamp,
-            "agent_type": agent_type
+        query_hash = self._cache_entry(entry)
+        logger.debug("Added to cache with hash %s", query_hash[:8], extra=app_logging.SAMPLED)
+    
+    def _cache_entry(self, entry: Dict, cache: Optional[Dict] = None) -> str:
+        """Cache a history entry's response under its query hash; returns the hash."""
+        query_hash = self._hash_query(entry["query"])
+        (self.cache if cache is None else cache)[query_hash] = {
+            "response": entry["response"],
+            "timestamp": entry["timestamp"],
+            "agent_type": entry["agent_type"]
         }
-        print(f"DEBUG: Added to cache with hash {query_hash[:8]}...")
+        return query_hash
     
     def get_recent_context(self, n: int = 5) -> str:
         """Get recent conversation context for the agent."""
@@ -89,13 +111,45 @@ class ConversationHistory:
     def clear_cache(self) -> None:
         """Clear the query cache (but keep history)."""
         self.cache.clear()
-        print("DEBUG: Cache cleared")
+        logger.debug("Cache cleared")
     
     def clear_all(self) -> None:
         """Clear both history and cache."""
         self.history.clear()
         self.cache.clear()
-        print("DEBUG: History and cache cleared")
+        self.unsaved.clear()
+        self.cleared = True
+        logger.info("History and cache cleared")
+    
+    def to_dict(self) -> Dict:
+        """JSON-serializable history and cache, for the shared state backend."""
+        return {"history": self.history, "cache": self.cache}
+    
+    def merged(self, state: Optional[Dict]) -> Dict:
+        """
+        A stored to_dict() snapshot with this copy's unsaved changes applied.
+        
+        Turns added here since the last save are appended after the stored
+        ones, so turns another request saved in the meantime are kept.
+        """
+        state = {} if self.cleared else (state or {})
+        history = list(state.get("history", [])) + self.unsaved
+        cache = dict(state.get("cache", {}))
+        for entry in self.unsaved:
+            self._cache_entry(entry, cache)
+        return {"history": history[-self.max_history:], "cache": cache}
+    
+    def load(self, state: Optional[Dict]) -> None:
+        """Refresh from a to_dict() snapshot (None is empty), keeping unsaved changes."""
+        state = self.merged(state)
+        self.history = state["history"]
+        self.cache = state["cache"]
+    
+    def mark_saved(self, state: Dict) -> None:
+        """Adopt the snapshot that was just stored; nothing is unsaved afterwards."""
+        self.unsaved = []
+        self.cleared = False
+        self.load(state)
     
     def get_stats(self) -> Dict:
         """Get statistics about the history and cache."""
@@ -114,6 +168,7 @@ class AnalysisAgent:
     - Smart routing based on keywords
     - Conversation history tracking
     - Query caching for repeated questions (same question = same answer)
+    - Direct answers for simple aggregation questions (no LLM calls)
     - Lazy agent initialization
     
     Available specialized agents:
@@ -123,18 +178,16 @@ class AnalysisAgent:
     - Data Analysis Agent: For data analysis and graph generation
     """
     
-    def __init__(self, df: pd.DataFrame, api_key: str = None):
+    def __init__(self, df: pd.DataFrame, api_key: str = None, session_id: str = None):
         self.df = df
+        # Identifies this session's LLM calls to the shared rate limiter and its artifacts
+        self.session_id = session_id or uuid.uuid4().hex[:12]
         if api_key:
             os.environ["GROQ_API_KEY"] = api_key
         
-        # Initialize LLM - using Groq's tool-use optimized model
-        print("DEBUG: Initializing Orchestrator Agent and LLM...")
-        self.llm = Groq(
-            model="openai/gpt-oss-20b",  # Specifically fine-tuned for function calling
-            request_timeout=90.0,
-            max_retries=5,  # More retries for rate limiting
-        )
+        # Shared LLM - one pooled client for every session and agent
+        logger.debug("Initializing Orchestrator Agent and LLM")
+        self.llm = llm_client.get_llm(api_key)
         Settings.llm = self.llm
         
         # Prefetch data statistics to reduce LLM calls
@@ -146,10 +199,14 @@ class AnalysisAgent:
         # Initialize Conversation History and Cache
         self.conversation = ConversationHistory(max_history=50)
         
+        # Deterministic answers for "how many rows", "average Price", ...
+        self.fast_path = FastPath(self.df)
+        
         # Lazy initialization of specialized agents (created on demand)
         self._agents = {}
         
-        print("DEBUG: Orchestrator Agent initialized successfully")
+        logger.info("Orchestrator Agent initialized", extra={"session": self.session_id, "rows": len(self.df),
+                                                             "columns": len(self.df.columns)})
     
     def _precompute_stats(self) -> Dict:
         """Precompute common statistics to speed up analysis."""
@@ -171,7 +228,7 @@ class AnalysisAgent:
         for col in stats["categorical_cols"][:5]:  # Limit to first 5
             stats[f"{col}_top5"] = self.df[col].value_counts().head(5).to_dict()
         
-        print(f"DEBUG: Precomputed stats for {len(stats['columns'])} columns")
+        logger.debug("Precomputed stats for %d columns", len(stats['columns']))
         return stats
     
     def _get_agent(self, agent_type: AgentType):
@@ -180,7 +237,7 @@ class AnalysisAgent:
         Uses lazy initialization to save resources.
         """
         if agent_type not in self._agents:
-            print(f"DEBUG: Creating specialized agent: {agent_type.value}")
+            logger.info("Creating specialized agent", extra={"session": self.session_id, "agent": agent_type.value})
             
             if agent_type == AgentType.PDF:
                 self._agents[agent_type] = PDFReportAgent(self.df, self.llm)
@@ -196,6 +253,14 @@ class AnalysisAgent:
         
         return self._agents[agent_type]
     
+    @staticmethod
+    def _record_outcome(trace_span, path: str, agent: str, started: float) -> None:
+        """Record how a query was answered on its trace and in the metrics."""
+        trace_span.set_attributes({"analyze.path": path, "agent.type": agent})
+        metrics.analyze_requests.inc(path=path, agent=agent)
+        metrics.analyze_seconds.observe(time.perf_counter() - started, path=path, agent=agent)
+    
+    @tracing.traced("analyze")
     async def analyze(self, query: str, use_cache: bool = True, agent_type: str = None) -> str:
         """
         Main entry point - routes the query to the appropriate specialized agent.
@@ -208,14 +273,29 @@ class AnalysisAgent:
         Returns:
             Response from the specialized agent (or cache)
         """
+        started = time.perf_counter()
+        # LLM calls queue fairly with other sessions; artifacts go to this session's directory
+        request_context.current_session.set(self.session_id)
+        trace_span = tracing.current_span()
+        trace_span.set_attributes({"session.id": self.session_id, "query.chars": len(query),
+                                   "agent.requested": agent_type or "auto"})
+        
         # Step 1: Check cache for repeated questions (only if no forced agent)
         if use_cache and not agent_type:
             cached = self.conversation.get_cached_response(query)
             if cached:
-                print(f"DEBUG: Returning cached response (agent: {cached['agent_type']})")
+                self._record_outcome(trace_span, "cache", cached["agent_type"], started)
                 return cached["response"]
         
-        # Step 2: Determine which agent should handle this request
+        # Step 2: Answer simple aggregation questions without the agent loop
+        if not agent_type or agent_type.lower() in ('auto', 'data_analysis', 'analysis'):
+            answer = self.fast_path.try_answer(query)
+            if answer is not None:
+                self.conversation.add_to_history(query, answer, "fast_path")
+                self._record_outcome(trace_span, "fast_path", "fast_path", started)
+                return answer
+        
+        # Step 3: Determine which agent should handle this request
         if agent_type and agent_type != 'auto':
             # User forced a specific agent
             agent_type_map = {
@@ -226,44 +306,48 @@ class AnalysisAgent:
                 'analysis': AgentType.DATA_ANALYSIS,
             }
             selected_agent_type = agent_type_map.get(agent_type.lower(), AgentType.DATA_ANALYSIS)
-            print(f"DEBUG: User forced agent type: {agent_type} -> {selected_agent_type.value}")
+            logger.debug("User forced agent type: %s -> %s", agent_type, selected_agent_type.value)
         else:
             # Auto-detect based on keywords
             selected_agent_type = self.router.route(query)
         
         agent_name = self.router.get_agent_name(selected_agent_type)
         
-        print(f"DEBUG: Routing to {agent_name}")
-        if not agent_type:
-            print(f"DEBUG: {self.router.explain_routing(query)}")
+        logger.info("Routing query", extra={"session": self.session_id, "agent": selected_agent_type.value,
+                                            "forced": bool(agent_type)})
+        if not agent_type and logger.isEnabledFor(logging.DEBUG):
+            # The full explanation rescans every keyword, so build it only when it will be logged
+            logger.debug(self.router.explain_routing(query), extra=app_logging.SAMPLED)
         
-        # Step 3: Get the appropriate specialized agent
+        # Step 4: Get the appropriate specialized agent
         agent = self._get_agent(selected_agent_type)
         
-        # Step 4: Run the query through the specialized agent
+        # Step 5: Run the query through the specialized agent
         try:
-            response = await agent.run(query)
+            with tracing.span(f"agent {selected_agent_type.value}"):
+                response = await agent.run(query)
             response_str = str(response)
             
-            # Step 5: Store in history and cache
+            # Step 6: Store in history and cache
             self.conversation.add_to_history(query, response_str, selected_agent_type.value)
+            self._record_outcome(trace_span, "agent", selected_agent_type.value, started)
             
             return response_str
-        except Exception as e:
-            import traceback
-            error_msg = f"Error in {agent_name}: {str(e)}"
-            print(f"DEBUG: {error_msg}")
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error in %s", agent_name, extra={"session": self.session_id})
             
             # Fallback: try data analysis agent if another agent fails
             if selected_agent_type != AgentType.DATA_ANALYSIS:
-                print("DEBUG: Falling back to Data Analysis Agent")
+                logger.warning("Falling back to Data Analysis Agent", extra={"session": self.session_id})
                 fallback_agent = self._get_agent(AgentType.DATA_ANALYSIS)
-                response = await fallback_agent.run(query)
+                with tracing.span(f"agent {AgentType.DATA_ANALYSIS.value}", **{"agent.fallback": True}):
+                    response = await fallback_agent.run(query)
                 response_str = str(response)
                 self.conversation.add_to_history(query, response_str, "data_analysis_fallback")
+                self._record_outcome(trace_span, "fallback", AgentType.DATA_ANALYSIS.value, started)
                 return response_str
             
+            self._record_outcome(trace_span, "error", selected_agent_type.value, started)
             raise
     
     def get_conversation_history(self) -> List[Dict]:
@@ -282,6 +366,8 @@ class AnalysisAgent:
         return {
             "orchestrator": "AnalysisAgent",
             "conversation_stats": self.conversation.get_stats(),
+            "fast_path_stats": self.fast_path.get_stats(),
+            "rate_limiter_stats": rate_limiter.limiter.get_stats(),
             "available_agents": [
                 {
                     "type": AgentType.PDF.value,
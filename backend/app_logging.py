@@ -0,0 +1,146 @@
+"""
+App Logging - Leveled, structured logging written off the request path
+
+Modules log through get_logger(__name__). Records are put on a bounded
+in-memory queue and one background listener thread formats and writes
+them, so request handlers never block on stdout. Output is one JSON object
+per line (or plain text with LOG_FORMAT=text). Fields passed with
+extra={...} are kept as JSON keys.
+
+High-volume events (cache hits, renders, routing details) are logged with
+extra=SAMPLED and only LOG_SAMPLE_RATE of them are kept. When the queue is
+full new records are dropped and counted instead of blocking.
+"""
+import os
+import sys
+import json
+import queue
+import atexit
+import random
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json or text
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# PandasQueryEngine prints every generated expression and its output when on
+QUERY_ENGINE_VERBOSE = os.getenv("QUERY_ENGINE_VERBOSE", "0") == "1"
+
+ROOT_LOGGER = "data_agent"
+
+# Pass as extra= on hot-path events; only LOG_SAMPLE_RATE of them are written
+SAMPLED = {"sampled": True}
+
+_STANDARD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "sampled"}
+
+_listener = None
+_handler = None
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and any extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _STANDARD_FIELDS})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _SamplingFilter(logging.Filter):
+    """Keeps LOG_SAMPLE_RATE of the records marked SAMPLED, and every other record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return not getattr(record, "sampled", False) or random.random() < LOG_SAMPLE_RATE
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of blocking when the writer falls behind."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args and render tracebacks here: the listener thread may see them mutated later
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup(level: str = None, fmt: str = None, stream=None) -> None:
+    """
+    (Re)configure the app loggers: level, output format and destination.
+
+    Args:
+        level: Level name (default LOG_LEVEL)
+        fmt: "json" or "text" (default LOG_FORMAT)
+        stream: Where the listener writes (default stderr)
+    """
+    global _listener, _handler
+    with _setup_lock:
+        shutdown()
+        output = logging.StreamHandler(stream or sys.stderr)
+        if (fmt or LOG_FORMAT) == "text":
+            output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        else:
+            output.setFormatter(JsonFormatter())
+
+        handler = _DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+        handler.addFilter(_SamplingFilter())
+        root = logging.getLogger(ROOT_LOGGER)
+        root.handlers = [handler]
+        root.setLevel(level or LOG_LEVEL)
+        root.propagate = False
+
+        _handler = handler
+        _listener = QueueListener(handler.queue, output)
+        _listener.start()
+
+
+def shutdown() -> None:
+    """Write out queued records and stop the listener thread."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+def dropped_records() -> int:
+    """Records dropped because the queue was full."""
+    return _handler.dropped if _handler is not None else 0
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the app root, e.g. get_logger(__name__)."""
+    if _listener is None:
+        setup()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+atexit.register(shutdown)
@@ -0,0 +1,428 @@
+"""
+Artifact Store - Indexed, quota-bounded storage for generated charts and reports
+
+Charts, PDFs, presentations and dashboards are written under
+outputs/<kind>/<session>/ and registered in an in-memory index keyed by
+file name, so finding an artifact (for /download or for the response of the
+request that produced it) is a dictionary lookup instead of a directory scan.
+Files that existed before the process started are indexed once, on first use.
+
+A background collector deletes artifacts older than ARTIFACT_MAX_AGE_HOURS
+and, oldest first, whatever exceeds the per-session and total size quotas.
+
+With a shared state backend (see state_store) every entry is also
+published there, so a worker process can serve artifacts another worker
+created.
+
+Text artifacts (dashboards, SVG charts) get gzip and, when the brotli
+package is installed, brotli variants written next to them once at creation
+time, so downloads can be served compressed without compressing per request.
+"""
+import os
+import re
+import gzip
+import time
+import uuid
+import threading
+from typing import Dict, List, Optional
+
+import app_logging
+import request_context
+import state_store
+import tracing
+
+try:
+    import brotli
+except ImportError:  # brotli variants are optional; gzip is always written
+    brotli = None
+
+logger = app_logging.get_logger(__name__)
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+ARTIFACT_ROOT = os.getenv("ARTIFACT_ROOT", os.path.join(os.getcwd(), "outputs"))
+ARTIFACT_MAX_AGE_HOURS = float(os.getenv("ARTIFACT_MAX_AGE_HOURS", "24"))
+ARTIFACT_MAX_MB = float(os.getenv("ARTIFACT_MAX_MB", "2048"))
+ARTIFACT_SESSION_MAX_MB = float(os.getenv("ARTIFACT_SESSION_MAX_MB", "512"))
+ARTIFACT_GC_INTERVAL_SECONDS = float(os.getenv("ARTIFACT_GC_INTERVAL_SECONDS", "300"))
+ARTIFACT_PRECOMPRESS = os.getenv("ARTIFACT_PRECOMPRESS", "1") == "1"
+# Smaller files are not worth a second request round-trip's worth of bytes
+ARTIFACT_PRECOMPRESS_MIN_BYTES = int(os.getenv("ARTIFACT_PRECOMPRESS_MIN_BYTES", "1024"))
+# 11 is the densest but takes seconds on multi-MB dashboards
+ARTIFACT_BROTLI_QUALITY = int(os.getenv("ARTIFACT_BROTLI_QUALITY", "9"))
+
+KINDS = ("graphs", "pdfs", "ppts", "dashboards")
+# Files written before this layout sit directly in outputs/<kind>/
+SHARED_SESSION = "shared"
+# Partial files still being written (chart tiers, streamed PDFs)
+_PARTIAL_SUFFIXES = (".tmp", ".part")
+
+COMPRESSIBLE_SUFFIXES = (".html", ".svg")
+# Content-Encoding -> suffix of the precompressed variant, in server preference order
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+
+def _session_dir_name(session: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]", "_", session)[:64] or SHARED_SESSION
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def precompress(path: str) -> List[str]:
+    """
+    Write compressed variants (path.br, path.gz) of a text artifact.
+
+    Variants that would not be smaller than the original are skipped.
+
+    Args:
+        path: A freshly written artifact
+
+    Returns:
+        List[str]: Paths of the variants written (empty for binary formats).
+    """
+    if not ARTIFACT_PRECOMPRESS or not path.lower().endswith(COMPRESSIBLE_SUFFIXES):
+        return []
+    if _file_size(path) < ARTIFACT_PRECOMPRESS_MIN_BYTES:
+        return []
+    with open(path, "rb") as f:
+        data = f.read()
+
+    compressors = {"gzip": lambda raw: gzip.compress(raw, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressors["br"] = lambda raw: brotli.compress(raw, quality=ARTIFACT_BROTLI_QUALITY)
+
+    variants = []
+    for encoding, compress in compressors.items():
+        encoded = compress(data)
+        if len(encoded) >= len(data):
+            continue
+        variant = path + ENCODINGS[encoding]
+        temp_path = f"{variant}.{uuid.uuid4().hex[:6]}.tmp"
+        with tracing.file_write(variant, encoding):
+            with open(temp_path, "wb") as f:
+                f.write(encoded)
+            os.replace(temp_path, variant)
+        variants.append(variant)
+    return variants
+
+
+def _shared_key(filename: str) -> str:
+    return f"artifact:{filename}"
+
+
+def _strip_encoding(filename: str) -> str:
+    for suffix in ENCODINGS.values():
+        if filename.endswith(suffix):
+            return filename[:-len(suffix)]
+    return filename
+
+
+class ArtifactStore:
+    """
+    Index of generated artifacts with size/age quotas.
+
+    Each entry is a plain dict: name (the public file name, e.g. the chart's
+    .png), kind, session, path, files (every file on disk that belongs to
+    the artifact, such as a chart's spec and rendered tiers), size, created
+    and immutable (False once a name has been written twice, so clients must
+    not cache it forever).
+
+    If a shared StateBackend is given, entries are published to it and
+    names missing from the local index are looked up there.
+    """
+
+    def __init__(self, root: str = ARTIFACT_ROOT, max_bytes: float = ARTIFACT_MAX_MB * 1e6,
+                 session_max_bytes: float = ARTIFACT_SESSION_MAX_MB * 1e6,
+                 max_age_seconds: float = ARTIFACT_MAX_AGE_HOURS * 3600,
+                 shared: Optional[state_store.StateBackend] = None):
+        self.root = root
+        self.shared = shared
+        self.max_bytes = max_bytes
+        self.session_max_bytes = session_max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._entries: Dict[str, Dict] = {}
+        self._aliases: Dict[str, str] = {}  # file name of a related file -> entry name
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._collected = 0
+        self._freed_bytes = 0
+        self._gc_thread: Optional[threading.Thread] = None
+        self._gc_stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+    def output_dir(self, kind: str, session: Optional[str] = None) -> str:
+        """
+        Directory new artifacts of a kind should be written to, created if needed.
+
+        Args:
+            kind: One of KINDS
+            session: Owning session (default: the session of the current request)
+        """
+        session = _session_dir_name(session or request_context.current_session.get())
+        path = os.path.join(self.root, kind, session)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def register(self, path: str, kind: str, files: Optional[List[str]] = None) -> Dict:
+        """
+        Index an artifact once it has been written.
+
+        Args:
+            path: Public path of the artifact; its file name is the lookup key
+            kind: One of KINDS
+            files: Files on disk that make up the artifact (default: [path])
+
+        Returns:
+            Dict: The index entry.
+        """
+        entry = self._make_entry(path, kind, files)
+        with self._lock:
+            if entry["name"] in self._entries:
+                entry["immutable"] = False
+            self._drop(entry["name"])
+            self._add(entry)
+        self._publish(entry)
+        return entry
+
+    @staticmethod
+    def _make_entry(path: str, kind: str, files: Optional[List[str]]) -> Dict:
+        files = list(files or [path])
+        parent = os.path.basename(os.path.dirname(path))
+        return {
+            "name": os.path.basename(path),
+            "kind": kind,
+            "session": SHARED_SESSION if parent == kind else parent,
+            "path": path,
+            "files": files,
+            "size": sum(_file_size(f) for f in files),
+            "created": time.time(),
+            "immutable": True,
+        }
+
+    def _add(self, entry: Dict) -> None:
+        self._entries[entry["name"]] = entry
+        for file_path in entry["files"]:
+            if os.path.basename(file_path) != entry["name"]:
+                self._aliases[os.path.basename(file_path)] = entry["name"]
+
+    def _publish(self, entry: Dict) -> None:
+        """Make an entry (and its related file names) visible to other workers."""
+        if self.shared is None:
+            return
+        self.shared.set(_shared_key(entry["name"]), entry, ttl=self.max_age_seconds)
+        for file_path in entry["files"]:
+            if os.path.basename(file_path) != entry["name"]:
+                self.shared.set(_shared_key(os.path.basename(file_path)), {"alias_of": entry["name"]},
+                                ttl=self.max_age_seconds)
+
+    def _find(self, filename: str) -> Optional[Dict]:
+        """Entry for a file name from the local index, else from the shared backend (lock held)."""
+        entry = self._entries.get(self._aliases.get(filename, filename))
+        if entry is not None or self.shared is None:
+            return entry
+        entry = self.shared.get(_shared_key(filename))
+        if entry is not None and "alias_of" in entry:
+            entry = self.shared.get(_shared_key(entry["alias_of"]))
+        if entry is not None:
+            self._add(entry)
+        return entry
+
+    def attach(self, name: str, file_path: str) -> None:
+        """Add a file derived from an artifact (e.g. a rendered chart tier) so it is counted and collected with it."""
+        with self._lock:
+            entry = self._find(os.path.basename(name))
+            if entry is None or file_path in entry["files"]:
+                return
+            entry["files"].append(file_path)
+            entry["size"] += _file_size(file_path)
+            if os.path.basename(file_path) != entry["name"]:
+                self._aliases[os.path.basename(file_path)] = entry["name"]
+        self._publish(entry)
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+    def lookup(self, filename: str) -> Optional[Dict]:
+        """Index entry for a file name (the artifact's own name or one of its related files)."""
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._find(filename)
+            return dict(entry) if entry else None
+
+    def resolve(self, filename: str) -> Optional[str]:
+        """Path on disk for a file name, or None if it is not a known artifact."""
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._find(filename)
+            if entry is None:
+                return None
+            if entry["name"] == filename:
+                return entry["path"]
+            return next((f for f in entry["files"] if os.path.basename(f) == filename), None)
+
+    def encoded_variants(self, path: str) -> Dict[str, str]:
+        """Precompressed variants of an artifact file, as {Content-Encoding: path}, in preference order."""
+        filename = os.path.basename(path)
+        with self._lock:
+            entry = self._find(filename)
+            files = set(entry["files"]) if entry else set()
+        return {encoding: path + suffix for encoding, suffix in ENCODINGS.items() if path + suffix in files}
+
+    def recent(self, kind: str, max_age_seconds: float, session: Optional[str] = None) -> List[str]:
+        """Paths of artifacts of a kind created in the last max_age_seconds, newest first."""
+        self._ensure_loaded()
+        cutoff = time.time() - max_age_seconds
+        session = _session_dir_name(session) if session else None
+        with self._lock:
+            entries = [e for e in self._entries.values()
+                       if e["kind"] == kind and e["created"] >= cutoff
+                       and (session is None or e["session"] == session)]
+        return [e["path"] for e in sorted(entries, key=lambda e: e["created"], reverse=True)]
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.load()
+
+    def load(self) -> int:
+        """
+        Index artifacts already on disk (one directory walk per process).
+
+        Returns:
+            int: Number of artifacts indexed.
+        """
+        with self._lock:
+            if self._loaded:
+                return 0
+            self._loaded = True
+            count = 0
+            for kind in KINDS:
+                base = os.path.join(self.root, kind)
+                for dirpath, _, filenames in os.walk(base):
+                    groups: Dict[str, List[str]] = {}
+                    for filename in filenames:
+                        if filename.endswith(_PARTIAL_SUFFIXES):
+                            continue
+                        # Chart stems have no dots: bar_chart_1a2b.json, .png, .preview.webp, ...
+                        key = filename.split(".")[0] + ".png" if kind == "graphs" else _strip_encoding(filename)
+                        groups.setdefault(key, []).append(os.path.join(dirpath, filename))
+                    for name, files in groups.items():
+                        if name in self._entries:
+                            continue
+                        # Every worker indexes the directory itself, so nothing is published here
+                        entry = self._make_entry(os.path.join(dirpath, name), kind, files)
+                        entry["created"] = min(os.path.getmtime(f) for f in files)
+                        self._add(entry)
+                        count += 1
+            logger.info("Indexed %d existing artifacts under %s", count, self.root)
+            return count
+
+    # ------------------------------------------------------------------
+    # Garbage collection
+    # ------------------------------------------------------------------
+    def collect(self, now: Optional[float] = None) -> Dict:
+        """
+        Delete expired artifacts, then the oldest ones over the session and total quotas.
+
+        Returns:
+            Dict: removed (artifact count) and freed_bytes.
+        """
+        self._ensure_loaded()
+        now = now or time.time()
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda e: e["created"])
+
+        evicted = [e for e in entries if now - e["created"] > self.max_age_seconds]
+        remaining = [e for e in entries if now - e["created"] <= self.max_age_seconds]
+
+        session_bytes: Dict[str, int] = {}
+        for entry in remaining:
+            session_bytes[entry["session"]] = session_bytes.get(entry["session"], 0) + entry["size"]
+        kept = []
+        for entry in remaining:
+            if session_bytes[entry["session"]] > self.session_max_bytes:
+                session_bytes[entry["session"]] -= entry["size"]
+                evicted.append(entry)
+            else:
+                kept.append(entry)
+
+        total = sum(e["size"] for e in kept)
+        for entry in kept:
+            if total <= self.max_bytes:
+                break
+            total -= entry["size"]
+            evicted.append(entry)
+
+        freed = 0
+        for entry in evicted:
+            with self._lock:
+                self._drop(entry["name"])
+            if self.shared is not None:
+                for file_path in entry["files"]:
+                    self.shared.delete(_shared_key(os.path.basename(file_path)))
+                self.shared.delete(_shared_key(entry["name"]))
+            for file_path in entry["files"]:
+                try:
+                    os.remove(file_path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning("Could not delete artifact file %s: %s", file_path, e)
+            freed += entry["size"]
+        with self._lock:
+            self._collected += len(evicted)
+            self._freed_bytes += freed
+        if evicted:
+            logger.info("Collected artifacts", extra={"removed": len(evicted), "freed_bytes": freed})
+        return {"removed": len(evicted), "freed_bytes": freed}
+
+    def _drop(self, name: str) -> None:
+        entry = self._entries.pop(name, None)
+        if entry is not None:
+            for file_path in entry["files"]:
+                self._aliases.pop(os.path.basename(file_path), None)
+
+    def start_gc(self, interval: float = ARTIFACT_GC_INTERVAL_SECONDS) -> None:
+        """Run collect() every interval seconds on a daemon thread."""
+        if self._gc_thread is not None and self._gc_thread.is_alive():
+            return
+        self._gc_stop.clear()
+
+        def run():
+            while not self._gc_stop.wait(interval):
+                try:
+                    self.collect()
+                except Exception:
+                    logger.exception("Artifact collection failed")
+
+        self._gc_thread = threading.Thread(target=run, name="artifact-gc", daemon=True)
+        self._gc_thread.start()
+
+    def stop_gc(self) -> None:
+        self._gc_stop.set()
+        if self._gc_thread is not None:
+            self._gc_thread.join(timeout=5)
+            self._gc_thread = None
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "artifacts": len(self._entries),
+                "bytes": sum(e["size"] for e in self._entries.values()),
+                "sessions": len({e["session"] for e in self._entries.values()}),
+                "collected": self._collected,
+                "freed_bytes": self._freed_bytes,
+            }
+
+
+# Process-wide store used by the generators and the server
+_backend = state_store.get_backend()
+store = ArtifactStore(shared=_backend if _backend.shared else None)
@@ -0,0 +1,141 @@
+"""
+Benchmark - content_parser.parse_sections on large pasted documents
+
+Compares the single-pass tokenizer with the per-line parser that used to be
+nested in create_ppt_report, and checks both produce the same sections.
+
+Run from the backend directory:
+    python benchmarks/bench_content_parser.py [--lines 10000 50000] [--repeat 3]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from content_parser import parse_sections  # noqa: E402
+
+
+def legacy_clean_text(text):
+    if not text:
+        return ""
+    text = str(text)
+    text = text.replace('**', '').replace('*', '')
+    text = text.replace('### ', '').replace('## ', '').replace('# ', '')
+    text = text.replace('```python', '').replace('```', '')
+    text = text.replace('\n\n\n', '\n\n')
+    return text.strip()
+
+
+def legacy_parse(content_text):
+    """The previous parse_content_into_slides, kept verbatim as the baseline."""
+    import re
+    slides_data = []
+    content_text = legacy_clean_text(str(content_text))
+    lines = content_text.split('\n')
+    current_section_title = None
+    current_section_content = []
+    slide_index = 1
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        is_title = False
+        new_title = None
+        num_match = re.match(r'^(\d+)[.)\s]+(.+)$', line)
+        if num_match:
+            is_title = True
+            new_title = num_match.group(2).strip()[:45]
+        elif ':' in line and len(line.split(':')[0]) < 40:
+            parts = line.split(':', 1)
+            if len(parts[0]) > 3 and parts[0][0].isupper():
+                is_title = True
+                new_title = parts[0].strip()[:45]
+                if parts[1].strip():
+                    current_section_content.append(parts[1].strip())
+        elif line.isupper() and len(line) > 3 and len(line) < 50:
+            is_title = True
+            new_title = line.title()[:45]
+        if is_title and new_title:
+            if current_section_content:
+                slides_data.append({
+                    'title': current_section_title or f"Section {slide_index}",
+                    'content': current_section_content.copy()
+                })
+                slide_index += 1
+            current_section_title = new_title
+            current_section_content = []
+        else:
+            current_section_content.append(line)
+    if current_section_content:
+        slides_data.append({'title': current_section_title or "Content",
+                            'content': current_section_content.copy()})
+    if not slides_data:
+        all_lines = [l.strip() for l in lines if l.strip()]
+        for i in range(0, len(all_lines), 8):
+            chunk = all_lines[i:i + 8]
+            if chunk:
+                first_line = chunk[0][:40].replace('•', '').replace('-', '').strip()
+                title = first_line if first_line and len(first_line) > 5 else f"Key Points {i // 8 + 1}"
+                slides_data.append({'title': title, 'content': chunk})
+    return slides_data
+
+
+def make_document(n_lines, seed=0):
+    """Pasted-report-like text: numbered headers, bullets, markdown and prose."""
+    rng = random.Random(seed)
+    words = ("revenue growth region customer product margin quarter trend "
+             "forecast inventory churn segment pricing channel").split()
+    lines = []
+    section = 1
+    while len(lines) < n_lines:
+        kind = rng.random()
+        sentence = ' '.join(rng.choice(words) for _ in range(rng.randint(6, 20)))
+        if kind < 0.06:
+            lines.append(f"## {section}. {sentence[:30].title()}")
+            section += 1
+        elif kind < 0.08:
+            lines.append(sentence[:30].upper())
+        elif kind < 0.45:
+            lines.append(f"- **{sentence.capitalize()}**")
+        elif kind < 0.5:
+            lines.append("")
+        else:
+            lines.append(sentence.capitalize() + ".")
+    return '\n'.join(lines)
+
+
+def _time(fn, text, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lines', type=int, nargs='+', default=[1000, 10000, 50000, 200000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'lines':>8} {'legacy (ms)':>12} {'tokenizer (ms)':>15} {'speedup':>8} {'sections':>9}")
+    for n_lines in args.lines:
+        text = make_document(n_lines)
+        legacy_time, legacy_sections = _time(legacy_parse, text, args.repeat)
+        new_time, new_sections = _time(parse_sections, text, args.repeat)
+
+        # Generated documents have no "Topic: text" headers, whose trailing
+        # text the legacy parser attached to the previous section
+        comparable = [{'title': s['title'], 'content': s['content']} for s in new_sections]
+        assert comparable == legacy_sections, "tokenizer output differs from the legacy parser"
+
+        print(f"{n_lines:>8} {legacy_time * 1000:>12.1f} {new_time * 1000:>15.1f} "
+              f"{legacy_time / new_time:>7.1f}x {len(new_sections):>9}")
+
+
+if __name__ == '__main__':
+    main()
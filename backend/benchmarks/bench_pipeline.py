@@ -0,0 +1,273 @@
+"""
+Benchmark - End-to-end analyze pipeline on the offline mock LLM
+
+Runs every non-LLM stage of a session against synthetic datasets of the
+given sizes, with LLM_PROVIDER=mock so no network or API key is needed:
+- upload: POST /analyze with the file (save, load, profile, fast-path answer)
+- load / profile: data_loader, facts pack and orchestrator statistics
+- charts: one declarative chart batch (aggregation + kaleido export)
+- data_analysis / pdf / ppt / dashboard: each agent's full tool path,
+  including PDF, PPT and HTML generation
+- fast_path: a direct aggregation answer
+
+Each stage reports cold (first run) and p50/p95/max latency over --repeat
+runs, plus peak traced memory from one extra run under tracemalloc. Results
+can be saved and compared against an earlier run to catch regressions.
+
+Run from the backend directory:
+    python benchmarks/bench_pipeline.py [--rows 1000 100000 10000000] [--repeat 5]
+        [--save] [--compare benchmarks/results/pipeline_<stamp>.json] [--threshold 0.25]
+"""
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+sys.path.insert(0, BACKEND_DIR)
+
+# Must be set before the backend modules read their configuration
+os.environ.setdefault("LLM_PROVIDER", "mock")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+STAGES = ["upload", "load", "profile", "charts", "data_analysis", "pdf", "ppt", "dashboard", "fast_path"]
+AGENT_QUERIES = {
+    "data_analysis": "analyze Revenue by Region",
+    "pdf": "create a pdf report on Revenue",
+    "ppt": "make a presentation about Revenue",
+    "dashboard": "build a dashboard",
+}
+
+
+def make_dataset(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Sales-like data: low and high cardinality categories, dates, numbers and gaps."""
+    rng = np.random.default_rng(seed)
+    regions = np.array(["North", "South", "East", "West", "Central", "Online", "Export", "Other"])
+    products = np.array([f"Product {i:03d}" for i in range(200)])
+    units = rng.integers(1, 50, n_rows)
+    price = np.round(rng.gamma(2.0, 40.0, n_rows), 2)
+    discount = np.round(rng.uniform(0, 0.3, n_rows), 3)
+    discount[rng.random(n_rows) < 0.05] = np.nan
+    return pd.DataFrame({
+        "Region": regions[rng.integers(0, len(regions), n_rows)],
+        "Product": products[rng.integers(0, len(products), n_rows)],
+        "Date": pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 730, n_rows), unit="D"),
+        "Units": units,
+        "Price": price,
+        "Discount": discount,
+        "Revenue": np.round(units * price * (1 - np.nan_to_num(discount)), 2),
+    })
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class PipelineBench:
+    """Holds one dataset, one session and the stage callables for it."""
+
+    def __init__(self, n_rows: int, workdir: str):
+        import data_loader
+        import dynamic_visualization
+        import facts_pack
+        import server
+        from analysis_agent import AnalysisAgent
+        from fastapi.testclient import TestClient
+
+        self.data_loader = data_loader
+        self.dynamic_visualization = dynamic_visualization
+        self.facts_pack = facts_pack
+        self.AnalysisAgent = AnalysisAgent
+        self.client = TestClient(server.app)
+        self.loop = asyncio.new_event_loop()
+
+        self.csv_path = os.path.join(workdir, f"bench_{n_rows}.csv")
+        print(f"Generating {n_rows:,} rows...", flush=True)
+        make_dataset(n_rows).to_csv(self.csv_path, index=False)
+        self.df = data_loader.load_data(self.csv_path)
+        self.agent = AnalysisAgent(self.df)
+
+    def close(self):
+        self.loop.close()
+        self.client.close()
+
+    # ------------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------------
+    def upload(self):
+        with open(self.csv_path, "rb") as f:
+            response = self.client.post("/analyze", files={"file": (os.path.basename(self.csv_path), f, "text/csv")},
+                                        data={"prompt": "how many rows"})
+        response.raise_for_status()
+
+    def load(self):
+        assert self.data_loader.load_data(self.csv_path) is not None
+
+    def profile(self):
+        # Fresh frame so fingerprint and facts are recomputed, as on a new upload
+        df = self.df.copy()
+        self.facts_pack._packs.clear()
+        self.facts_pack.get_facts_pack(df)
+        self.AnalysisAgent(df)
+
+    def charts(self):
+        specs = [
+            {"chart_type": "bar", "x": "Region", "y": "Revenue", "agg": "sum"},
+            {"chart_type": "bar", "x": "Product", "y": "Units", "agg": "mean", "top_n": 10},
+            {"chart_type": "histogram", "x": "Price"},
+            {"chart_type": "line", "x": "Date", "y": "Revenue", "agg": "sum"},
+        ]
+        results = self.dynamic_visualization.render_chart_batch(self.df, specs)
+        errors = [r for r in results if r.startswith("Error")]
+        assert not errors, errors
+
+    def _agent_stage(self, agent_type):
+        def run():
+            response = self.loop.run_until_complete(
+                self.agent.analyze(AGENT_QUERIES[agent_type], use_cache=False, agent_type=agent_type))
+            assert not response.startswith("Error"), response[:300]
+        return run
+
+    def fast_path(self):
+        assert self.agent.fast_path.try_answer("average Revenue by Region") is not None
+
+    def stage(self, name):
+        if name in AGENT_QUERIES:
+            return self._agent_stage(name)
+        return getattr(self, name)
+
+
+def run_stage(fn, repeat: int, trace_memory: bool) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    result = {
+        "cold_ms": round(timings[0], 2),
+        "p50_ms": round(percentile(timings, 50), 2),
+        "p95_ms": round(percentile(timings, 95), 2),
+        "max_ms": round(max(timings), 2),
+        "runs": repeat,
+    }
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            fn()
+            result["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def peak_rss_mb():
+    """Process high-water mark in MB (Linux reports ru_maxrss in KB), or None."""
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def compare(results: dict, baseline_path: str, threshold: float) -> bool:
+    """Print p50 changes against a saved run; True if any stage regressed."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    regressed = False
+    print(f"\nComparison with {os.path.basename(baseline_path)} (p50, threshold {threshold:.0%})")
+    print(f"{'rows':>10} {'stage':<14} {'baseline':>10} {'current':>10} {'change':>8}")
+    for rows, stages in results.items():
+        for stage, current in stages.items():
+            before = baseline.get(rows, {}).get(stage)
+            if not before:
+                continue
+            change = (current["p50_ms"] - before["p50_ms"]) / before["p50_ms"] if before["p50_ms"] else 0
+            flag = "  REGRESSION" if change > threshold else ""
+            regressed = regressed or bool(flag)
+            print(f"{int(rows):>10,} {stage:<14} {before['p50_ms']:>10.1f} {current['p50_ms']:>10.1f} "
+                  f"{change:>+7.0%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run per stage")
+    parser.add_argument("--save", action="store_true", help=f"write results to {RESULTS_DIR}")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="p50 slowdown flagged as a regression")
+    parser.add_argument("--keep-outputs", action="store_true", help="keep the generated files")
+    args = parser.parse_args()
+
+    # Charts, reports and uploads are written relative to the working directory
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    os.chdir(workdir)
+
+    results = {}
+    try:
+        for n_rows in args.rows:
+            bench = PipelineBench(n_rows, workdir)
+            results[str(n_rows)] = {}
+            print(f"\n{n_rows:,} rows")
+            print(f"{'stage':<14} {'cold (ms)':>10} {'p50 (ms)':>10} {'p95 (ms)':>10} {'max (ms)':>10} {'peak (MB)':>10}")
+            try:
+                for stage in args.stages:
+                    result = run_stage(bench.stage(stage), args.repeat, not args.no_memory)
+                    results[str(n_rows)][stage] = result
+                    print(f"{stage:<14} {result['cold_ms']:>10.1f} {result['p50_ms']:>10.1f} "
+                          f"{result['p95_ms']:>10.1f} {result['max_ms']:>10.1f} "
+                          f"{result.get('peak_mb', float('nan')):>10.1f}", flush=True)
+            finally:
+                bench.close()
+    finally:
+        os.chdir(BACKEND_DIR)
+        if args.keep_outputs:
+            print(f"\nOutputs kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if peak_rss_mb() is not None:
+        print(f"\nPeak process RSS: {peak_rss_mb():.0f} MB")
+
+    if args.save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"pipeline_{datetime.now():%Y%m%d_%H%M%S}.json")
+        with open(path, "w") as f:
+            json.dump({
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "machine": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "llm_provider": os.environ["LLM_PROVIDER"],
+                "mock_latency_ms": float(os.getenv("LLM_MOCK_LATENCY_MS", "0")),
+                "repeat": args.repeat,
+                "peak_rss_mb": peak_rss_mb(),
+                "results": results,
+            }, f, indent=2)
+        print(f"\nSaved {path}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
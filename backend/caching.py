@@ -0,0 +1,76 @@
+"""
+Caching - Small thread-safe LRU cache shared by the rendering pipeline
+"""
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List
+
+# Every live cache, for the /metrics endpoint
+_instances: "weakref.WeakSet[LRUCache]" = weakref.WeakSet()
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache with hit/miss statistics.
+
+    Used for compiled plot snippets, memoized figures and other per-process
+    caches that must stay bounded.
+    """
+
+    def __init__(self, max_size: int = 128, name: str = "cache"):
+        self.max_size = max_size
+        self.name = name
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        _instances.add(self)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value (marking it recently used) or default."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def get_stats(self) -> Dict:
+        """Get statistics about the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
+
+
+def get_all_stats() -> List[Dict]:
+    """Statistics of every live cache, ordered by name."""
+    return sorted((cache.get_stats() for cache in list(_instances)), key=lambda stats: stats["name"])
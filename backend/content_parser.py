@@ -0,0 +1,109 @@
+"""
+Content Parser - Single-pass tokenizer turning pasted text into report sections
+
+Shared by the PPT generator (one or more slides per section) and the PDF
+generator (one subsection per section). All patterns are compiled once and
+the text is cleaned and scanned exactly once.
+"""
+import re
+from typing import Dict, List, Optional
+
+
+# Section headers: "1. Topic" / "2) Topic", "Topic: text", "ALL CAPS"
+_NUMBERED_PATTERN = re.compile(r'(\d+)[.)\s]+(.+)')
+_BULLET_PATTERN = re.compile(r'[•\-]\s*')
+
+TITLE_MAX_LENGTH = 45
+COLON_TITLE_MAX_LENGTH = 40
+FALLBACK_CHUNK_SIZE = 8  # lines per section when the text has no headers
+
+
+def clean_text(text) -> str:
+    """Remove markdown artifacts from text."""
+    if not text:
+        return ""
+    # str.replace is a C-level scan; skip the passes whose marker is absent
+    text = str(text).replace('*', '')
+    if '# ' in text:
+        text = text.replace('### ', '').replace('## ', '').replace('# ', '')
+    if '```' in text:
+        text = text.replace('```python', '').replace('```', '')
+    return text.replace('\n\n\n', '\n\n').strip()
+
+
+def parse_sections(content_text) -> List[Dict]:
+    """
+    Split text into titled sections in one pass.
+
+    Args:
+        content_text: Raw pasted or generated text (markdown is stripped)
+
+    Returns:
+        List[Dict]: [{'title': str, 'content': [cleaned lines],
+                      'generated_title': bool}], in order. Content before the
+                    first header gets a placeholder title; text made only of
+                    headers is chunked into sections of FALLBACK_CHUNK_SIZE lines.
+    """
+    sections: List[Dict] = []
+    lines = [line for line in (raw.strip() for raw in clean_text(content_text).split('\n')) if line]
+
+    numbered = _NUMBERED_PATTERN.fullmatch
+    current_title: Optional[str] = None
+    current_content: List[str] = []
+    for line in lines:
+        # Header checks, cheapest first and in the order that decides ties:
+        # "1. Topic", then a short "Topic: text" prefix, then ALL CAPS
+        title = remainder = None
+        match = numbered(line) if line[0].isdigit() else None
+        if match:
+            title = match.group(2).strip()[:TITLE_MAX_LENGTH]
+        else:
+            colon = line.find(':', 0, COLON_TITLE_MAX_LENGTH)
+            if colon != -1:
+                # A short "prefix:" line is a header or plain content, never ALL CAPS
+                if colon > 3 and line[0].isupper():
+                    title = line[:colon].strip()[:TITLE_MAX_LENGTH]
+                    remainder = line[colon + 1:].strip()
+            elif 3 < len(line) < 50 and line.isupper():
+                title = line.title()[:TITLE_MAX_LENGTH]
+
+        if title is None:
+            current_content.append(line)
+            continue
+
+        if current_content:
+            sections.append({
+                'title': current_title or f"Section {len(sections) + 1}",
+                'content': current_content,
+                'generated_title': current_title is None,
+            })
+        current_title = title
+        # Text after "Topic:" is the first line of the new section
+        current_content = [remainder] if remainder else []
+
+    if current_content:
+        sections.append({
+            'title': current_title or "Content",
+            'content': current_content,
+            'generated_title': current_title is None,
+        })
+
+    # Only headers and no content: present the lines themselves in chunks
+    if not sections:
+        for start in range(0, len(lines), FALLBACK_CHUNK_SIZE):
+            chunk = lines[start:start + FALLBACK_CHUNK_SIZE]
+            first_line = chunk[0][:40].replace('•', '').replace('-', '').strip()
+            title = first_line if len(first_line) > 5 else f"Key Points {start // FALLBACK_CHUNK_SIZE + 1}"
+            sections.append({'title': title, 'content': chunk, 'generated_title': True})
+
+    return sections
+
+
+def is_bullet(line: str) -> bool:
+    """True for lines written as bullet points ("- item", "• item")."""
+    return _BULLET_PATTERN.match(line) is not None
+
+
+def strip_bullet(line: str) -> str:
+    """Remove a leading bullet marker from a line."""
+    return _BULLET_PATTERN.sub('', line, count=1)
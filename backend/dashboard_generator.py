@@ -8,6 +8,9 @@ import json
 from datetime import datetime
 import pandas as pd
 
+import artifact_store
+import tracing
+
 
 def generate_dashboard(df: pd.DataFrame, title: str = "Data Analysis Dashboard", 
                        chart_configs: list = None) -> str:
@@ -22,9 +25,8 @@ def generate_dashboard(df: pd.DataFrame, title: str = "Data Analysis Dashboard",
     Returns:
         str: Path to the generated HTML dashboard
     """
-    # Create output directory if it doesn't exist
-    output_dir = os.path.join(os.getcwd(), "outputs", "dashboards")
-    os.makedirs(output_dir, exist_ok=True)
+    # Dashboards go to this session's directory in the artifact store
+    output_dir = artifact_store.store.output_dir("dashboards")
     
     # Generate unique filename
     filename = f"dashboard_{uuid.uuid4().hex[:8]}.html"
@@ -87,8 +89,10 @@ def generate_dashboard(df: pd.DataFrame, title: str = "Data Analysis Dashboard",
     # Generate HTML
     html_content = generate_dashboard_html(title, kpis, charts_html, df)
     
-    with open(filepath, 'w', encoding='utf-8') as f:
+    with tracing.file_write(filepath, "html"), open(filepath, 'w', encoding='utf-8') as f:
         f.write(html_content)
+    # Dashboards inline their data as JSON; compress once here rather than per download
+    artifact_store.store.register(filepath, "dashboards", files=[filepath] + artifact_store.precompress(filepath))
     
     return filepath
 
@@ -1,6 +1,17 @@
 import pandas as pd
 import io
 import os
+import uuid
+import hashlib
+import weakref
+
+import app_logging
+
+logger = app_logging.get_logger(__name__)
+
+
+# id(df) -> fingerprint; entries are dropped when the DataFrame is collected
+_fingerprints = {}
 
 def load_data(file_path_or_content, file_type=None):
     """
@@ -44,5 +55,38 @@ def load_data(file_path_or_content, file_type=None):
                     return pd.DataFrame([x.split() for x in file_path_or_content.split('\n')])
 
     except Exception as e:
-        print(f"Error loading data: {e}")
+        logger.error("Error loading data: %s", e)
         return None
+
+
+def dataset_fingerprint(df):
+    """
+    Returns a stable content hash for a DataFrame.
+    
+    The hash covers column names, dtypes and every cell, so two uploads of the
+    same file share a fingerprint. It is computed once per DataFrame object and
+    cached for the object's lifetime; callers must not mutate the frame in place.
+    
+    Args:
+        df (pd.DataFrame): The loaded data.
+        
+    Returns:
+        str: 16-character hex fingerprint.
+    """
+    key = id(df)
+    cached = _fingerprints.get(key)
+    if cached is not None:
+        return cached
+    
+    digest = hashlib.sha1()
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode())
+    try:
+        digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+        fingerprint = digest.hexdigest()[:16]
+    except TypeError:
+        # Unhashable cells (lists, dicts) - fall back to an identity-only key
+        fingerprint = uuid.uuid4().hex[:16]
+    
+    _fingerprints[key] = fingerprint
+    weakref.finalize(df, _fingerprints.pop, key, None)
+    return fingerprint
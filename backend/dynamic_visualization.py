@@ -1,6 +1,7 @@
 """
 Dynamic Visualization Module - Uses Plotly for interactive charts
-Generates static PNG images from Plotly figures for reports
+Stores each figure as a Plotly spec and renders static export tiers from it
+on demand (WebP preview for chat, PNG for reports, full-res PNG and SVG)
 """
 
 # IMPORTANT: Set matplotlib backend BEFORE importing pyplot to prevent tkinter errors
@@ -14,13 +15,164 @@ import plotly.graph_objects as go
 import plotly.io as pio
 import pandas as pd
 import uuid
+import contextvars
 import os
 import traceback
+import threading
 import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import app_logging
+import artifact_store
+import plot_sandbox
+import figure_sampling
+import data_loader
+import tracing
+from caching import LRUCache
+
+logger = app_logging.get_logger(__name__)
+
 
 # Set default template for consistent styling
 pio.templates.default = "plotly_dark"
 
+# Export tiers rendered from the stored figure spec. Every tier keeps the
+# 1200x700 layout and only changes the output scale/format.
+CHART_TIERS = {
+    'preview': {'suffix': '.preview.webp', 'format': 'webp', 'scale': 0.5},  # chat thumbnail
+    'document': {'suffix': '.png', 'format': 'png', 'scale': 1},  # PDF/PPT embedding
+    'full': {'suffix': '.full.png', 'format': 'png', 'scale': 2},  # on-demand download
+    'vector': {'suffix': '.svg', 'format': 'svg', 'scale': 1},
+}
+CHART_WIDTH = 1200
+CHART_HEIGHT = 700
+
+# target path -> lock, so concurrent requests render each tier only once
+_render_locks = {}
+_render_locks_guard = threading.Lock()
+
+# (dataset fingerprint, code hash) -> (figure JSON, sampling note)
+# Identical snippets on the same data skip compilation and the pandas work
+_figure_cache = LRUCache(max_size=int(os.getenv("PLOT_FIGURE_CACHE_SIZE", "64")), name="plot_figures")
+
+
+def _chart_stem(chart_path: str) -> str:
+    return os.path.splitext(chart_path)[0]
+
+
+def chart_spec_path(chart_path: str) -> str:
+    """Path of the Plotly JSON spec stored for a chart."""
+    return _chart_stem(chart_path) + ".json"
+
+
+def chart_tier_path(chart_path: str, tier: str) -> str:
+    """Path where the given export tier of a chart lives (rendered or not)."""
+    return _chart_stem(chart_path) + CHART_TIERS[tier]['suffix']
+
+
+def chart_exists(chart_path: str) -> bool:
+    """True if the chart has a stored spec or an already rendered image."""
+    return os.path.exists(chart_spec_path(chart_path)) or os.path.exists(chart_path)
+
+
+def save_chart(fig, filepath: str) -> None:
+    """
+    Store a finished figure so any export tier can be rendered from it later.
+    
+    Only the JSON spec is written here; `filepath` (the document-tier PNG)
+    is what callers hand around and is rendered the first time it is needed.
+    """
+    spec_path = chart_spec_path(filepath)
+    with tracing.file_write(spec_path, "chart spec"), open(spec_path, 'w', encoding='utf-8') as f:
+        f.write(fig.to_json())
+    artifact_store.store.register(filepath, "graphs", files=[spec_path])
+
+
+def render_chart_tier(chart_path: str, tier: str = 'document') -> str:
+    """
+    Return a file for the requested export tier, rendering and caching it on first use.
+    
+    Args:
+        chart_path: Chart path as returned by the chart tools (the .png path)
+        tier: One of CHART_TIERS - preview, document, full or vector
+        
+    Returns:
+        str: Path to the rendered file.
+        
+    Raises:
+        ValueError: Unknown tier.
+        FileNotFoundError: Neither a spec nor a rendered image exists.
+    """
+    if tier not in CHART_TIERS:
+        raise ValueError(f"Unknown chart tier '{tier}'. Use one of: {', '.join(CHART_TIERS)}")
+    
+    target = chart_tier_path(chart_path, tier)
+    if os.path.exists(target):
+        return target
+    
+    spec_path = chart_spec_path(chart_path)
+    if not os.path.exists(spec_path):
+        # Charts rendered before specs were stored only have their PNG
+        if os.path.exists(chart_path):
+            return chart_path
+        raise FileNotFoundError(f"No chart found for {chart_path}")
+    
+    with _render_locks_guard:
+        lock = _render_locks.setdefault(target, threading.Lock())
+    with lock:
+        if not os.path.exists(target):
+            with open(spec_path, 'r', encoding='utf-8') as f:
+                fig = pio.from_json(f.read())
+            options = CHART_TIERS[tier]
+            temp_path = f"{target}.{uuid.uuid4().hex[:6]}.tmp"
+            with tracing.file_write(target, options['format'], **{"chart.tier": tier}):
+                fig.write_image(temp_path, format=options['format'], width=CHART_WIDTH,
+                                height=CHART_HEIGHT, scale=options['scale'])
+                os.replace(temp_path, target)
+            for file_path in [target] + artifact_store.precompress(target):
+                artifact_store.store.attach(chart_path, file_path)
+            logger.debug("Rendered %s tier for %s", tier, os.path.basename(chart_path), extra=app_logging.SAMPLED)
+    with _render_locks_guard:
+        _render_locks.pop(target, None)
+    return target
+
+
+def render_chart_tiers(chart_paths: List[str], tier: str = 'document') -> List[str]:
+    """
+    Render one tier for several charts with a single Kaleido call.
+    
+    Kaleido renders the figures concurrently in one browser, which is much
+    faster than calling render_chart_tier once per chart.
+    
+    Returns:
+        List[str]: Paths of the rendered tier files, in input order.
+    """
+    options = CHART_TIERS[tier]
+    pending = [p for p in chart_paths
+               if not os.path.exists(chart_tier_path(p, tier)) and os.path.exists(chart_spec_path(p))]
+    if pending:
+        figures = []
+        for chart_path in pending:
+            with open(chart_spec_path(chart_path), 'r', encoding='utf-8') as f:
+                figures.append(pio.from_json(f.read()))
+        temp_paths = [f"{chart_tier_path(p, tier)}.{uuid.uuid4().hex[:6]}.tmp" for p in pending]
+        batch_attributes = {"chart.tier": tier, "chart.count": len(pending)}
+        with tracing.span(f"write {options['format']} batch", **batch_attributes) as batch:
+            pio.write_images(figures, temp_paths, format=options['format'], width=CHART_WIDTH,
+                             height=CHART_HEIGHT, scale=options['scale'])
+            for chart_path, temp_path in zip(pending, temp_paths):
+                os.replace(temp_path, chart_tier_path(chart_path, tier))
+                tier_path = chart_tier_path(chart_path, tier)
+                for file_path in [tier_path] + artifact_store.precompress(tier_path):
+                    artifact_store.store.attach(chart_path, file_path)
+            if batch.is_recording():
+                batch.set_attribute("file.size_bytes",
+                                    sum(os.path.getsize(chart_tier_path(p, tier)) for p in pending))
+        logger.debug("Rendered %s tier for %d charts in one batch", tier, len(pending))
+    return [render_chart_tier(p, tier) for p in chart_paths]
+
 
 def execute_plot_code(df: pd.DataFrame, code: str) -> str:
     """
@@ -36,27 +188,47 @@ def execute_plot_code(df: pd.DataFrame, code: str) -> str:
         str: The path to the saved image file, or an error message.
     """
     try:
-        # Create output directory if it doesn't exist
-        output_dir = os.path.join(os.getcwd(), "outputs", "graphs")
-        os.makedirs(output_dir, exist_ok=True)
+        output_dir = artifact_store.store.output_dir("graphs")
         
-        # Prepare the execution environment with Plotly
-        local_vars = {
-            "df": df,
-            "px": px,
-            "go": go,
-            "pd": pd,
-            "fig": None
-        }
+        cache_key = (data_loader.dataset_fingerprint(df), plot_sandbox.plot_code_hash(code))
+        cached = _figure_cache.get(cache_key)
         
-        # Execute the code
-        exec(code, {}, local_vars)
-        
-        # Get the figure from local vars
-        fig = local_vars.get("fig")
-        
-        if fig is None:
-            return "Error: Code must create a 'fig' variable with a Plotly figure"
+        if cached is not None:
+            logger.debug("Plot cache HIT for snippet %s", cache_key[1][:8], extra=app_logging.SAMPLED)
+            fig_json, sampling_note = cached
+            fig = pio.from_json(fig_json)
+        elif plot_sandbox.SANDBOX_ENABLED:
+            # Run the LLM-written code in a limited worker process
+            try:
+                fig_json, sampling_note = plot_sandbox.run_plot_code(df, code)
+                fig = pio.from_json(fig_json)
+            except plot_sandbox.PlotSandboxError as e:
+                return f"Error executing plot code: {str(e)}"
+            _figure_cache.put(cache_key, (fig_json, sampling_note))
+        else:
+            # Prepare the execution environment with Plotly
+            local_vars = {
+                # Deep copy: a shallow one shares data buffers, so in-place edits
+                # would change the session's frame (and its cached fingerprint)
+                "df": df.copy(),
+                "px": px,
+                "go": go,
+                "pd": pd,
+                "fig": None
+            }
+            
+            # Execute the code (compiled once per distinct snippet)
+            exec(plot_sandbox.compile_plot_code(code), {}, local_vars)
+            
+            # Get the figure from local vars
+            fig = local_vars.get("fig")
+            
+            if fig is None:
+                return "Error: Code must create a 'fig' variable with a Plotly figure"
+            
+            # Decimate oversized traces before export
+            sampling_note = figure_sampling.downsample_figure(fig)
+            _figure_cache.put(cache_key, (fig.to_json(), sampling_note))
         
         # Extract title from figure for descriptive filename
         chart_title = "chart"
@@ -72,6 +244,8 @@ def execute_plot_code(df: pd.DataFrame, code: str) -> str:
         # Determine chart type from the figure data
         if hasattr(fig, 'data') and len(fig.data) > 0:
             trace_type = type(fig.data[0]).__name__.lower()
+            if fig.data[0].meta == figure_sampling.BINNED_HISTOGRAM_META:
+                trace_type = 'histogram'
             if 'bar' in trace_type:
                 chart_type = 'bar_chart'
             elif 'line' in trace_type or 'scatter' in trace_type:
@@ -87,7 +261,6 @@ def execute_plot_code(df: pd.DataFrame, code: str) -> str:
                 chart_type = 'histogram'
         
         # Create descriptive filename
-        import re
         # Clean title for filename
         clean_title = re.sub(r'[^a-zA-Z0-9\s]', '', chart_title)
         clean_title = '_'.join(clean_title.lower().split())[:40]
@@ -107,20 +280,21 @@ def execute_plot_code(df: pd.DataFrame, code: str) -> str:
             margin=dict(l=60, r=30, t=60, b=60)
         )
         
-        # Save the plot as PNG
-        fig.write_image(filepath, width=1200, height=700, scale=2)
+        # Store the figure spec; image tiers are rendered on demand
+        save_chart(fig, filepath)
         
         # Return path with description
-        return f"{filepath}|CHART_DESC: {chart_title} ({chart_type.replace('_', ' ').title()})"
+        chart_desc = f"{chart_title} ({chart_type.replace('_', ' ').title()})"
+        if sampling_note:
+            chart_desc += f" [sampled: {sampling_note}]"
+        return f"{filepath}|CHART_DESC: {chart_desc}"
     except Exception as e:
         return f"Error executing plot code: {str(e)}\nTraceback: {traceback.format_exc()}"
 
 
 def create_bar_chart(df: pd.DataFrame, x_col: str, y_col: str, title: str = "Bar Chart") -> str:
     """Create a bar chart and save as PNG."""
-    import re
-    output_dir = os.path.join(os.getcwd(), "outputs", "graphs")
-    os.makedirs(output_dir, exist_ok=True)
+    output_dir = artifact_store.store.output_dir("graphs")
     clean_title = re.sub(r'[^a-zA-Z0-9\s]', '', title)
     clean_title = '_'.join(clean_title.lower().split())[:40]
     filename = f"{clean_title}_bar_chart_{uuid.uuid4().hex[:4]}.png"
@@ -133,15 +307,13 @@ def create_bar_chart(df: pd.DataFrame, x_col: str, y_col: str, title: str = "Bar
         plot_bgcolor='rgba(30, 41, 59, 1)',
         font=dict(color='#e2e8f0')
     )
-    fig.write_image(filepath, width=1200, height=700, scale=2)
+    save_chart(fig, filepath)
     return f"{filepath}|CHART_DESC: {title} (Bar Chart)"
 
 
 def create_line_chart(df: pd.DataFrame, x_col: str, y_col: str, title: str = "Line Chart") -> str:
     """Create a line chart and save as PNG."""
-    import re
-    output_dir = os.path.join(os.getcwd(), "outputs", "graphs")
-    os.makedirs(output_dir, exist_ok=True)
+    output_dir = artifact_store.store.output_dir("graphs")
     clean_title = re.sub(r'[^a-zA-Z0-9\s]', '', title)
     clean_title = '_'.join(clean_title.lower().split())[:40]
     filename = f"{clean_title}_line_chart_{uuid.uuid4().hex[:4]}.png"
@@ -149,20 +321,20 @@ def create_line_chart(df: pd.DataFrame, x_col: str, y_col: str, title: str = "Li
     
     fig = px.line(df, x=x_col, y=y_col, title=title,
                   color_discrete_sequence=['#10b981'])
+    sampling_note = figure_sampling.downsample_figure(fig)
     fig.update_layout(
         paper_bgcolor='rgba(15, 23, 42, 1)',
         plot_bgcolor='rgba(30, 41, 59, 1)',
         font=dict(color='#e2e8f0')
     )
-    fig.write_image(filepath, width=1200, height=700, scale=2)
-    return f"{filepath}|CHART_DESC: {title} (Line Chart)"
+    save_chart(fig, filepath)
+    sampled = f" [sampled: {sampling_note}]" if sampling_note else ""
+    return f"{filepath}|CHART_DESC: {title} (Line Chart){sampled}"
 
 
 def create_pie_chart(df: pd.DataFrame, names_col: str, values_col: str, title: str = "Pie Chart") -> str:
     """Create a pie chart and save as PNG."""
-    import re
-    output_dir = os.path.join(os.getcwd(), "outputs", "graphs")
-    os.makedirs(output_dir, exist_ok=True)
+    output_dir = artifact_store.store.output_dir("graphs")
     clean_title = re.sub(r'[^a-zA-Z0-9\s]', '', title)
     clean_title = '_'.join(clean_title.lower().split())[:40]
     filename = f"{clean_title}_pie_chart_{uuid.uuid4().hex[:4]}.png"
@@ -174,15 +346,13 @@ def create_pie_chart(df: pd.DataFrame, names_col: str, values_col: str, title: s
         paper_bgcolor='rgba(15, 23, 42, 1)',
         font=dict(color='#e2e8f0')
     )
-    fig.write_image(filepath, width=1200, height=700, scale=2)
+    save_chart(fig, filepath)
     return f"{filepath}|CHART_DESC: {title} (Pie Chart)"
 
 
 def create_histogram(df: pd.DataFrame, col: str, title: str = "Histogram") -> str:
     """Create a histogram and save as PNG."""
-    import re
-    output_dir = os.path.join(os.getcwd(), "outputs", "graphs")
-    os.makedirs(output_dir, exist_ok=True)
+    output_dir = artifact_store.store.output_dir("graphs")
     clean_title = re.sub(r'[^a-zA-Z0-9\s]', '', title)
     clean_title = '_'.join(clean_title.lower().split())[:40]
     filename = f"{clean_title}_histogram_{uuid.uuid4().hex[:4]}.png"
@@ -190,20 +360,20 @@ def create_histogram(df: pd.DataFrame, col: str, title: str = "Histogram") -> st
     
     fig = px.histogram(df, x=col, title=title,
                        color_discrete_sequence=['#f59e0b'])
+    sampling_note = figure_sampling.downsample_figure(fig)
     fig.update_layout(
         paper_bgcolor='rgba(15, 23, 42, 1)',
         plot_bgcolor='rgba(30, 41, 59, 1)',
         font=dict(color='#e2e8f0')
     )
-    fig.write_image(filepath, width=1200, height=700, scale=2)
-    return f"{filepath}|CHART_DESC: {title} (Histogram)"
+    save_chart(fig, filepath)
+    sampled = f" [sampled: {sampling_note}]" if sampling_note else ""
+    return f"{filepath}|CHART_DESC: {title} (Histogram){sampled}"
 
 
 def create_scatter_chart(df: pd.DataFrame, x_col: str, y_col: str, title: str = "Scatter Plot") -> str:
     """Create a scatter plot and save as PNG."""
-    import re
-    output_dir = os.path.join(os.getcwd(), "outputs", "graphs")
-    os.makedirs(output_dir, exist_ok=True)
+    output_dir = artifact_store.store.output_dir("graphs")
     clean_title = re.sub(r'[^a-zA-Z0-9\s]', '', title)
     clean_title = '_'.join(clean_title.lower().split())[:40]
     filename = f"{clean_title}_scatter_plot_{uuid.uuid4().hex[:4]}.png"
@@ -211,10 +381,238 @@ def create_scatter_chart(df: pd.DataFrame, x_col: str, y_col: str, title: str =
     
     fig = px.scatter(df, x=x_col, y=y_col, title=title,
                      color_discrete_sequence=['#ec4899'])
+    sampling_note = figure_sampling.downsample_figure(fig)
     fig.update_layout(
         paper_bgcolor='rgba(15, 23, 42, 1)',
         plot_bgcolor='rgba(30, 41, 59, 1)',
         font=dict(color='#e2e8f0')
     )
-    fig.write_image(filepath, width=1200, height=700, scale=2)
-    return f"{filepath}|CHART_DESC: {title} (Scatter Plot)"
+    save_chart(fig, filepath)
+    sampled = f" [sampled: {sampling_note}]" if sampling_note else ""
+    return f"{filepath}|CHART_DESC: {title} (Scatter Plot){sampled}"
+
+
+# ============================================================================
+# BATCH CHART RENDERING
+# ============================================================================
+BATCH_CHART_TYPES = {'bar', 'line', 'pie', 'histogram', 'scatter'}
+BATCH_AGGREGATIONS = {'sum', 'mean', 'median', 'count', 'min', 'max'}
+BATCH_COLORS = {
+    'bar': ['#6366f1'],
+    'line': ['#10b981'],
+    'pie': ['#6366f1', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6'],
+    'histogram': ['#f59e0b'],
+    'scatter': ['#ec4899'],
+}
+BATCH_LABELS = {
+    'bar': ('bar_chart', 'Bar Chart'),
+    'line': ('line_chart', 'Line Chart'),
+    'pie': ('pie_chart', 'Pie Chart'),
+    'histogram': ('histogram', 'Histogram'),
+    'scatter': ('scatter_plot', 'Scatter Plot'),
+}
+
+
+def _validate_chart_spec(df: pd.DataFrame, spec: Dict) -> Dict:
+    """Normalize a declarative chart spec, raising ValueError on bad input."""
+    chart_type = str(spec.get('chart_type', '')).lower().replace(' chart', '').strip()
+    if chart_type not in BATCH_CHART_TYPES:
+        raise ValueError(f"chart_type must be one of {sorted(BATCH_CHART_TYPES)}")
+    
+    x = spec.get('x')
+    y = spec.get('y')
+    if x not in df.columns:
+        raise ValueError(f"x column '{x}' not found")
+    if y is not None and y not in df.columns:
+        raise ValueError(f"y column '{y}' not found")
+    if chart_type == 'scatter' and y is None:
+        raise ValueError("scatter charts need a y column")
+    
+    agg = str(spec.get('agg') or ('sum' if y is not None else 'count')).lower()
+    if agg not in BATCH_AGGREGATIONS:
+        raise ValueError(f"agg must be one of {sorted(BATCH_AGGREGATIONS)}")
+    
+    top_n = spec.get('top_n')
+    normalized = {
+        'chart_type': chart_type,
+        'x': x,
+        # Counting rows works on the group column itself
+        'y': y if y is not None else x,
+        'agg': agg,
+        'top_n': int(top_n) if top_n else None,
+    }
+    default_title = (f"{x} Distribution" if chart_type == 'histogram'
+                     else f"{y} vs {x}" if chart_type == 'scatter'
+                     else f"Count by {x}" if y is None
+                     else f"{agg.title()} of {y} by {x}")
+    normalized['title'] = spec.get('title') or default_title
+    return normalized
+
+
+def _shared_aggregations(df: pd.DataFrame, specs: List[Dict]) -> Dict[str, pd.DataFrame]:
+    """
+    Run one groupby per x column covering every (y, agg) pair any spec needs.
+    
+    Returns:
+        Dict mapping x column -> DataFrame with one "<y>__<agg>" column per pair.
+    """
+    needed: Dict[str, Dict[str, tuple]] = {}
+    for spec in specs:
+        if spec['chart_type'] in ('bar', 'line', 'pie'):
+            column = f"{spec['y']}__{spec['agg']}"
+            needed.setdefault(spec['x'], {})[column] = (spec['y'], spec['agg'])
+    
+    return {
+        x: df.groupby(x, sort=False).agg(**named_aggs)
+        for x, named_aggs in needed.items()
+    }
+
+
+def _figure_from_spec(df: pd.DataFrame, spec: Dict, grouped: Dict[str, pd.DataFrame]):
+    chart_type = spec['chart_type']
+    colors = BATCH_COLORS[chart_type]
+    title = spec['title']
+    
+    if chart_type == 'histogram':
+        return px.histogram(df, x=spec['x'], title=title, color_discrete_sequence=colors)
+    if chart_type == 'scatter':
+        return px.scatter(df, x=spec['x'], y=spec['y'], title=title, color_discrete_sequence=colors)
+    
+    column = f"{spec['y']}__{spec['agg']}"
+    series = grouped[spec['x']][column]
+    if chart_type == 'line':
+        series = series.sort_index()
+    else:
+        series = series.sort_values(ascending=False)
+    if spec['top_n']:
+        series = series.head(spec['top_n'])
+    # Row counts group by x itself, so the value column needs its own name
+    value = spec['y'] if spec['y'] != spec['x'] else 'Count'
+    data = series.rename(value).reset_index()
+    
+    if chart_type == 'pie':
+        return px.pie(data, names=spec['x'], values=value, title=title, color_discrete_sequence=colors)
+    if chart_type == 'line':
+        return px.line(data, x=spec['x'], y=value, title=title, color_discrete_sequence=colors)
+    return px.bar(data, x=spec['x'], y=value, title=title, color_discrete_sequence=colors)
+
+
+def render_chart_batch(df: pd.DataFrame, chart_specs: List[Dict], tier: str = 'document') -> List[str]:
+    """
+    Build several charts in one call and render them together.
+    
+    Declarative specs that group by the same column share one groupby, code
+    specs run concurrently in the plot sandbox, and the requested tier of
+    every chart is rendered in a single parallel Kaleido batch.
+    
+    Args:
+        df (pd.DataFrame): The dataframe to chart.
+        chart_specs (List[Dict]): Each spec is either
+            {"chart_type": "bar|line|pie|histogram|scatter", "x": col, "y": col,
+             "agg": "sum|mean|median|count|min|max", "top_n": int, "title": str}
+            or {"code": "<plotly code creating fig>"}.
+        tier (str): Export tier to pre-render (see CHART_TIERS).
+        
+    Returns:
+        List[str]: One "path|CHART_DESC: ..." or "Error ..." entry per spec, in order.
+    """
+    results: List[str] = [""] * len(chart_specs)
+    declarative = []  # (index, normalized spec)
+    code_specs = []  # (index, code)
+    
+    for i, spec in enumerate(chart_specs):
+        if not isinstance(spec, dict):
+            results[i] = f"Error in chart {i + 1}: spec must be an object"
+        elif spec.get('code'):
+            code_specs.append((i, spec['code']))
+        else:
+            try:
+                declarative.append((i, _validate_chart_spec(df, spec)))
+            except ValueError as e:
+                results[i] = f"Error in chart {i + 1}: {e}"
+    
+    # Code snippets go to the sandbox workers concurrently
+    if code_specs:
+        with ThreadPoolExecutor(max_workers=max(1, plot_sandbox.SANDBOX_WORKERS)) as pool:
+            # Each job runs in a copy of this context so charts land in the caller's
+            # session directory and their spans keep the caller's trace
+            futures = [pool.submit(contextvars.copy_context().run, execute_plot_code, df, code)
+                       for _, code in code_specs]
+            for (i, _), future in zip(code_specs, futures):
+                results[i] = future.result()
+    
+    if declarative:
+        output_dir = artifact_store.store.output_dir("graphs")
+        try:
+            grouped = _shared_aggregations(df, [spec for _, spec in declarative])
+        except Exception as e:
+            for i, _ in declarative:
+                results[i] = f"Error in chart {i + 1}: aggregation failed: {e}"
+            declarative = []
+        
+        for i, spec in declarative:
+            try:
+                fig = _figure_from_spec(df, spec, grouped)
+                sampling_note = figure_sampling.downsample_figure(fig)
+                fig.update_layout(
+                    paper_bgcolor='rgba(15, 23, 42, 1)',
+                    plot_bgcolor='rgba(30, 41, 59, 1)',
+                    font=dict(color='#e2e8f0'),
+                    margin=dict(l=60, r=30, t=60, b=60)
+                )
+                file_suffix, label = BATCH_LABELS[spec['chart_type']]
+                clean_title = re.sub(r'[^a-zA-Z0-9\s]', '', spec['title'])
+                clean_title = '_'.join(clean_title.lower().split())[:40]
+                filename = f"{clean_title}_{file_suffix}_{uuid.uuid4().hex[:4]}.png"
+                filepath = os.path.join(output_dir, filename)
+                save_chart(fig, filepath)
+                sampled = f" [sampled: {sampling_note}]" if sampling_note else ""
+                results[i] = f"{filepath}|CHART_DESC: {spec['title']} ({label}){sampled}"
+            except Exception as e:
+                results[i] = f"Error in chart {i + 1}: {e}"
+    
+    # Render the requested tier for every chart in one parallel batch
+    chart_paths = [r.split('|')[0] for r in results if '|CHART_DESC:' in r]
+    if chart_paths:
+        try:
+            render_chart_tiers(chart_paths, tier)
+        except Exception as e:
+            # Specs are stored; tiers will still render lazily on first use
+            logger.warning("Batch render failed, falling back to lazy rendering: %s", e)
+    
+    return results
+
+
+CHART_BATCH_TOOL_DOC = """
+    Generate ALL charts for {target} in ONE call (preferred over {single_tool}).
+    Charts sharing a grouping column are aggregated together and rendered in parallel.
+    
+    Args:
+        chart_specs: List of chart specs, each either
+            {{"chart_type": "bar|line|pie|histogram|scatter", "x": "Column", "y": "Column",
+             "agg": "sum|mean|median|count|min|max", "top_n": 10, "title": "Descriptive Title"}}
+            or {{"code": "fig = {example}(df, ...)"}} for custom charts.
+    
+    Returns:
+        One line per chart with its image path and CHART_DESC, or an error message.
+    """
+
+
+def chart_batch_tool(df: pd.DataFrame, target: str, single_tool: str, example: str = "px.bar"):
+    """
+    Build the batch chart function a report agent exposes as a tool.
+    
+    Args:
+        df (pd.DataFrame): The dataframe to chart.
+        target (str): What the charts are for, e.g. "the PDF report".
+        single_tool (str): Name of the agent's single-chart tool.
+        example (str): Plotly call shown in the custom chart example.
+        
+    Returns:
+        A function of chart_specs whose docstring is the tool description.
+    """
+    def generate_charts(chart_specs: List[dict]) -> str:
+        return "\n".join(render_chart_batch(df, chart_specs))
+    
+    generate_charts.__doc__ = CHART_BATCH_TOOL_DOC.format(target=target, single_tool=single_tool, example=example)
+    return generate_charts
@@ -0,0 +1,197 @@
+"""
+Facts Pack - Compact, cached statistical summary of a dataset for agent prompts
+
+Built once per dataset (keyed by its content fingerprint) and injected into
+the agents' prompts in place of raw sample rows, so the model already knows
+column types, ranges, top categories, correlations and missingness without
+spending tool calls on them. For wide datasets the columns most relevant to
+the query are described first and the rest are trimmed to the token budget.
+"""
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import app_logging
+import data_loader
+import prompt_budget
+from caching import LRUCache
+
+
+logger = app_logging.get_logger(__name__)
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+FACTS_PACK_MAX_TOKENS = int(os.getenv("FACTS_PACK_MAX_TOKENS", "800"))
+TOP_CATEGORIES = 3
+MAX_CORRELATION_COLUMNS = 30
+MAX_CORRELATION_PAIRS = 5
+MIN_CORRELATION = 0.3
+OMITTED_COLUMNS_TOKENS = 120  # budget for the names of columns left out
+
+# Default instruction following the facts in an agent prompt
+FACTS_USAGE = ("Use these facts directly for overall ranges, totals, top categories and\n"
+               "correlations; call data_analysis_tool only for anything they do not cover.")
+
+# dataset fingerprint -> header lines, per-column lines, correlation lines
+_packs = LRUCache(max_size=32, name="facts_packs")
+
+
+def _fmt(value) -> str:
+    """Short human-readable number."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return "n/a"
+    if isinstance(value, (int, np.integer)):
+        return f"{value:,}"
+    if abs(value) >= 1e6 or (value != 0 and abs(value) < 1e-3):
+        return f"{value:.3g}"
+    return f"{value:,.4g}" if abs(value) < 1000 else f"{value:,.0f}"
+
+
+def _missing(series: pd.Series, n_rows: int) -> str:
+    missing = int(series.isna().sum())
+    return f", {missing / n_rows:.0%} missing" if missing and n_rows else ""
+
+
+def _column_fact(name, series: pd.Series, n_rows: int) -> str:
+    """One line describing a column."""
+    missing = _missing(series, n_rows)
+    dtype = series.dtype
+
+    if pd.api.types.is_bool_dtype(dtype):
+        share = series.mean() if len(series.dropna()) else float('nan')
+        return f"- {name} (bool): {_fmt(share * 100)}% true{missing}"
+
+    if pd.api.types.is_numeric_dtype(dtype):
+        values = series.dropna()
+        if values.empty:
+            return f"- {name} ({dtype}): all missing"
+        return (f"- {name} ({dtype}): min {_fmt(values.min())}, median {_fmt(values.median())}, "
+                f"mean {_fmt(values.mean())}, max {_fmt(values.max())}, sum {_fmt(values.sum())}{missing}")
+
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        values = series.dropna()
+        if values.empty:
+            return f"- {name} (datetime): all missing"
+        return f"- {name} (datetime): {values.min():%Y-%m-%d} to {values.max():%Y-%m-%d}{missing}"
+
+    # Text / categorical
+    counts = series.value_counts(dropna=True)
+    unique = len(counts)
+    if unique == 0:
+        return f"- {name} (text): all missing"
+    top = ", ".join(f"{str(value)[:30]} ({count:,})" for value, count in counts.head(TOP_CATEGORIES).items())
+    kind = "id-like text" if unique == n_rows - series.isna().sum() and unique > 20 else "category"
+    return f"- {name} ({kind}): {unique:,} unique; top {top}{missing}"
+
+
+def _correlation_facts(df: pd.DataFrame) -> List[str]:
+    numeric = df.select_dtypes(include=['number']).iloc[:, :MAX_CORRELATION_COLUMNS]
+    if numeric.shape[1] < 2:
+        return []
+    corr = numeric.corr(numeric_only=True)
+    values = corr.to_numpy()
+    upper = np.triu_indices_from(values, k=1)
+    pairs = [(abs(values[i, j]), corr.index[i], corr.columns[j], values[i, j])
+             for i, j in zip(*upper) if not np.isnan(values[i, j])]
+    pairs = [p for p in pairs if p[0] >= MIN_CORRELATION]
+    pairs.sort(key=lambda p: p[0], reverse=True)
+    return [f"- {a} ~ {b}: r = {r:+.2f}" for _, a, b, r in pairs[:MAX_CORRELATION_PAIRS]]
+
+
+def _dataset_facts(df: pd.DataFrame) -> Dict:
+    """Per-dataset facts, computed once and cached on the content fingerprint."""
+    key = data_loader.dataset_fingerprint(df)
+    facts = _packs.get(key)
+    if facts is not None:
+        return facts
+
+    n_rows, n_cols = df.shape
+    n_numeric = len(df.select_dtypes(include=['number']).columns)
+    n_categorical = len(df.select_dtypes(include=['object', 'category', 'string']).columns)
+    n_datetime = len(df.select_dtypes(include=['datetime']).columns)
+    facts = {
+        'header': [
+            f"Rows: {n_rows:,} | Columns: {n_cols} ({n_numeric} numeric, {n_categorical} categorical, "
+            f"{n_datetime} datetime)",
+            f"Columns with missing values: {int(df.isna().any().sum())}",
+        ],
+        'columns': {name: _column_fact(name, series, n_rows) for name, series in df.items()},
+        'correlations': _correlation_facts(df),
+    }
+    _packs.put(key, facts)
+    logger.debug("Built facts for dataset %s (%d columns)", key, n_cols)
+    return facts
+
+
+def build_facts_pack(df: pd.DataFrame, query: Optional[str] = None,
+                     max_tokens: int = FACTS_PACK_MAX_TOKENS) -> str:
+    """
+    Summarize a DataFrame into a prompt-sized block of facts.
+
+    Columns whose names match the query are described first; columns that
+    do not fit the budget are listed by name only, and past that counted.
+
+    Args:
+        df (pd.DataFrame): The loaded data.
+        query (str): The user's request, used to rank columns (optional).
+        max_tokens (int): Token budget for the whole pack.
+
+    Returns:
+        str: Multi-line facts pack.
+    """
+    facts = _dataset_facts(df)
+    header = facts['header'] + ["Column facts:"]
+    footer = (["Strongest correlations:"] + facts['correlations']) if facts['correlations'] else []
+
+    ordered = prompt_budget.rank_columns(list(facts['columns']), query)
+    fixed_tokens = prompt_budget.count_tokens("\n".join(header + footer))
+    # Keep room for the line naming the columns left out
+    column_budget = max_tokens - fixed_tokens - OMITTED_COLUMNS_TOKENS
+    column_lines, dropped = prompt_budget.fit_lines((facts['columns'][name] for name in ordered),
+                                                    column_budget)
+    if dropped:
+        column_budget += OMITTED_COLUMNS_TOKENS
+        used = prompt_budget.count_tokens("\n".join(column_lines)) + 1
+        column_lines.append(prompt_budget.summarize_names(
+            "- Other columns (ask data_analysis_tool)", ordered[-dropped:], max(column_budget - used, 0)))
+
+    return "\n".join(header + column_lines + footer)
+
+
+def get_facts_pack(df: pd.DataFrame, query: Optional[str] = None) -> str:
+    """
+    Facts pack for a dataset and query, within FACTS_PACK_MAX_TOKENS.
+
+    The statistics are cached per dataset fingerprint; only the query-specific
+    column ordering and trimming happen per call.
+
+    Args:
+        df (pd.DataFrame): The loaded data.
+        query (str): The user's request (optional).
+
+    Returns:
+        str: The facts pack (see build_facts_pack).
+    """
+    return build_facts_pack(df, query)
+
+
+def prompt_section(df: pd.DataFrame, query: Optional[str] = None, usage: str = FACTS_USAGE) -> Tuple[str, int]:
+    """
+    The "uploaded data" section of an agent's per-request prompt.
+
+    Statistics are cached per dataset; columns matching the query come first.
+
+    Args:
+        df (pd.DataFrame): The loaded data.
+        query (str): The user's request (optional).
+        usage (str): Instruction placed after the facts.
+
+    Returns:
+        (section text, tokens taken by the facts pack) - the count is for prompt size logging.
+    """
+    facts = get_facts_pack(df, query)
+    return f"The user has uploaded data with:\n{facts}\n\n{usage}", prompt_budget.count_tokens(facts)
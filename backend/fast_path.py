@@ -0,0 +1,221 @@
+"""
+Fast Path - Deterministic answers for simple aggregation questions
+
+Questions such as "how many rows", "average Price" or "top 5 Category by
+Stock" are a single pandas expression. They are parsed here and answered
+directly, skipping the agent loop and its model calls. Anything the parser
+is not certain about (unknown or ambiguous columns, extra words, non-numeric
+targets) returns None and goes to the agent as before.
+"""
+import os
+import re
+from typing import Dict, Optional
+
+import pandas as pd
+
+import app_logging
+import prompt_budget
+
+logger = app_logging.get_logger(__name__)
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "1") == "1"
+MAX_GROUPS_SHOWN = 15
+DEFAULT_TOP_N = 5
+
+AGGREGATIONS = {
+    'average': 'mean', 'avg': 'mean', 'mean': 'mean',
+    'sum': 'sum', 'total': 'sum',
+    'minimum': 'min', 'min': 'min', 'lowest': 'min', 'smallest': 'min',
+    'maximum': 'max', 'max': 'max', 'highest': 'max', 'largest': 'max',
+    'median': 'median',
+}
+AGGREGATION_LABELS = {'mean': 'Average', 'sum': 'Total', 'min': 'Minimum', 'max': 'Maximum',
+                      'median': 'Median'}
+
+_AGG_WORDS = '|'.join(sorted(AGGREGATIONS, key=len, reverse=True))
+
+# Politeness and filler around the question itself
+_PREFIX_PATTERN = re.compile(
+    r"^(?:(?:please|can you|could you|tell me|show me|give me|show|list|find|calculate|compute|"
+    r"what is|what's|what are|whats)\s+)+")
+_SUFFIX_PATTERN = re.compile(
+    r"\s+(?:(?:are there|is there|do we have|does (?:the|this) (?:data|dataset|file) have|"
+    r"(?:in|of) (?:the|this|my) (?:data|dataset|file|table))\s*)+$")
+
+_ROWS_PATTERN = re.compile(
+    r"(?:how many|number of|count of|total number of|total) (?P<what>rows|records|entries|columns|fields)"
+    r"|(?P<what2>row|column) count")
+_UNIQUE_PATTERN = re.compile(
+    r"(?:how many|number of|count of) (?:unique|distinct|different) (?P<col>.+)")
+_AGG_PATTERN = re.compile(
+    rf"(?:the )?(?P<agg>{_AGG_WORDS}) (?:of )?(?:the )?(?P<col>.+?)"
+    r"(?: (?:by|per|for each|across|grouped by) (?:each )?(?P<group>.+))?")
+_TOP_PATTERN = re.compile(
+    r"(?:the )?(?P<dir>top|bottom) (?:(?P<n>\d+) )?(?P<col>.+?)"
+    rf"(?: by (?:(?P<agg>{_AGG_WORDS}) )?(?P<metric>.+))?")
+
+
+def _key(text: str) -> str:
+    return ' '.join(prompt_budget.stem_word(w) for w in re.findall(r'[a-z0-9]+', str(text).lower()))
+
+
+def _format_number(value) -> str:
+    if pd.isna(value):
+        return "n/a"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return f"{int(value):,}"
+    return f"{value:,.2f}"
+
+
+class FastPath:
+    """
+    Answers simple aggregation questions directly from a DataFrame.
+
+    Keeps hit/miss counts so the share of queries served without the
+    agent can be reported.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        # The text-only placeholder frame has nothing to aggregate
+        self.enabled = FAST_PATH_ENABLED and not (len(df) <= 1 and 'info' in df.columns)
+        self.hits = 0
+        self.misses = 0
+
+        # Normalized name -> column; names that normalize identically are ambiguous
+        self._columns: Dict[str, Optional[str]] = {}
+        for column in df.columns:
+            key = _key(column)
+            self._columns[key] = None if key in self._columns else column
+
+    def _resolve(self, text: Optional[str]) -> Optional[str]:
+        """Map a phrase to exactly one column, or None."""
+        if not text:
+            return None
+        text = text.strip().strip('"\'`')
+        text = re.sub(r'^(?:the |each )|(?: column| field| values?)$', '', text)
+        return self._columns.get(_key(text))
+
+    def _normalize(self, query: str) -> str:
+        text = ' '.join(query.lower().strip().rstrip('?.!').split())
+        text = _PREFIX_PATTERN.sub('', text)
+        return _SUFFIX_PATTERN.sub('', text).strip()
+
+    # ------------------------------------------------------------------------
+    # Intents
+    # ------------------------------------------------------------------------
+    def _count_rows(self, match) -> str:
+        what = match.group('what') or match.group('what2')
+        if what.startswith(('column', 'field')):
+            return f"The dataset has **{len(self.df.columns):,} columns**."
+        return f"The dataset has **{len(self.df):,} rows**."
+
+    def _count_unique(self, match) -> Optional[str]:
+        column = self._resolve(match.group('col'))
+        if column is None:
+            return None
+        return f"**{column}** has **{self.df[column].nunique():,}** unique values."
+
+    def _aggregate(self, match) -> Optional[str]:
+        column = self._resolve(match.group('col'))
+        if column is None or not pd.api.types.is_numeric_dtype(self.df[column]):
+            return None
+        agg = AGGREGATIONS[match.group('agg')]
+        label = AGGREGATION_LABELS[agg]
+
+        if match.group('group') is None:
+            value = getattr(self.df[column], agg)()
+            return f"{label} **{column}**: **{_format_number(value)}**"
+
+        group = self._resolve(match.group('group'))
+        if group is None or group == column:
+            return None
+        grouped = self.df.groupby(group, observed=True)[column].agg(agg).sort_values(ascending=False)
+        return self._format_groups(f"{label} {column} by {group}", grouped)
+
+    def _top(self, match) -> Optional[str]:
+        column = self._resolve(match.group('col'))
+        if column is None:
+            return None
+        n = int(match.group('n') or DEFAULT_TOP_N)
+        if n <= 0:
+            return None
+        ascending = match.group('dir') == 'bottom'
+        direction = "Bottom" if ascending else "Top"
+
+        if match.group('metric') is None:
+            # "top 5 Category": most frequent values of a categorical column
+            if pd.api.types.is_numeric_dtype(self.df[column]):
+                return None
+            counts = self.df[column].value_counts()
+            counts = counts.sort_values(ascending=ascending, kind='stable').head(n)
+            return self._format_groups(f"{direction} {len(counts)} {column} by count", counts, limit=n)
+
+        metric = self._resolve(match.group('metric'))
+        if metric is None or metric == column or not pd.api.types.is_numeric_dtype(self.df[metric]):
+            return None
+        agg = AGGREGATIONS[match.group('agg')] if match.group('agg') else 'sum'
+        grouped = self.df.groupby(column, observed=True)[metric].agg(agg)
+        grouped = grouped.sort_values(ascending=ascending, kind='stable').head(n)
+        title = f"{direction} {len(grouped)} {column} by {AGGREGATION_LABELS[agg].lower()} {metric}"
+        return self._format_groups(title, grouped, limit=n)
+
+    def _format_groups(self, title: str, values: pd.Series, limit: int = MAX_GROUPS_SHOWN) -> str:
+        lines = [f"**{title}:**", ""]
+        lines += [f"- {name}: {_format_number(value)}" for name, value in values.head(limit).items()]
+        if len(values) > limit:
+            lines.append(f"- ... {len(values) - limit} more groups")
+        return "\n".join(lines)
+
+    # ------------------------------------------------------------------------
+    # Entry point
+    # ------------------------------------------------------------------------
+    def try_answer(self, query: str) -> Optional[str]:
+        """
+        Answer a query directly if it is a simple aggregation.
+
+        Args:
+            query: The user's question
+
+        Returns:
+            Optional[str]: Markdown answer, or None to hand the query to the agent
+        """
+        if not self.enabled or not query or len(query) > 200:
+            return None
+
+        text = self._normalize(query)
+        answer = None
+        try:
+            for pattern, handler in ((_ROWS_PATTERN, self._count_rows),
+                                     (_UNIQUE_PATTERN, self._count_unique),
+                                     (_TOP_PATTERN, self._top),
+                                     (_AGG_PATTERN, self._aggregate)):
+                match = pattern.fullmatch(text)
+                if match:
+                    answer = handler(match)
+                    break
+        except Exception as e:
+            logger.warning("Fast path failed, using the agent instead: %s", e)
+            answer = None
+
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            logger.debug("Fast path answered %r (%d/%d queries without the agent)",
+                         query[:60], self.hits, self.hits + self.misses, extra=app_logging.SAMPLED)
+        return answer
+
+    def get_stats(self) -> dict:
+        """Get fast path usage statistics."""
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total > 0 else 0,
+        }
@@ -0,0 +1,341 @@
+"""
+Figure Sampling - Pre-render decimation for Plotly figures built on large frames
+
+Runs on a finished figure just before export and shrinks oversized traces:
+- Scatter (markers): random sampling, stratified across traces so every
+  colour group keeps its share of the points
+- Lines: Largest-Triangle-Three-Buckets (LTTB), which keeps the visual shape
+- Histograms: binned server-side and replaced by a bar trace of counts,
+  honouring nbins, histnorm and cumulative (explicit bins are left alone)
+"""
+import os
+import re
+import base64
+from typing import List, Optional
+
+import numpy as np
+import plotly.graph_objects as go
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+MAX_SCATTER_POINTS = int(os.getenv("PLOT_MAX_SCATTER_POINTS", "20000"))
+MAX_LINE_POINTS = int(os.getenv("PLOT_MAX_LINE_POINTS", "4000"))
+MAX_HISTOGRAM_VALUES = int(os.getenv("PLOT_MAX_HISTOGRAM_VALUES", "100000"))
+HISTOGRAM_BINS = int(os.getenv("PLOT_HISTOGRAM_BINS", "50"))
+
+# Marks bar traces that replaced a histogram, so callers can still label them
+BINNED_HISTOGRAM_META = "binned_histogram"
+
+# Figures that went through JSON carry dates as ISO strings
+ISO_DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}')
+
+# Per-point trace attributes that must be subset together with x/y
+POINT_ATTRIBUTES = ('x', 'y', 'text', 'hovertext', 'customdata', 'ids')
+MARKER_ATTRIBUTES = ('color', 'size', 'symbol', 'opacity')
+
+
+def _as_array(value) -> Optional[np.ndarray]:
+    """Decode a trace data attribute (list, ndarray or Plotly typed array)."""
+    if value is None:
+        return None
+    if isinstance(value, dict) and 'bdata' in value:
+        arr = np.frombuffer(base64.b64decode(value['bdata']), dtype=np.dtype(value['dtype']))
+        if value.get('shape'):
+            shape = [int(dim) for dim in str(value['shape']).split(',')]
+            arr = arr.reshape(shape)
+        return arr
+    if isinstance(value, (str, bytes)):
+        return None
+    try:
+        return np.asarray(value)
+    except Exception:
+        return None
+
+
+def _coerce_dates(values: np.ndarray) -> np.ndarray:
+    """Turn ISO date strings back into datetime64 so they bin and order numerically."""
+    if values.dtype.kind in 'OU' and len(values) and ISO_DATE_PATTERN.match(str(values[0])):
+        try:
+            return values.astype('datetime64[ns]')
+        except (ValueError, TypeError):
+            pass
+    return values
+
+
+def _point_count(trace) -> int:
+    for attr in ('x', 'y'):
+        arr = _as_array(getattr(trace, attr, None))
+        if arr is not None and arr.ndim >= 1:
+            return len(arr)
+    return 0
+
+
+def _subset_trace(trace, indices: np.ndarray, n_points: int) -> None:
+    """Keep only the given point indices in every per-point attribute."""
+    for attr in POINT_ATTRIBUTES:
+        arr = _as_array(getattr(trace, attr, None))
+        if arr is not None and arr.ndim >= 1 and len(arr) == n_points:
+            setattr(trace, attr, arr[indices])
+
+    marker = getattr(trace, 'marker', None)
+    if marker is not None:
+        for attr in MARKER_ATTRIBUTES:
+            arr = _as_array(getattr(marker, attr, None))
+            if arr is not None and arr.ndim >= 1 and len(arr) == n_points:
+                setattr(marker, attr, arr[indices])
+
+
+def _numeric_axis(values: np.ndarray) -> np.ndarray:
+    """Map x values to floats for LTTB; categories fall back to their position."""
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]').astype(np.int64).astype(float)
+    if np.issubdtype(values.dtype, np.number):
+        return values.astype(float)
+    return np.arange(len(values), dtype=float)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Select n_out point indices with Largest-Triangle-Three-Buckets.
+
+    Args:
+        x: Numeric x values (monotonic for best results)
+        y: Numeric y values
+        n_out: Number of points to keep (>= 3)
+
+    Returns:
+        np.ndarray: Sorted indices of the kept points.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bucket edges for the n - 2 interior points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket is the third triangle vertex
+        next_start = end
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        bucket_x = x[start:end]
+        bucket_y = y[start:end]
+        areas = np.abs(
+            (x[prev] - avg_x) * (bucket_y - y[prev])
+            - (x[prev] - bucket_x) * (avg_y - y[prev])
+        )
+        prev = start + int(np.nanargmax(areas)) if len(areas) and not np.all(np.isnan(areas)) else start
+        indices[i + 1] = prev
+
+    return indices
+
+
+def _is_line_trace(trace) -> bool:
+    mode = getattr(trace, 'mode', None)
+    if mode is None:
+        # Plotly draws lines by default once a trace has 20+ points
+        return True
+    return 'lines' in mode
+
+
+def _sample_scatter(traces: List, rng: np.random.Generator) -> Optional[str]:
+    """Stratified random sampling across marker traces."""
+    counts = [_point_count(trace) for trace in traces]
+    total = sum(counts)
+    if total <= MAX_SCATTER_POINTS:
+        return None
+
+    fraction = MAX_SCATTER_POINTS / total
+    kept = 0
+    for trace, n_points in zip(traces, counts):
+        if n_points == 0:
+            continue
+        keep = max(1, int(round(n_points * fraction)))
+        indices = np.sort(rng.choice(n_points, size=keep, replace=False))
+        _subset_trace(trace, indices, n_points)
+        kept += keep
+    return f"random sample of {kept:,} of {total:,} points"
+
+
+def _decimate_line(trace) -> Optional[str]:
+    n_points = _point_count(trace)
+    if n_points <= MAX_LINE_POINTS:
+        return None
+
+    x = _as_array(trace.x)
+    y = _as_array(trace.y)
+    if y is None or not np.issubdtype(y.dtype, np.number):
+        return None
+    x_numeric = _numeric_axis(_coerce_dates(x)) if x is not None else np.arange(n_points, dtype=float)
+
+    indices = lttb_indices(x_numeric, y.astype(float), MAX_LINE_POINTS)
+    _subset_trace(trace, indices, n_points)
+    return f"line decimated to {len(indices):,} of {n_points:,} points (LTTB)"
+
+
+def _histogram_values(trace) -> Optional[np.ndarray]:
+    """
+    Raw values of a count histogram that can be binned server-side, or None.
+
+    Histograms with a histfunc, explicit bins, or a cumulative mode the bars
+    cannot reproduce (decreasing, partial current bin, or cumulative density)
+    are left for Plotly to bin.
+    """
+    if trace.histfunc not in (None, 'count') or (trace.x is not None and trace.y is not None):
+        return None
+    bins = trace.ybins if trace.x is None else trace.xbins
+    if any(value is not None for value in (bins.start, bins.end, bins.size)):
+        return None
+    cumulative = trace.cumulative
+    if cumulative.enabled and (cumulative.direction not in (None, 'increasing')
+                               or cumulative.currentbin not in (None, 'include')
+                               or 'density' in (trace.histnorm or '')):
+        return None
+    values = _as_array(trace.y if trace.x is None else trace.x)
+    return _coerce_dates(values) if values is not None else None
+
+
+def _histogram_heights(trace, counts: np.ndarray, widths: Optional[np.ndarray]) -> np.ndarray:
+    """Apply the trace's histnorm and cumulative settings to raw bin counts."""
+    heights = counts.astype(float)
+    total = heights.sum() or 1.0
+    histnorm = trace.histnorm or ''
+    if histnorm == 'percent':
+        heights = heights * 100 / total
+    elif histnorm == 'probability':
+        heights = heights / total
+    elif histnorm == 'density':
+        heights = heights / widths
+    elif histnorm == 'probability density':
+        heights = heights / (total * widths)
+    if trace.cumulative.enabled:
+        heights = np.cumsum(heights)
+    return heights
+
+
+def _bin_histograms(fig) -> Optional[str]:
+    """Replace large count histograms with pre-binned bars sharing one set of bins."""
+    candidates = []
+    for i, trace in enumerate(fig.data):
+        if trace.type == 'histogram':
+            values = _histogram_values(trace)
+            if values is not None:
+                candidates.append((i, trace, values))
+
+    total = sum(len(values) for _, _, values in candidates)
+    if total <= MAX_HISTOGRAM_VALUES:
+        return None
+
+    is_datetime = all(np.issubdtype(v.dtype, np.datetime64) for _, _, v in candidates)
+    is_numeric = is_datetime or all(np.issubdtype(v.dtype, np.number) for _, _, v in candidates)
+
+    edges = None
+    if is_numeric:
+        # Shared edges keep stacked/overlaid colour groups aligned
+        numeric = [_numeric_axis(v) for _, _, v in candidates]
+        finite = np.concatenate([v[np.isfinite(v)] for v in numeric])
+        # nbins from px.histogram(nbins=...) is the same on every colour group
+        requested = [trace.nbinsy if trace.x is None else trace.nbinsx for _, trace, _ in candidates]
+        bins = next((n for n in requested if n), HISTOGRAM_BINS)
+        edges = np.histogram_bin_edges(finite, bins=bins)
+    elif any(trace.cumulative.enabled or 'density' in (trace.histnorm or '') for _, trace, _ in candidates):
+        # Category order and widths are Plotly's to decide
+        return None
+
+    data = list(fig.data)
+    categories = set()
+    for (i, trace, values) in candidates:
+        if edges is not None:
+            numeric = _numeric_axis(values)
+            counts, _ = np.histogram(numeric[np.isfinite(numeric)], bins=edges)
+            centers = (edges[:-1] + edges[1:]) / 2
+            if is_datetime:
+                centers = centers.astype(np.int64).astype('datetime64[ns]')
+            widths = np.diff(edges)
+            counts = _histogram_heights(trace, counts, widths)
+            # Date axes measure bar width in milliseconds, edges are in ns
+            bars = go.Bar(width=widths / 1e6 if is_datetime else widths)
+        else:
+            centers, counts = np.unique(values.astype(str), return_counts=True)
+            counts = _histogram_heights(trace, counts, None)
+            categories.update(centers.tolist())
+            bars = go.Bar()
+
+        if trace.x is None:
+            bars.update(y=centers, x=counts, orientation='h')
+        else:
+            bars.update(x=centers, y=counts)
+        bars.update(
+            name=trace.name,
+            marker=trace.marker.to_plotly_json(),
+            legendgroup=trace.legendgroup,
+            showlegend=trace.showlegend,
+            xaxis=trace.xaxis,
+            yaxis=trace.yaxis,
+            opacity=trace.opacity,
+            meta=BINNED_HISTOGRAM_META,
+        )
+        data[i] = bars
+
+    # Traces cannot be swapped in place, so rebuild the trace list in order
+    fig.data = ()
+    fig.add_traces(data)
+    fig.update_layout(bargap=0)
+    if edges is not None:
+        return f"{total:,} values binned into {len(edges) - 1} bins"
+    return f"{total:,} values counted into {len(categories)} categories"
+
+
+def downsample_figure(fig, seed: int = 0) -> Optional[str]:
+    """
+    Shrink oversized traces in place before the figure is rendered.
+
+    Args:
+        fig: The Plotly figure to inspect
+        seed: Random seed so repeated renders pick the same sample
+
+    Returns:
+        str: Human-readable note describing the sampling applied, or None
+             if the figure was small enough to render as-is.
+    """
+    notes = []
+    rng = np.random.default_rng(seed)
+
+    marker_traces = []
+    for trace in fig.data:
+        if trace.type in ('scatter', 'scattergl'):
+            if _is_line_trace(trace):
+                note = _decimate_line(trace)
+                if note:
+                    notes.append(note)
+            else:
+                marker_traces.append(trace)
+
+    note = _sample_scatter(marker_traces, rng)
+    if note:
+        notes.append(note)
+
+    note = _bin_histograms(fig)
+    if note:
+        notes.append(note)
+
+    if not notes:
+        return None
+
+    summary = "; ".join(notes)
+    fig.add_annotation(
+        text=f"Sampled: {summary}",
+        xref="paper", yref="paper", x=1, y=-0.12,
+        xanchor="right", yanchor="top", showarrow=False,
+        font=dict(size=10, color='#94a3b8')
+    )
+    return summary
@@ -0,0 +1,217 @@
+"""
+Image Cache - Page-sized, recompressed copies of chart images for PDF/PPT embedding
+
+Charts are exported at screen resolution, far more than a printed page needs.
+Documents embed a resampled JPEG instead, stored once per (source content,
+target width) under outputs/image_cache so the same chart used in a PDF and
+a PPT, or in several reports, is only decoded and recompressed once.
+Missing copies for a whole document can be prepared up front in a process pool.
+"""
+import os
+import uuid
+import atexit
+import hashlib
+import threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from PIL import Image
+
+import app_logging
+from caching import LRUCache
+
+
+logger = app_logging.get_logger(__name__)
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(os.getcwd(), "outputs", "image_cache"))
+IMAGE_CACHE_MAX_FILES = int(os.getenv("IMAGE_CACHE_MAX_FILES", "512"))
+EMBED_IMAGE_QUALITY = int(os.getenv("EMBED_IMAGE_QUALITY", "85"))
+IMAGE_PREP_WORKERS = int(os.getenv("IMAGE_PREP_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+BACKGROUND_COLOR = (255, 255, 255)
+
+# (path, mtime, size) -> content hash, and (content hash, width) -> cached file
+_source_hashes = LRUCache(max_size=1024, name="image_source_hashes")
+_embedded = LRUCache(max_size=1024, name="embedded_images")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _source_hash(img_path: str) -> str:
+    """Content hash of an image, memoized on its path, mtime and size."""
+    stat = os.stat(img_path)
+    stamp = (os.path.realpath(img_path), stat.st_mtime_ns, stat.st_size)
+    digest = _source_hashes.get(stamp)
+    if digest is None:
+        sha = hashlib.sha1()
+        with open(img_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        _source_hashes.put(stamp, digest)
+    return digest
+
+
+def _resample(img_path: str, target_px: int, output_path: str) -> None:
+    """Write img_path scaled down to target_px wide as a flattened RGB JPEG."""
+    with Image.open(img_path) as img:
+        img.draft('RGB', (target_px, target_px))
+        if img.width > target_px:
+            height = max(1, int(round(img.height * target_px / img.width)))
+            img = img.resize((target_px, height), Image.LANCZOS)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, BACKGROUND_COLOR)
+            background.paste(img, mask=img.getchannel('A'))
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        # Write under a temporary name so concurrent readers never see a partial file
+        tmp_path = f"{output_path}.{uuid.uuid4().hex[:6]}.tmp"
+        img.save(tmp_path, 'JPEG', quality=EMBED_IMAGE_QUALITY, optimize=True)
+    os.replace(tmp_path, output_path)
+
+
+def _prune() -> None:
+    """Drop the oldest cached files once the directory exceeds IMAGE_CACHE_MAX_FILES."""
+    try:
+        entries = [e for e in os.scandir(IMAGE_CACHE_DIR) if e.name.endswith('.jpg')]
+    except FileNotFoundError:
+        return
+    excess = len(entries) - IMAGE_CACHE_MAX_FILES
+    if excess <= 0:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for entry in entries[:excess]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+    _embedded.clear()
+
+
+def get_embeddable_image(img_path: str, width_inches: float, dpi: int) -> str:
+    """
+    Get a copy of an image sized for embedding at the given print width.
+
+    Args:
+        img_path: Source image (any format Pillow reads)
+        width_inches: Width the image occupies on the page or slide
+        dpi: Target resolution at that width
+
+    Returns:
+        str: Path to the cached JPEG. Images already narrower than the
+             target are only recompressed, never upscaled.
+    """
+    key, output_path, ready = _lookup(img_path, width_inches, dpi)
+    if not ready:
+        _resample(img_path, key[1], output_path)
+        _prune()
+        logger.debug("Cached %dpx embed copy of %s", key[1], os.path.basename(img_path), extra=app_logging.SAMPLED)
+    _embedded.put(key, output_path)
+    return output_path
+
+
+def _lookup(img_path: str, width_inches: float, dpi: int) -> Tuple[Tuple[str, int], str, bool]:
+    """Return (cache key, cached file path, whether that file already exists)."""
+    target_px = int(round(width_inches * dpi))
+    key: Tuple[str, int] = (_source_hash(img_path), target_px)
+
+    cached = _embedded.get(key)
+    if cached and os.path.exists(cached):
+        return key, cached, True
+
+    os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+    output_path = os.path.join(IMAGE_CACHE_DIR, f"{key[0][:20]}_{target_px}.jpg")
+    return key, output_path, os.path.exists(output_path)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned workers only import this module, not the server
+            _pool = ProcessPoolExecutor(max_workers=IMAGE_PREP_WORKERS, mp_context=mp.get_context("spawn"))
+        return _pool
+
+
+def prefetch_embeddable_images(img_paths: List[str], width_inches: float, dpi: int) -> List[Optional[str]]:
+    """
+    Prepare embed copies for a whole document before it is laid out.
+
+    Images are decoded and resized in a process pool, so later
+    get_embeddable_image calls for the same paths are cache hits.
+
+    Args:
+        img_paths: Source images, in document order
+        width_inches: Width each image occupies on the page or slide
+        dpi: Target resolution at that width
+
+    Returns:
+        List[Optional[str]]: Cached copy per input, in order; None where
+        preparation failed (the caller's own embed call reports the error).
+    """
+    results: List[Optional[str]] = [None] * len(img_paths)
+    pending = {}  # output path -> (key, [result indices], source path)
+    for i, img_path in enumerate(img_paths):
+        try:
+            key, output_path, ready = _lookup(img_path, width_inches, dpi)
+        except OSError:
+            continue
+        if ready:
+            _embedded.put(key, output_path)
+            results[i] = output_path
+        else:
+            pending.setdefault(output_path, (key, [], img_path))[1].append(i)
+
+    if len(pending) > 1 and IMAGE_PREP_WORKERS > 1:
+        pool = _get_pool()
+        futures = {output_path: pool.submit(_resample, source, key[1], output_path)
+                   for output_path, (key, _, source) in pending.items()}
+    else:
+        futures = None
+
+    for output_path, (key, indices, source) in pending.items():
+        try:
+            if futures is not None:
+                futures[output_path].result()
+            else:
+                _resample(source, key[1], output_path)
+        except Exception as e:
+            logger.warning("Could not prepare %s for embedding: %s", os.path.basename(source), e)
+            continue
+        _embedded.put(key, output_path)
+        for i in indices:
+            results[i] = output_path
+
+    if pending:
+        _prune()
+        logger.debug("Prepared %d embed copies at %dpx", len(pending), int(round(width_inches * dpi)))
+    return results
+
+
+def shutdown() -> None:
+    """Stop the image preparation workers."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def get_stats() -> dict:
+    """Get statistics about the embed cache."""
+    return {
+        "embedded": _embedded.get_stats(),
+        "source_hashes": _source_hashes.get_stats(),
+    }
+
+
+atexit.register(shutdown)
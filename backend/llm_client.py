@@ -0,0 +1,179 @@
+"""
+LLM Client - One process-wide, connection-pooled LLM shared by all sessions
+
+Every upload used to build its own Groq client, so each session paid for new
+TCP connections and TLS handshakes. The LLM returned here wraps shared httpx
+clients (HTTP/2 when available, bounded pool, keep-alive, shared rate
+limiter), and is reused by every session and specialized agent in the process.
+
+The backend is chosen with LLM_PROVIDER:
+- groq: Groq's OpenAI-compatible API (default)
+- openai: any OpenAI-compatible endpoint at LLM_API_BASE (vLLM, Ollama, ...)
+- mock: the offline scripted model in mock_llm, for load tests
+"""
+import os
+import threading
+from typing import Optional
+
+import httpx
+from llama_index.core.llms.function_calling import FunctionCallingLLM
+from llama_index.llms.groq import Groq
+from llama_index.llms.openai_like import OpenAILike
+
+import rate_limiter
+import app_logging
+
+logger = app_logging.get_logger(__name__)
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq").lower()
+LLM_MODEL = os.getenv("LLM_MODEL", "openai/gpt-oss-20b")  # Fine-tuned for function calling
+LLM_API_BASE = os.getenv("LLM_API_BASE", "https://api.groq.com/openai/v1")
+LLM_CONTEXT_WINDOW = int(os.getenv("LLM_CONTEXT_WINDOW", "131072"))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "90"))
+# Retries of connection errors, timeouts and 5xx responses; 429s have their own budget
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "120"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "1") == "1"
+
+_lock = threading.Lock()
+_llm: Optional[FunctionCallingLLM] = None
+_llm_key: Optional[tuple] = None
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional 'h2' package (pip install httpx[http2])."""
+    if not LLM_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _transport_options() -> dict:
+    return {
+        "http2": _http2_available(),
+        "limits": httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+        ),
+    }
+
+
+def get_http_clients():
+    """
+    Get the shared (sync, async) httpx clients, creating them on first use.
+
+    The sync client serves tools that call the LLM from worker threads
+    (PandasQueryEngine); the async client serves the agents themselves.
+    Both admit requests through the shared rate limiter, which also retries
+    failed requests, so the SDK clients built on them must not retry.
+    """
+    global _http_client, _async_http_client
+    timeout = httpx.Timeout(LLM_REQUEST_TIMEOUT, connect=10.0)
+    with _lock:
+        if _http_client is None or _http_client.is_closed:
+            transport = rate_limiter.RateLimitedTransport(
+                httpx.HTTPTransport(**_transport_options()), max_retries=LLM_MAX_RETRIES)
+            _http_client = httpx.Client(transport=transport, timeout=timeout)
+        if _async_http_client is None or _async_http_client.is_closed:
+            transport = rate_limiter.RateLimitedAsyncTransport(
+                httpx.AsyncHTTPTransport(**_transport_options()), max_retries=LLM_MAX_RETRIES)
+            _async_http_client = httpx.AsyncClient(transport=transport, timeout=timeout)
+        return _http_client, _async_http_client
+
+
+def _create_groq(api_key: Optional[str]) -> FunctionCallingLLM:
+    http_client, async_http_client = get_http_clients()
+    return Groq(
+        model=LLM_MODEL,
+        api_key=api_key or os.getenv("GROQ_API_KEY"),
+        api_base=LLM_API_BASE,
+        timeout=LLM_REQUEST_TIMEOUT,
+        max_retries=0,  # the rate-limited transport does all retries
+        http_client=http_client,
+        async_http_client=async_http_client,
+    )
+
+
+def _create_openai_compatible(api_key: Optional[str]) -> FunctionCallingLLM:
+    http_client, async_http_client = get_http_clients()
+    return OpenAILike(
+        model=LLM_MODEL,
+        api_key=api_key or os.getenv("LLM_API_KEY", "none"),
+        api_base=LLM_API_BASE,
+        context_window=LLM_CONTEXT_WINDOW,
+        is_chat_model=True,
+        is_function_calling_model=True,
+        timeout=LLM_REQUEST_TIMEOUT,
+        max_retries=0,  # the rate-limited transport does all retries
+        http_client=http_client,
+        async_http_client=async_http_client,
+    )
+
+
+def _create_mock(api_key: Optional[str]) -> FunctionCallingLLM:
+    from mock_llm import ScriptedMockLLM
+    return ScriptedMockLLM()
+
+
+PROVIDERS = {
+    "groq": _create_groq,
+    "openai": _create_openai_compatible,
+    "mock": _create_mock,
+}
+
+
+def requires_api_key() -> bool:
+    """Whether the configured provider needs GROQ_API_KEY to start a session."""
+    return LLM_PROVIDER == "groq"
+
+
+def get_llm(api_key: Optional[str] = None) -> FunctionCallingLLM:
+    """
+    Get the process-wide LLM for the configured provider.
+
+    Args:
+        api_key: Provider API key (defaults to GROQ_API_KEY / LLM_API_KEY).
+                 A different key builds a new LLM on the same connection pool.
+
+    Returns:
+        FunctionCallingLLM: Shared LLM instance backed by pooled HTTP clients.
+    """
+    global _llm, _llm_key
+    if LLM_PROVIDER not in PROVIDERS:
+        raise ValueError(f"Unknown LLM_PROVIDER '{LLM_PROVIDER}'; use one of {sorted(PROVIDERS)}")
+    key = (LLM_PROVIDER, api_key or os.getenv("GROQ_API_KEY"), LLM_MODEL, LLM_API_BASE)
+    with _lock:
+        llm, current_key = _llm, _llm_key
+    if llm is not None and current_key == key:
+        return llm
+
+    logger.info("Creating shared LLM client", extra={"provider": LLM_PROVIDER, "model": LLM_MODEL,
+                                                     "pool": LLM_MAX_CONNECTIONS, "http2": _http2_available()})
+    llm = PROVIDERS[LLM_PROVIDER](api_key)
+    with _lock:
+        _llm, _llm_key = llm, key
+    return llm
+
+
+async def aclose() -> None:
+    """Close the pooled connections (on server shutdown)."""
+    global _llm, _llm_key, _http_client, _async_http_client
+    with _lock:
+        http_client, async_http_client = _http_client, _async_http_client
+        _llm = _llm_key = _http_client = _async_http_client = None
+    if async_http_client is not None:
+        await async_http_client.aclose()
+    if http_client is not None:
+        http_client.close()
@@ -0,0 +1,318 @@
+"""
+Metrics - Prometheus-style counters, gauges and histograms served at /metrics
+
+A small in-process registry rendered in the Prometheus text exposition
+format (version 0.0.4), so any Prometheus-compatible scraper can read it
+without extra dependencies. The orchestrator, tools, renderers and server
+feed it; gauges with a collect callback (queue depths, cache sizes, outputs
+directory size) are read at scrape time.
+"""
+import os
+import time
+import bisect
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import app_logging
+import caching
+
+
+logger = app_logging.get_logger(__name__)
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+# Seconds between walks of the outputs directory for its size gauge
+OUTPUTS_SCAN_INTERVAL = float(os.getenv("METRICS_OUTPUTS_SCAN_SECONDS", "30"))
+
+# Latency buckets from fast paths (ms) to long report runs (minutes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7)
+
+LabelValues = Tuple[str, ...]
+INF_BUCKET = 'le="+Inf"'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    """Shared label handling; subclasses store one value per label set."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self._samples())
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """
+    Current value per label set, either set directly or read at scrape time.
+
+    collect, if given, returns a number (no labels) or a dict mapping label
+    value tuples to numbers.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 collect: Optional[Callable] = None, kind: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._collect = collect
+        self.kind = kind  # "counter" for totals kept elsewhere, e.g. limiter stats
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self) -> List[str]:
+        if self._collect is not None:
+            try:
+                collected = self._collect()
+            except Exception as e:
+                logger.warning("Metric %s collection failed: %s", self.name, e)
+                return []
+            items = sorted(collected.items()) if isinstance(collected, dict) else [((), collected)]
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count of observations per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[LabelValues, List] = {}  # [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def get_count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[-1] if state else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, INF_BUCKET)} {state[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state[-1]}")
+        return lines
+
+
+class Registry:
+    """Ordered set of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric, or return the one already registered under its name."""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render() -> str:
+    """All metrics in the Prometheus text format."""
+    return REGISTRY.render()
+
+
+# ============================================================================
+# APPLICATION METRICS
+# ============================================================================
+http_requests = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests handled", ("method", "route", "status")))
+http_request_seconds = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+
+analyze_requests = REGISTRY.register(Counter(
+    "analyze_requests_total", "Queries answered, by path (cache, fast_path, agent) and agent",
+    ("path", "agent")))
+analyze_seconds = REGISTRY.register(Histogram(
+    "analyze_duration_seconds", "Time to answer a query", ("path", "agent")))
+conversation_cache_lookups = REGISTRY.register(Counter(
+    "conversation_cache_lookups_total", "Conversation response cache lookups", ("result",)))
+
+llm_requests = REGISTRY.register(Counter(
+    "llm_requests_total", "LLM calls, by kind (chat, complete) and outcome", ("kind", "outcome")))
+llm_seconds = REGISTRY.register(Histogram(
+    "llm_request_duration_seconds", "LLM call latency, including rate limiter waits", ("kind",)))
+
+tool_calls = REGISTRY.register(Counter(
+    "tool_calls_total", "Agent tool calls, by tool and outcome (ok, error)", ("tool", "outcome")))
+tool_seconds = REGISTRY.register(Histogram(
+    "tool_duration_seconds", "Agent tool call latency", ("tool",)))
+
+file_writes = REGISTRY.register(Counter(
+    "output_files_written_total", "Output files written, by kind", ("kind",)))
+file_write_seconds = REGISTRY.register(Histogram(
+    "output_file_write_duration_seconds", "Time to render and write an output file", ("kind",)))
+file_write_bytes = REGISTRY.register(Histogram(
+    "output_file_size_bytes", "Size of written output files", ("kind",), buckets=SIZE_BUCKETS))
+
+
+def observe_llm(kind: str, seconds: float, ok: bool = True) -> None:
+    llm_requests.inc(kind=kind, outcome="ok" if ok else "error")
+    llm_seconds.observe(seconds, kind=kind)
+
+
+def observe_tool(tool: str, seconds: float, error: bool) -> None:
+    tool_calls.inc(tool=tool, outcome="error" if error else "ok")
+    tool_seconds.observe(seconds, tool=tool)
+
+
+def observe_file_write(kind: str, seconds: float, size_bytes: Optional[int]) -> None:
+    file_writes.inc(kind=kind)
+    file_write_seconds.observe(seconds, kind=kind)
+    if size_bytes is not None:
+        file_write_bytes.observe(size_bytes, kind=kind)
+
+
+# ============================================================================
+# SCRAPE-TIME GAUGES
+# ============================================================================
+def _directory_sizes(root: str) -> Dict[LabelValues, float]:
+    """Bytes per top-level subdirectory of root (files directly in root count as '.')."""
+    sizes: Dict[LabelValues, float] = {}
+    for dirpath, _, filenames in os.walk(root):
+        relative = os.path.relpath(dirpath, root)
+        top = "." if relative == "." else relative.split(os.sep)[0]
+        total = 0
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass  # removed while scanning
+        sizes[(top,)] = sizes.get((top,), 0) + total
+    return sizes
+
+
+class _OutputsSize:
+    """Outputs directory size by subdirectory, rescanned at most every OUTPUTS_SCAN_INTERVAL."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._scanned_at = 0.0
+        self._sizes: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            if time.monotonic() - self._scanned_at >= OUTPUTS_SCAN_INTERVAL:
+                self._sizes = _directory_sizes(self.root)
+                self._scanned_at = time.monotonic()
+            return dict(self._sizes)
+
+
+def register_outputs_dir(root: str) -> None:
+    REGISTRY.register(Gauge("outputs_directory_bytes", "Disk used under the outputs directory",
+                            ("directory",), collect=_OutputsSize(root)))
+
+
+def register_executor(name: str, executor) -> None:
+    """Queue depth and worker count of a ThreadPoolExecutor."""
+    REGISTRY.register(Gauge(f"{name}_queue_depth", f"Tasks waiting for a {name} worker",
+                            collect=lambda: executor._work_queue.qsize()))
+    REGISTRY.register(Gauge(f"{name}_workers", f"Threads started by the {name}",
+                            collect=lambda: len(executor._threads)))
+
+
+def _cache_stat(field: str) -> Callable[[], Dict[LabelValues, float]]:
+    return lambda: {(stats["name"],): stats[field] for stats in caching.get_all_stats()}
+
+
+REGISTRY.register(Gauge("cache_hits_total", "In-process LRU cache hits", ("cache",),
+                        collect=_cache_stat("hits"), kind="counter"))
+REGISTRY.register(Gauge("cache_misses_total", "In-process LRU cache misses", ("cache",),
+                        collect=_cache_stat("misses"), kind="counter"))
+REGISTRY.register(Gauge("cache_entries", "Entries held by each in-process LRU cache", ("cache",),
+                        collect=_cache_stat("size")))
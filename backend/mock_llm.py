@@ -0,0 +1,203 @@
+"""
+Mock LLM - Deterministic, offline model that drives the agents through their tools
+
+Selected with LLM_PROVIDER=mock. It reads the dataset facts from the system
+prompt, picks a categorical and a numeric column, and emits the same tool
+calls a real model would (analysis query, chart batch, report payload,
+dashboard), then a final answer that echoes the tool outputs. The routing,
+tools, renderers and server can then be load-tested end to end with no
+network and no API cost. LLM_MOCK_LATENCY_MS simulates model response time.
+"""
+import os
+import re
+import time
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    ChatResponse,
+    ChatResponseAsyncGen,
+    CompletionResponse,
+    MessageRole,
+    ToolCallBlock,
+)
+from llama_index.core.llms.callbacks import llm_completion_callback
+from llama_index.core.llms.mock import MockFunctionCallingLLM
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+LLM_MOCK_LATENCY_MS = float(os.getenv("LLM_MOCK_LATENCY_MS", "0"))
+
+# Facts pack column lines: "- Price (int64): min 1, ..." / "- Size (category): 17 unique; ..."
+_COLUMN_PATTERN = re.compile(r'^- (?P<name>.+?) \((?P<kind>[A-Za-z0-9 -]+)\):(?: (?P<unique>[\d,]+) unique)?',
+                             re.MULTILINE)
+MAX_GROUPS = 50  # prefer grouping columns a bar chart can show
+_NUMERIC_KIND = re.compile(r'(?:u?int|float|Int|UInt|Float)\d*')
+_IMAGE_PATTERN = re.compile(r'[A-Za-z]:[\\/][^\s|]+\.png|/[^\s|]+\.png')
+
+ToolCall = Tuple[str, Dict[str, Any]]
+
+
+def _dataset_columns(system_prompt: str) -> Tuple[Optional[str], Optional[str]]:
+    """First low-cardinality categorical and first numeric column listed in the facts pack."""
+    categorical = numeric = None
+    for match in _COLUMN_PATTERN.finditer(system_prompt):
+        name, kind = match.group('name'), match.group('kind')
+        if numeric is None and _NUMERIC_KIND.fullmatch(kind):
+            numeric = name
+        elif categorical is None and kind == 'category':
+            unique = int((match.group('unique') or '0').replace(',', ''))
+            if unique <= MAX_GROUPS:
+                categorical = name
+    return categorical, numeric
+
+
+def _chart_specs(categorical: Optional[str], numeric: Optional[str]) -> List[Dict]:
+    specs = []
+    if categorical and numeric:
+        specs.append({"chart_type": "bar", "x": categorical, "y": numeric, "agg": "sum", "top_n": 10,
+                      "title": f"Total {numeric} by {categorical}"})
+    elif categorical:
+        specs.append({"chart_type": "bar", "x": categorical, "top_n": 10, "title": f"Count by {categorical}"})
+    if numeric:
+        specs.append({"chart_type": "histogram", "x": numeric, "title": f"{numeric} Distribution"})
+    return specs
+
+
+def _report_payload(query: str, categorical: Optional[str], numeric: Optional[str],
+                    image_paths: List[str]) -> Dict:
+    focus = numeric or categorical or "the data"
+    return {
+        "title": "Data Analysis Report",
+        "subtitle": query[:100] or None,
+        "executive_summary": f"This report summarizes {focus} across the uploaded dataset.",
+        "kpis": [{"label": "Charts", "value": str(len(image_paths))}],
+        "sections": [{
+            "title": f"{focus} Overview",
+            "paragraphs": [f"The charts below show how {focus} is distributed."],
+            "bullets": [f"{focus} was analyzed by {categorical or 'row'}"],
+            "figures": [{"path": path, "caption": f"Figure {i + 1}"} for i, path in enumerate(image_paths)],
+        }],
+        "key_findings": [f"{focus} varies across {categorical or 'records'}"],
+        "recommendations": ["Review the largest groups first"],
+    }
+
+
+def _completion_text(prompt: str) -> str:
+    """Answer PandasQueryEngine prompts: an expression, then a summary of its output."""
+    if prompt.rstrip().endswith("Expression:"):
+        return "df.describe(include='all')"
+    output = prompt.split("Pandas Output:", 1)[-1].strip()
+    return f"Summary of the query results:\n{output[:1000]}"
+
+
+class ScriptedMockLLM(MockFunctionCallingLLM):
+    """
+    Function-calling mock that follows a fixed plan per agent.
+
+    The plan is chosen from the tools the agent offers; each turn after a
+    user message advances one step, and the last step answers in text.
+    """
+
+    latency_seconds: float = LLM_MOCK_LATENCY_MS / 1000
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ScriptedMockLLM"
+
+    def _get_response_generator(self):
+        return self._respond
+
+    # ------------------------------------------------------------------------
+    # Planning
+    # ------------------------------------------------------------------------
+    def _plan(self, tools: Dict[str, Any], system_prompt: str, query: str,
+              outputs: List[str]) -> List[List[ToolCall]]:
+        """Tool calls for each step of the current turn."""
+        categorical, numeric = _dataset_columns(system_prompt)
+        images = [path for output in outputs for path in _IMAGE_PATTERN.findall(output)]
+        analysis = [("data_analysis_tool", {"input": f"Summarize {numeric or 'the data'}"})] \
+            if "data_analysis_tool" in tools and (numeric or categorical) else []
+
+        if "create_interactive_dashboard" in tools:
+            return [[("create_interactive_dashboard", {"title": "Data Analysis Dashboard"})]]
+
+        for charts_tool, report_tool in (("generate_report_charts", "generate_pdf_report"),
+                                         ("generate_slide_charts", "generate_data_ppt")):
+            if report_tool not in tools:
+                continue
+            if not (numeric or categorical):
+                if "generate_text_ppt" in tools:
+                    return [[("generate_text_ppt", {"content": query, "title": "Presentation"})]]
+                return []
+            return [
+                analysis + [(charts_tool, {"chart_specs": _chart_specs(categorical, numeric)})],
+                [(report_tool, {"report": _report_payload(query, categorical, numeric, images)})],
+            ]
+
+        if "create_bar_chart" in tools:
+            if categorical and numeric:
+                chart = ("create_bar_chart", {"x_column": categorical, "y_column": numeric,
+                                              "title": f"{numeric} by {categorical}"})
+            elif numeric:
+                chart = ("create_histogram", {"column": numeric, "title": f"{numeric} Distribution"})
+            else:
+                return [analysis] if analysis else []
+            return [analysis + [chart]]
+
+        return [analysis] if analysis else []
+
+    def _respond(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatMessage:
+        tools = {tool.metadata.name: tool for tool in kwargs.get("tools") or []}
+        system_prompt = next((m.content or "" for m in messages if m.role == MessageRole.SYSTEM), "")
+        user_positions = [i for i, m in enumerate(messages) if m.role == MessageRole.USER]
+        start = user_positions[-1] if user_positions else 0
+        query = (messages[start].content or "") if user_positions else ""
+        turn = messages[start + 1:]
+        step = sum(1 for m in turn if m.role == MessageRole.ASSISTANT)
+        outputs = [m.content or "" for m in turn if m.role == MessageRole.TOOL]
+
+        plan = self._plan(tools, system_prompt, query, outputs)
+        if step < len(plan):
+            return ChatMessage(role=MessageRole.ASSISTANT, blocks=[
+                ToolCallBlock(tool_call_id=f"mock-{step}-{i}", tool_name=name, tool_kwargs=arguments)
+                for i, (name, arguments) in enumerate(plan[step])
+            ])
+
+        # Final answer: the tool outputs carry the chart/report paths the server extracts
+        summary = "\n".join(output for output in outputs if output)
+        return ChatMessage(role=MessageRole.ASSISTANT,
+                           content=f"Analysis complete.\n\n{summary}".strip())
+
+    # ------------------------------------------------------------------------
+    # LLM interface (with simulated latency)
+    # ------------------------------------------------------------------------
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return super().chat(messages, **kwargs)
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return super().chat(messages, **kwargs)
+
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseAsyncGen:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return await super().astream_chat(messages, **kwargs)
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return CompletionResponse(text=_completion_text(prompt))
+
+    @llm_completion_callback()
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return CompletionResponse(text=_completion_text(prompt))
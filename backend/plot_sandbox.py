@@ -0,0 +1,394 @@
+"""
+Plot Sandbox - Runs LLM-generated Plotly code in a pool of worker processes
+with CPU-time, wall-clock and memory limits.
+
+The active DataFrame is published once into shared memory as an Arrow IPC
+stream; workers map that segment instead of receiving a pickled copy of the
+data with every call. A runaway snippet only ever takes down a worker, never
+the server process - timeouts and limit violations come back as errors, and
+a snippet that overruns its wall-clock limit is stopped by killing only the
+worker running it.
+"""
+import os
+import math
+import time
+import uuid
+import hashlib
+import pickle
+import signal
+import atexit
+import threading
+import traceback
+import multiprocessing as mp
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+import app_logging
+import data_loader
+import figure_sampling
+from caching import LRUCache
+
+try:
+    import resource  # POSIX only - limits are skipped on Windows
+except ImportError:
+    resource = None
+
+logger = app_logging.get_logger(__name__)
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+SANDBOX_ENABLED = os.getenv("PLOT_SANDBOX_ENABLED", "1") != "0"
+SANDBOX_WORKERS = int(os.getenv("PLOT_SANDBOX_WORKERS", "2"))
+CPU_LIMIT_SECONDS = int(os.getenv("PLOT_SANDBOX_CPU_SECONDS", "30"))
+WALL_LIMIT_SECONDS = float(os.getenv("PLOT_SANDBOX_WALL_SECONDS", "60"))
+MEMORY_LIMIT_MB = int(os.getenv("PLOT_SANDBOX_MEMORY_MB", "4096"))
+CODE_CACHE_SIZE = int(os.getenv("PLOT_CODE_CACHE_SIZE", "128"))
+
+# How many datasets stay published at once (current upload + previous one)
+MAX_PUBLISHED_DATASETS = 2
+
+
+class PlotSandboxError(Exception):
+    """Raised when sandboxed plot code fails, times out or exceeds a limit."""
+
+
+# ============================================================================
+# COMPILED CODE CACHE
+# ============================================================================
+# code hash -> code object; every process (server and each worker) has its own
+_code_cache = LRUCache(max_size=CODE_CACHE_SIZE, name="plot_code")
+
+
+def plot_code_hash(code: str) -> str:
+    """Stable key for a plotting snippet."""
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def compile_plot_code(code: str):
+    """
+    Compile a plotting snippet, reusing the code object for repeated sources.
+
+    Raises:
+        SyntaxError: If the snippet does not parse.
+    """
+    key = plot_code_hash(code)
+    compiled = _code_cache.get(key)
+    if compiled is None:
+        compiled = compile(code, f"<plot_code:{key[:8]}>", "exec")
+        _code_cache.put(key, compiled)
+    return compiled
+
+
+# ============================================================================
+# WORKER SIDE
+# ============================================================================
+# fingerprint -> (SharedMemory, DataFrame); each worker keeps its own copy
+_worker_datasets: "OrderedDict[str, Tuple[shared_memory.SharedMemory, pd.DataFrame]]" = OrderedDict()
+_worker_limits: Dict[str, float] = {}
+# Queue on which a worker reports (job id, pid) when it picks up a snippet
+_worker_started = None
+
+
+def _raise_cpu_limit(signum, frame):
+    raise PlotSandboxError(f"CPU time limit of {_worker_limits.get('cpu_seconds', 0):.0f}s exceeded")
+
+
+def _worker_init(memory_limit_mb: int, started_queue) -> None:
+    """Apply process-wide limits once when a worker starts."""
+    global _worker_started
+    _worker_started = started_queue
+    _worker_limits["memory_mb"] = memory_limit_mb
+    # Snippets get shallow copies of the cached frames; copy-on-write makes any
+    # in-place edit copy the block (or fail on read-only .values) instead of
+    # changing the cached data
+    pd.set_option("mode.copy_on_write", True)
+    if resource is None:
+        return
+    if memory_limit_mb > 0:
+        # RLIMIT_AS caps the address space; allocations beyond it raise MemoryError
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    signal.signal(signal.SIGXCPU, _raise_cpu_limit)
+
+
+def _load_dataset(fingerprint: str, shm_name: str, size: int, encoding: str) -> pd.DataFrame:
+    """Return the published DataFrame, mapping it on first use in this worker."""
+    if fingerprint in _worker_datasets:
+        _worker_datasets.move_to_end(fingerprint)
+        return _worker_datasets[fingerprint][1]
+
+    # Workers share the server's resource tracker, so attaching here does not
+    # schedule the segment for cleanup when this worker exits
+    shm = shared_memory.SharedMemory(name=shm_name)
+    if encoding == "arrow":
+        # Numeric columns without nulls are wrapped in place, not copied
+        table = pa.ipc.open_stream(pa.py_buffer(shm.buf[:size])).read_all()
+        df = table.to_pandas(split_blocks=True)
+    else:
+        df = pickle.loads(shm.buf[:size])
+
+    _worker_datasets[fingerprint] = (shm, df)
+    while len(_worker_datasets) > MAX_PUBLISHED_DATASETS:
+        _, (old_shm, _) = _worker_datasets.popitem(last=False)
+        try:
+            old_shm.close()
+        except BufferError:
+            pass  # Still referenced by a live frame; released with it
+    return df
+
+
+def _execute_in_worker(job_id: str, dataset: Tuple[str, str, int, str], code: str,
+                       cpu_seconds: int) -> Tuple[bool, str, Optional[str]]:
+    """
+    Run plot code against the shared dataset inside a worker process.
+
+    Oversized traces are decimated here, before serialization, so millions of
+    points never cross the process boundary.
+
+    Returns:
+        (True, figure_json, sampling_note) on success,
+        (False, error_message, None) otherwise.
+    """
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    # The wall-clock limit starts now, and the server knows which process to stop
+    _worker_started.put((job_id, os.getpid()))
+    try:
+        df = _load_dataset(*dataset)
+    except Exception as e:
+        return False, f"Could not load dataset in sandbox: {e}", None
+
+    _worker_limits["cpu_seconds"] = cpu_seconds
+    if resource is not None and cpu_seconds > 0:
+        used = resource.getrusage(resource.RUSAGE_SELF)
+        soft = math.ceil(used.ru_utime + used.ru_stime) + cpu_seconds
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+    try:
+        local_vars = {
+            # Shallow copy: copy-on-write (see _worker_init) keeps edits off the cached frame
+            "df": df.copy(deep=False),
+            "px": px,
+            "go": go,
+            "pd": pd,
+            "fig": None
+        }
+        exec(compile_plot_code(code), {}, local_vars)
+
+        fig = local_vars.get("fig")
+        if fig is None:
+            return False, "Code must create a 'fig' variable with a Plotly figure", None
+        sampling_note = figure_sampling.downsample_figure(fig)
+        return True, fig.to_json(), sampling_note
+    except PlotSandboxError as e:
+        return False, str(e), None
+    except MemoryError:
+        return False, f"Memory limit of {_worker_limits.get('memory_mb', 0)} MB exceeded", None
+    except Exception as e:
+        return False, f"{str(e)}\nTraceback: {traceback.format_exc()}", None
+    finally:
+        if resource is not None and cpu_seconds > 0:
+            _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+            resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+
+# ============================================================================
+# SERVER SIDE
+# ============================================================================
+class PlotSandbox:
+    """
+    Pool of worker processes that execute plot code under resource limits.
+
+    Features:
+    - CPU-time limit per snippet (RLIMIT_CPU soft limit, POSIX only)
+    - Address-space limit per worker (RLIMIT_AS, POSIX only)
+    - Wall-clock timeout from when a worker picks the snippet up; only the
+      stuck worker is killed, and the pool replaces it
+    - Datasets shared through shared memory, published once per fingerprint
+    """
+
+    def __init__(self, workers: int = SANDBOX_WORKERS, cpu_seconds: int = CPU_LIMIT_SECONDS,
+                 wall_seconds: float = WALL_LIMIT_SECONDS, memory_mb: int = MEMORY_LIMIT_MB):
+        self.workers = workers
+        self.cpu_seconds = cpu_seconds
+        self.wall_seconds = wall_seconds
+        self.memory_mb = memory_mb
+        self._lock = threading.Lock()
+        self._pool = None
+        self._started = None  # Queue the workers report started jobs on
+        self._running: Dict[str, int] = {}  # job id -> worker pid
+        # fingerprint -> (SharedMemory, size, encoding)
+        self._segments: "OrderedDict[str, Tuple[shared_memory.SharedMemory, int, str]]" = OrderedDict()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                ctx = mp.get_context("spawn")
+                self._started = ctx.SimpleQueue()
+                self._running.clear()
+                self._pool = ctx.Pool(
+                    processes=self.workers,
+                    initializer=_worker_init,
+                    initargs=(self.memory_mb, self._started)
+                )
+                logger.info("Started plot sandbox with %d workers", self.workers)
+            return self._pool
+
+    def _job_pid(self, job_id: str) -> Optional[int]:
+        """Pid of the worker running job_id, or None while it is still queued."""
+        with self._lock:
+            while self._started is not None and not self._started.empty():
+                started_id, pid = self._started.get()
+                self._running[started_id] = pid
+            return self._running.get(job_id)
+
+    def _kill_worker(self, job_id: str) -> None:
+        """Kill the worker stuck on job_id; the pool starts a replacement and other snippets keep running."""
+        pid = self._job_pid(job_id)
+        if pid is None:
+            return
+        try:
+            os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+        except OSError:
+            pass  # Already gone
+        logger.warning("Killed plot worker stuck on a snippet", extra={"pid": pid})
+
+    def publish(self, df: pd.DataFrame) -> Tuple[str, str, int, str]:
+        """
+        Place the DataFrame in shared memory (once per fingerprint).
+
+        Returns:
+            (fingerprint, segment_name, size, encoding) handle for workers.
+        """
+        fingerprint = data_loader.dataset_fingerprint(df)
+        with self._lock:
+            if fingerprint in self._segments:
+                self._segments.move_to_end(fingerprint)
+                shm, size, encoding = self._segments[fingerprint]
+                return fingerprint, shm.name, size, encoding
+
+            try:
+                shm, size = _write_arrow_segment(df)
+                encoding = "arrow"
+            except (pa.ArrowException, ValueError, TypeError) as e:
+                # Mixed-type object columns cannot be expressed in Arrow
+                logger.debug("Arrow export failed (%s), sharing pickled dataset instead", e)
+                shm, size = _write_pickle_segment(df)
+                encoding = "pickle"
+
+            self._segments[fingerprint] = (shm, size, encoding)
+            while len(self._segments) > MAX_PUBLISHED_DATASETS:
+                _, (old_shm, _, _) = self._segments.popitem(last=False)
+                _release_segment(old_shm)
+
+            logger.debug("Published dataset %s to shared memory (%.1f MB, %s)", fingerprint, size / 1e6, encoding)
+            return fingerprint, shm.name, size, encoding
+
+    def run(self, df: pd.DataFrame, code: str) -> Tuple[str, Optional[str]]:
+        """
+        Execute plot code in a worker.
+
+        Returns:
+            (figure_json, sampling_note) - note is None if nothing was sampled.
+
+        Raises:
+            PlotSandboxError: On code errors, limit violations or timeouts.
+        """
+        dataset = self.publish(df)
+        pool = self._get_pool()
+        job_id = uuid.uuid4().hex
+        result = pool.apply_async(_execute_in_worker, (job_id, dataset, code, self.cpu_seconds))
+
+        started_at = None
+        try:
+            while not result.ready():
+                result.wait(0.25)
+                if self._pool is not pool:
+                    raise PlotSandboxError("Plot sandbox was shut down while this chart was running; please retry")
+                if started_at is None:
+                    # Time spent queued behind other snippets does not count
+                    if self._job_pid(job_id) is not None:
+                        started_at = time.monotonic()
+                elif time.monotonic() - started_at >= self.wall_seconds and not result.ready():
+                    self._kill_worker(job_id)
+                    raise PlotSandboxError(
+                        f"Plot code timed out after {self.wall_seconds:.0f}s - "
+                        "aggregate or sample the data before plotting"
+                    )
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+
+        ok, payload, sampling_note = result.get()
+        if not ok:
+            raise PlotSandboxError(payload)
+        return payload, sampling_note
+
+    def shutdown(self) -> None:
+        """Stop workers and unlink every published segment (at exit and on server shutdown)."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.terminate()
+                # Workers are gone before their segments are unlinked
+                self._pool.join()
+                self._pool = None
+            while self._segments:
+                _, (shm, _, _) = self._segments.popitem()
+                _release_segment(shm)
+
+
+def _write_arrow_segment(df: pd.DataFrame) -> Tuple[shared_memory.SharedMemory, int]:
+    """Serialize the frame as an Arrow IPC stream directly into shared memory."""
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    sizer = pa.MockOutputStream()
+    with pa.ipc.new_stream(sizer, table.schema) as writer:
+        writer.write_table(table)
+    size = sizer.size()
+
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    sink = pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf))
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    sink.close()
+    return shm, size
+
+
+def _write_pickle_segment(df: pd.DataFrame) -> Tuple[shared_memory.SharedMemory, int]:
+    payload = pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+    shm = shared_memory.SharedMemory(create=True, size=max(len(payload), 1))
+    shm.buf[:len(payload)] = payload
+    return shm, len(payload)
+
+
+def _release_segment(shm: shared_memory.SharedMemory) -> None:
+    try:
+        shm.close()
+    except BufferError:
+        pass
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+# Process-wide sandbox shared by every agent
+_sandbox = PlotSandbox()
+atexit.register(_sandbox.shutdown)
+
+
+def run_plot_code(df: pd.DataFrame, code: str) -> Tuple[str, Optional[str]]:
+    """Execute plot code in the shared sandbox; returns (figure_json, sampling_note)."""
+    return _sandbox.run(df, code)
+
+
+def shutdown() -> None:
+    """Stop the shared sandbox's workers and unlink its published datasets."""
+    _sandbox.shutdown()
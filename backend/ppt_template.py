@@ -0,0 +1,219 @@
+"""
+PPT Template - Themed master deck shared by every generated presentation
+
+The slide chrome (backgrounds, header bars, fonts and colours) lives in the
+slide layouts of one template deck instead of being drawn shape by shape on
+every slide. The deck is built (or loaded from PPT_TEMPLATE_PATH) once,
+kept in memory as bytes, and each request opens its own copy.
+"""
+import os
+import copy
+import threading
+from io import BytesIO
+
+from lxml import etree
+from pptx import Presentation
+from pptx.dml.color import RGBColor
+from pptx.enum.shapes import MSO_SHAPE
+from pptx.oxml.ns import qn
+from pptx.util import Inches
+
+import app_logging
+
+logger = app_logging.get_logger(__name__)
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+# Optional custom deck; it must contain no slides and the four layouts below
+PPT_TEMPLATE_PATH = os.getenv("PPT_TEMPLATE_PATH")
+
+LAYOUT_TITLE = "Report Title"
+LAYOUT_CONTENT = "Report Content"
+LAYOUT_IMAGE = "Report Image"
+LAYOUT_CLOSING = "Report Closing"
+
+SLIDE_WIDTH = Inches(13.333)
+SLIDE_HEIGHT = Inches(7.5)
+HEADER_HEIGHT = Inches(1.0)
+
+_template_bytes = None
+_template_lock = threading.Lock()
+
+
+def _hex(rgb):
+    return '%02X%02X%02X' % rgb
+
+
+def _style_placeholder(placeholder, box, levels, anchor='ctr', autofit=False):
+    """
+    Position a layout placeholder and give it its own list style.
+
+    Args:
+        placeholder: Layout placeholder to restyle
+        box: (left, top, width, height) in EMU
+        levels: One dict per outline level with size (pt), color (rgb tuple)
+                and optional bold, align, indent (EMU) and space_after (pt)
+        anchor: Vertical text anchor
+        autofit: Shrink text on overflow instead of growing the shape
+    """
+    placeholder.left, placeholder.top, placeholder.width, placeholder.height = box
+
+    tx_body = placeholder._element.find(qn('p:txBody'))
+    body_pr = tx_body.find(qn('a:bodyPr'))
+    body_pr.attrib.clear()
+    for child in list(body_pr):
+        body_pr.remove(child)
+    body_pr.set('wrap', 'square')
+    body_pr.set('anchor', anchor)
+    if autofit:
+        etree.SubElement(body_pr, qn('a:normAutofit'))
+
+    old_style = tx_body.find(qn('a:lstStyle'))
+    if old_style is not None:
+        tx_body.remove(old_style)
+    lst_style = etree.Element(qn('a:lstStyle'))
+    for level, spec in enumerate(levels, start=1):
+        ppr = etree.SubElement(lst_style, qn(f'a:lvl{level}pPr'))
+        ppr.set('marL', str(spec.get('indent', 0)))
+        ppr.set('indent', '0')
+        if spec.get('align'):
+            ppr.set('algn', spec['align'])
+        if spec.get('space_after'):
+            spc = etree.SubElement(ppr, qn('a:spcAft'))
+            etree.SubElement(spc, qn('a:spcPts')).set('val', str(spec['space_after'] * 100))
+        etree.SubElement(ppr, qn('a:buNone'))
+        rpr = etree.SubElement(ppr, qn('a:defRPr'))
+        rpr.set('sz', str(spec['size'] * 100))
+        rpr.set('b', '1' if spec.get('bold') else '0')
+        fill = etree.SubElement(rpr, qn('a:solidFill'))
+        etree.SubElement(fill, qn('a:srgbClr')).set('val', _hex(spec['color']))
+    body_pr.addnext(lst_style)
+
+
+def _add_header_bar(layout, scratch_slide, color):
+    """Draw a full-width header bar on a layout, beneath its placeholders."""
+    bar = scratch_slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, 0, 0, SLIDE_WIDTH, HEADER_HEIGHT)
+    bar.fill.solid()
+    bar.fill.fore_color.rgb = RGBColor(*color)
+    bar.line.fill.background()
+
+    element = copy.deepcopy(bar._element)
+    sp_tree = layout.shapes._spTree
+    used_ids = [int(i) for i in sp_tree.xpath('.//p:cNvPr/@id')]
+    element.find('.//' + qn('p:cNvPr')).set('id', str(max(used_ids, default=1) + 1))
+    # spTree starts with nvGrpSpPr and grpSpPr; shapes after them draw bottom-up
+    sp_tree.insert(2, element)
+
+
+def _set_background(layout, color):
+    layout.background.fill.solid()
+    layout.background.fill.fore_color.rgb = RGBColor(*color)
+
+
+def _remove_placeholders(layout, keep_idx):
+    for placeholder in list(layout.placeholders):
+        if placeholder.placeholder_format.idx not in keep_idx:
+            placeholder._element.getparent().remove(placeholder._element)
+
+
+def _build_default_template(colors) -> bytes:
+    """Build the themed deck from python-pptx's default template."""
+    prs = Presentation()
+    prs.slide_width = SLIDE_WIDTH
+    prs.slide_height = SLIDE_HEIGHT
+    layouts = list(prs.slide_layouts)
+    title_layout, content_layout, closing_layout, image_layout = (
+        layouts[0], layouts[1], layouts[2], layouts[5]
+    )
+    # Shapes can only be created on slides; this one is removed before saving
+    scratch = prs.slides.add_slide(layouts[6])
+    full_width = (Inches(0.5), 0, Inches(12.3), HEADER_HEIGHT)
+
+    # Title slide: primary background, large centred title and subtitle
+    _set_background(title_layout, colors['primary'])
+    _remove_placeholders(title_layout, {0, 1})
+    _style_placeholder(title_layout.placeholders[0], (Inches(0.5), Inches(2.5), Inches(12.3), Inches(1.5)),
+                       [{'size': 54, 'bold': True, 'color': colors['white'], 'align': 'ctr'}])
+    _style_placeholder(title_layout.placeholders[1], (Inches(0.5), Inches(4.2), Inches(12.3), Inches(0.8)),
+                       [{'size': 22, 'color': (200, 220, 255), 'align': 'ctr'}], anchor='t')
+
+    # Content slide: header bar with title, bullet-free body text
+    _set_background(content_layout, colors['white'])
+    _add_header_bar(content_layout, scratch, colors['primary'])
+    _remove_placeholders(content_layout, {0, 1})
+    _style_placeholder(content_layout.placeholders[0], full_width,
+                       [{'size': 28, 'bold': True, 'color': colors['white']}])
+    _style_placeholder(content_layout.placeholders[1], (Inches(0.5), Inches(1.3), Inches(12), Inches(5.8)),
+                       [{'size': 16, 'color': colors['dark'], 'space_after': 12},
+                        {'size': 14, 'color': colors['dark'], 'space_after': 12, 'indent': Inches(0.5)}],
+                       anchor='t', autofit=True)
+
+    # Image slide: header bar with title; the chart itself is added per slide
+    _set_background(image_layout, colors['white'])
+    _add_header_bar(image_layout, scratch, colors['primary'])
+    _remove_placeholders(image_layout, {0})
+    _style_placeholder(image_layout.placeholders[0], full_width,
+                       [{'size': 24, 'bold': True, 'color': colors['white']}])
+
+    # Closing slide: secondary background, centred title and tagline
+    _set_background(closing_layout, colors['secondary'])
+    _remove_placeholders(closing_layout, {0, 1})
+    _style_placeholder(closing_layout.placeholders[0], (Inches(0.5), Inches(3), Inches(12.3), Inches(1.5)),
+                       [{'size': 54, 'bold': True, 'color': colors['white'], 'align': 'ctr'}])
+    _style_placeholder(closing_layout.placeholders[1], (Inches(0.5), Inches(4.5), Inches(12.3), Inches(0.8)),
+                       [{'size': 24, 'color': (220, 220, 255), 'align': 'ctr'}], anchor='t')
+
+    # Drop the scratch slide and every layout the reports do not use
+    slide_ids = prs.slides._sldIdLst
+    for slide_id in list(slide_ids):
+        prs.part.drop_rel(slide_id.rId)
+        slide_ids.remove(slide_id)
+    names = [(title_layout, LAYOUT_TITLE), (content_layout, LAYOUT_CONTENT),
+             (image_layout, LAYOUT_IMAGE), (closing_layout, LAYOUT_CLOSING)]
+    for layout, name in names:
+        layout._element.cSld.set('name', name)
+    for layout in layouts:
+        if all(layout is not kept for kept, _ in names):
+            prs.slide_layouts.remove(layout)
+
+    buffer = BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+
+def _get_template_bytes(colors) -> bytes:
+    global _template_bytes
+    if _template_bytes is None:
+        with _template_lock:
+            if _template_bytes is None:
+                if PPT_TEMPLATE_PATH:
+                    with open(PPT_TEMPLATE_PATH, 'rb') as f:
+                        _template_bytes = f.read()
+                    logger.info("Loaded PPT template from %s", PPT_TEMPLATE_PATH)
+                else:
+                    _template_bytes = _build_default_template(colors)
+                    logger.info("Built PPT template (%.0f KB)", len(_template_bytes) / 1024)
+    return _template_bytes
+
+
+def new_presentation(colors):
+    """
+    Open a fresh copy of the template deck.
+
+    Args:
+        colors: Report colour palette used when building the default template
+
+    Returns:
+        Presentation: An empty deck with the report layouts.
+    """
+    return Presentation(BytesIO(_get_template_bytes(colors)))
+
+
+def get_layout(prs, name):
+    """Look up one of the report layouts by name."""
+    layout = prs.slide_layouts.get_by_name(name)
+    if layout is None:
+        raise ValueError(f"PPT template has no layout named '{name}'")
+    return layout
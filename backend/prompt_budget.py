@@ -0,0 +1,152 @@
+"""
+Prompt Budget - Token counting and query-aware compaction of agent prompts
+
+Wide datasets (hundreds of columns) used to put every column name into every
+system prompt. The helpers here count tokens, rank columns by how well their
+names match the user's query, and fit prompt sections into a token budget,
+summarizing whatever does not fit.
+"""
+import re
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import app_logging
+
+logger = app_logging.get_logger(__name__)
+
+
+# ============================================================================
+# TOKEN COUNTING
+# ============================================================================
+try:
+    # tiktoken ships with llama-index, including an offline copy of its encoding
+    from llama_index.core.utils import get_tokenizer
+    _tokenize = get_tokenizer()
+except Exception:  # pragma: no cover - tokenizer unavailable
+    _tokenize = None
+
+_WORD_PATTERN = re.compile(r'[a-z0-9]+')
+_CAMEL_PATTERN = re.compile(r'([a-z0-9])([A-Z])')
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in text (about four characters per token without a tokenizer)."""
+    if not text:
+        return 0
+    if _tokenize is not None:
+        return len(_tokenize(text))
+    return (len(text) + 3) // 4
+
+
+# ============================================================================
+# COLUMN RELEVANCE
+# ============================================================================
+def _words(text: str) -> List[str]:
+    """Lowercase word tokens; camelCase and snake_case names are split, bare numbers dropped."""
+    return [w for w in _WORD_PATTERN.findall(_CAMEL_PATTERN.sub(r'\1 \2', str(text)).lower())
+            if not w.isdigit()]
+
+
+def stem_word(word: str) -> str:
+    """Crude plural folding so 'sales' matches 'sale' and 'categories' matches 'category' (shared with fast_path)."""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def _contains_sequence(tokens: List[str], words: List[str]) -> bool:
+    """True if words occur in tokens as a contiguous run (whole tokens, not substrings)."""
+    n = len(words)
+    return any(tokens[i:i + n] == words for i in range(len(tokens) - n + 1))
+
+
+def rank_columns(columns: Sequence, query: Optional[str]) -> List:
+    """
+    Order columns by lexical relevance to a query.
+
+    A column scores highest when its full name appears in the query as whole
+    words (so 'id' does not match 'paid'), then by how many of its name's
+    words (plural-folded) occur in the query, with a small bonus for partial
+    word matches. Ties keep the original column order.
+
+    Args:
+        columns: Column names in dataset order
+        query: The user's request (None or empty keeps dataset order)
+
+    Returns:
+        List: The same columns, most relevant first
+    """
+    if not query:
+        return list(columns)
+
+    query_tokens = [stem_word(w) for w in _words(query)]
+    query_words = set(query_tokens)
+
+    def score(column) -> float:
+        name = str(column)
+        words = [stem_word(w) for w in _words(name)]
+        if not words:
+            return 0.0
+        value = 0.0
+        if _contains_sequence(query_tokens, words):
+            value += 10.0
+        matched = sum(1 for w in words if w in query_words)
+        value += 3.0 * matched / len(words)
+        if not matched:
+            value += 0.5 * sum(1 for w in words if len(w) > 3 and any(w in q or q in w for q in query_words
+                                                                      if len(q) > 3))
+        return value
+
+    scored = [(score(column), position, column) for position, column in enumerate(columns)]
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [column for _, _, column in scored]
+
+
+# ============================================================================
+# BUDGET FITTING
+# ============================================================================
+def fit_lines(lines: Iterable[str], max_tokens: int) -> Tuple[List[str], int]:
+    """
+    Keep lines, in order, until the next one would exceed the budget.
+
+    Returns:
+        (kept lines, number of lines dropped)
+    """
+    lines = list(lines)
+    kept: List[str] = []
+    remaining = max_tokens
+    for line in lines:
+        cost = count_tokens(line) + 1  # newline
+        if cost > remaining:
+            break
+        kept.append(line)
+        remaining -= cost
+    return kept, len(lines) - len(kept)
+
+
+def summarize_names(prefix: str, names: Sequence, max_tokens: int) -> str:
+    """
+    One line listing as many names as fit the budget, then a count of the rest.
+
+    e.g. "Other columns: region, channel, ... and 312 more"
+    """
+    shown: List[str] = []
+    total = len(names)
+    line = f"{prefix}: ... and {total} more"
+    for i, name in enumerate(names):
+        candidate_names = shown + [str(name)]
+        rest = total - i - 1
+        candidate = f"{prefix}: {', '.join(candidate_names)}" + (f", ... and {rest} more" if rest else "")
+        if count_tokens(candidate) > max_tokens:
+            break
+        shown = candidate_names
+        line = candidate
+    return line
+
+
+def log_prompt_size(agent_name: str, prompt: str, data_tokens: Optional[int] = None) -> int:
+    """Log the size of a fully assembled prompt and return its token count."""
+    total = count_tokens(prompt)
+    logger.debug("Prompt size", extra={"agent": agent_name, "prompt_tokens": total, "data_tokens": data_tokens})
+    return total
@@ -0,0 +1,463 @@
+"""
+Rate Limiter - Client-side request/token budgets and adaptive concurrency for LLM calls
+
+Sits in the HTTP transport of the shared LLM client, so every agent, tool and
+session in the process draws from the same budget:
+- Token buckets for requests and (estimated) tokens per minute
+- AIMD concurrency: +1/limit per success, halved on a 429
+- 429 responses pause all callers until Retry-After, then retry
+- Connection errors, timeouts and 5xx responses are retried with backoff
+- Waiting calls are granted round-robin across sessions, so one busy
+  session cannot starve the others
+"""
+import os
+import time
+import random
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+
+import app_logging
+import request_context
+
+logger = app_logging.get_logger(__name__)
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+LLM_RATE_LIMIT_RPM = float(os.getenv("LLM_RATE_LIMIT_RPM", "30"))
+LLM_RATE_LIMIT_TPM = float(os.getenv("LLM_RATE_LIMIT_TPM", "0"))  # 0 = no token budget
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_RATE_LIMIT_RETRIES = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "3"))
+
+MIN_CONCURRENCY = 1
+DEFAULT_BACKOFF_SECONDS = 2.0
+MAX_BACKOFF_SECONDS = 60.0
+# Transient statuses retried like connection errors (as the openai SDK does)
+RETRY_STATUS_CODES = (408, 409)
+
+def estimate_request_tokens(body: bytes) -> int:
+    """Prompt size estimate from the JSON body (about four bytes per token)."""
+    return max(1, len(body) // 4)
+
+
+def parse_retry_after(headers: httpx.Headers) -> Optional[float]:
+    """Seconds to wait from Retry-After / retry-after-ms, or None if absent."""
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class _Bucket:
+    """Token bucket refilled continuously up to its per-minute capacity."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount is available (amount is capped at capacity)."""
+        if not self.enabled:
+            return 0.0
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+
+class _Waiter:
+    __slots__ = ("tokens", "event", "future", "loop", "granted")
+
+    def __init__(self, tokens: int, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.tokens = tokens
+        self.loop = loop
+        self.future = loop.create_future() if loop else None
+        self.event = None if loop else threading.Event()
+        self.granted = False
+
+    def grant(self) -> None:
+        self.granted = True
+        if self.event is not None:
+            self.event.set()
+        else:
+            try:
+                self.loop.call_soon_threadsafe(self._resolve)
+            except RuntimeError:  # loop already closed
+                pass
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class RateLimiter:
+    """
+    Shared admission control for LLM requests.
+
+    Callers acquire a slot before sending a request and release it with the
+    response status when done. Usable from both threads and event loops.
+    """
+
+    def __init__(self, requests_per_minute: float = LLM_RATE_LIMIT_RPM,
+                 tokens_per_minute: float = LLM_RATE_LIMIT_TPM,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self._lock = threading.Lock()
+        self._requests = _Bucket(requests_per_minute)
+        self._tokens = _Bucket(tokens_per_minute)
+        self.max_concurrency = max(MIN_CONCURRENCY, max_concurrency)
+        self._limit = float(self.max_concurrency)
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self._timer: Optional[threading.Timer] = None
+        self._timer_at = 0.0
+
+        self.granted = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+
+    # ------------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------------
+    def _dispatch(self) -> None:
+        """Grant queued waiters, round-robin by session, while budgets allow."""
+        with self._lock:
+            now = time.monotonic()
+            self._requests.refill(now)
+            self._tokens.refill(now)
+
+            while self._queues and self._in_flight < int(self._limit):
+                if now < self._paused_until:
+                    self._schedule(self._paused_until - now)
+                    return
+                session, queue = next(iter(self._queues.items()))
+                waiter = queue[0]
+                wait = max(self._requests.wait_time(1), self._tokens.wait_time(waiter.tokens))
+                if wait > 0:
+                    self._schedule(wait)
+                    return
+
+                queue.popleft()
+                # Move the session to the back so others get the next slot
+                del self._queues[session]
+                if queue:
+                    self._queues[session] = queue
+                if self._requests.enabled:
+                    self._requests.level -= 1
+                if self._tokens.enabled:
+                    self._tokens.level -= min(waiter.tokens, self._tokens.capacity)
+                self._in_flight += 1
+                self.granted += 1
+                waiter.grant()
+
+    def _schedule(self, delay: float) -> None:
+        """Run _dispatch again after delay (one timer at a time). Caller holds the lock."""
+        now = time.monotonic()
+        when = now + delay
+        if self._timer is not None and now < self._timer_at <= when:
+            return  # an earlier wake-up is already pending
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._dispatch)
+        self._timer.daemon = True
+        self._timer_at = when
+        self._timer.start()
+
+    def _enqueue(self, waiter: _Waiter, session: str) -> None:
+        with self._lock:
+            self._queues.setdefault(session, deque()).append(waiter)
+        self._dispatch()
+
+    def _cancel(self, waiter: _Waiter, session: str) -> None:
+        """Drop a waiter that gave up; give its slot back if it was granted meanwhile."""
+        with self._lock:
+            queue = self._queues.get(session)
+            if queue is not None and waiter in queue:
+                queue.remove(waiter)
+                if not queue:
+                    del self._queues[session]
+                return
+        if waiter.granted:
+            self.release(200)
+
+    # ------------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------------
+    def acquire(self, tokens: int = 1, session: Optional[str] = None) -> None:
+        """Block the calling thread until a request may be sent."""
+        session = session or request_context.current_session.get()
+        waiter = _Waiter(tokens)
+        start = time.monotonic()
+        self._enqueue(waiter, session)
+        try:
+            waiter.event.wait()
+        except BaseException:
+            self._cancel(waiter, session)
+            raise
+        self.total_wait += time.monotonic() - start
+
+    async def aacquire(self, tokens: int = 1, session: Optional[str] = None) -> None:
+        """Wait (without blocking the event loop) until a request may be sent."""
+        session = session or request_context.current_session.get()
+        waiter = _Waiter(tokens, asyncio.get_running_loop())
+        start = time.monotonic()
+        self._enqueue(waiter, session)
+        try:
+            await waiter.future
+        except BaseException:
+            self._cancel(waiter, session)
+            raise
+        self.total_wait += time.monotonic() - start
+
+    def release(self, status_code: int, retry_after: Optional[float] = None,
+                headers: Optional[httpx.Headers] = None) -> None:
+        """
+        Return a slot and adapt to the outcome.
+
+        Args:
+            status_code: HTTP status of the response (0 for transport errors)
+            retry_after: Seconds the server asked us to wait (429 responses)
+            headers: Response headers; provider x-ratelimit-remaining-* values
+                     tighten the local buckets when they are lower
+        """
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if status_code == 429:
+                self.throttled += 1
+                self._limit = max(MIN_CONCURRENCY, self._limit / 2)
+                pause = retry_after if retry_after is not None else DEFAULT_BACKOFF_SECONDS
+                self._paused_until = max(self._paused_until, time.monotonic() + min(pause, MAX_BACKOFF_SECONDS))
+                logger.warning("LLM rate limited",
+                               extra={"concurrency": int(self._limit), "pause_seconds": round(pause, 1)})
+            elif 200 <= status_code < 300:
+                self._limit = min(self.max_concurrency, self._limit + 1 / self._limit)
+            if headers is not None:
+                self._sync_from_headers(headers)
+        self._dispatch()
+
+    def _sync_from_headers(self, headers: httpx.Headers) -> None:
+        for bucket, name in ((self._requests, "x-ratelimit-remaining-requests"),
+                             (self._tokens, "x-ratelimit-remaining-tokens")):
+            value = headers.get(name)
+            if value and bucket.enabled:
+                try:
+                    bucket.level = min(bucket.level, float(value))
+                except ValueError:
+                    pass
+
+    def get_stats(self) -> dict:
+        """Get limiter statistics."""
+        with self._lock:
+            return {
+                "concurrency_limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "queued": sum(len(q) for q in self._queues.values()),
+                "sessions_waiting": len(self._queues),
+                "granted": self.granted,
+                "throttled": self.throttled,
+                "avg_wait_seconds": self.total_wait / self.granted if self.granted else 0,
+            }
+
+
+# Process-wide limiter shared by every LLM client
+limiter = RateLimiter()
+
+
+def _backoff(attempt: int, retry_after: Optional[float]) -> float:
+    if retry_after is not None:
+        return retry_after
+    # Jitter keeps sessions from retrying in lockstep
+    return min(MAX_BACKOFF_SECONDS, DEFAULT_BACKOFF_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+# ============================================================================
+# HTTPX TRANSPORTS
+# ============================================================================
+class _ReleasingAsyncStream(httpx.AsyncByteStream):
+    """Keeps the slot in use until a (possibly streamed) response is consumed."""
+
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._on_close()
+
+
+class _ReleasingSyncStream(httpx.SyncByteStream):
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._on_close()
+
+
+def _release_once(limiter_: RateLimiter, response: httpx.Response):
+    released = []
+
+    def release():
+        if not released:
+            released.append(True)
+            limiter_.release(response.status_code, headers=response.headers)
+    return release
+
+
+def _retry_reason(response: httpx.Response, throttled: int, failed: int, max_retries: int) -> Optional[str]:
+    """'throttled' or 'failed' if the response should be retried, else None."""
+    if response.status_code == 429:
+        return "throttled" if throttled < LLM_RATE_LIMIT_RETRIES else None
+    if response.status_code in RETRY_STATUS_CODES or response.status_code >= 500:
+        return "failed" if failed < max_retries else None
+    return None
+
+
+class RateLimitedAsyncTransport(httpx.AsyncBaseTransport):
+    """
+    Async transport that admits requests through the shared limiter.
+
+    All retries happen here, so the SDK on top must not retry (max_retries=0):
+    429s up to LLM_RATE_LIMIT_RETRIES times after the limiter's pause, and
+    connection errors, timeouts and 408/409/5xx responses up to max_retries
+    times with backoff.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limiter_: Optional[RateLimiter] = None,
+                 max_retries: int = 0):
+        self._transport = transport
+        self._limiter = limiter_ or limiter
+        self._max_retries = max_retries
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        tokens = estimate_request_tokens(body)
+        throttled = failed = 0
+        while True:
+            await self._limiter.aacquire(tokens)
+            try:
+                response = await self._transport.handle_async_request(request)
+            except httpx.TransportError:
+                self._limiter.release(0)
+                if failed >= self._max_retries:
+                    raise
+                await asyncio.sleep(_backoff(failed, None))
+                failed += 1
+                continue
+            except BaseException:
+                self._limiter.release(0)
+                raise
+            reason = _retry_reason(response, throttled, failed, self._max_retries)
+            if reason == "throttled":
+                retry_after = parse_retry_after(response.headers)
+                await response.aclose()
+                # The limiter pauses every caller, this one included, before the retry
+                self._limiter.release(429, _backoff(throttled, retry_after), response.headers)
+                throttled += 1
+                continue
+            if reason == "failed":
+                await response.aclose()
+                self._limiter.release(response.status_code, headers=response.headers)
+                await asyncio.sleep(_backoff(failed, parse_retry_after(response.headers)))
+                failed += 1
+                continue
+            if response.status_code == 429:
+                self._limiter.release(429, parse_retry_after(response.headers), response.headers)
+                return response
+            return httpx.Response(
+                response.status_code, headers=response.headers, extensions=response.extensions,
+                stream=_ReleasingAsyncStream(response.stream, _release_once(self._limiter, response)),
+            )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """Sync transport (tools calling the LLM from worker threads) sharing the same limiter and retries."""
+
+    def __init__(self, transport: httpx.BaseTransport, limiter_: Optional[RateLimiter] = None,
+                 max_retries: int = 0):
+        self._transport = transport
+        self._limiter = limiter_ or limiter
+        self._max_retries = max_retries
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        body = request.read()
+        tokens = estimate_request_tokens(body)
+        throttled = failed = 0
+        while True:
+            self._limiter.acquire(tokens)
+            try:
+                response = self._transport.handle_request(request)
+            except httpx.TransportError:
+                self._limiter.release(0)
+                if failed >= self._max_retries:
+                    raise
+                time.sleep(_backoff(failed, None))
+                failed += 1
+                continue
+            except BaseException:
+                self._limiter.release(0)
+                raise
+            reason = _retry_reason(response, throttled, failed, self._max_retries)
+            if reason == "throttled":
+                retry_after = parse_retry_after(response.headers)
+                response.close()
+                self._limiter.release(429, _backoff(throttled, retry_after), response.headers)
+                throttled += 1
+                continue
+            if reason == "failed":
+                response.close()
+                self._limiter.release(response.status_code, headers=response.headers)
+                time.sleep(_backoff(failed, parse_retry_after(response.headers)))
+                failed += 1
+                continue
+            if response.status_code == 429:
+                self._limiter.release(429, parse_retry_after(response.headers), response.headers)
+                return response
+            return httpx.Response(
+                response.status_code, headers=response.headers, extensions=response.extensions,
+                stream=_ReleasingSyncStream(response.stream, _release_once(self._limiter, response)),
+            )
+
+    def close(self) -> None:
+        self._transport.close()
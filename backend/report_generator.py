@@ -1,13 +1,47 @@
 from fpdf import FPDF
-from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.dml.color import RGBColor
 from pptx.enum.text import PP_ALIGN
-from pptx.enum.shapes import MSO_SHAPE
 import os
+import re
+import zlib
 import uuid
+import tracemalloc
+try:
+    import resource  # POSIX only - the RSS figure is skipped on Windows
+except ImportError:
+    resource = None
+from contextlib import contextmanager
 from datetime import datetime
 
+import app_logging
+import artifact_store
+import dynamic_visualization
+import image_cache
+import ppt_template
+import report_schema
+import tracing
+from content_parser import clean_text, parse_sections, is_bullet, strip_bullet
+
+
+logger = app_logging.get_logger(__name__)
+
+
+# ============================================================================
+# DOCUMENT ASSEMBLY SETTINGS
+# ============================================================================
+# Charts are resampled to this resolution at their printed size before embedding
+PDF_IMAGE_DPI = int(os.getenv("PDF_IMAGE_DPI", "150"))
+PPT_IMAGE_DPI = int(os.getenv("PPT_IMAGE_DPI", "150"))
+PDF_IMAGE_WIDTH_MM = 170
+PPT_IMAGE_WIDTH_IN = 8
+PPT_MAX_IMAGE_SLIDES = 4
+# Structured report text continues on a new slide past this many points/characters
+PPT_MAX_POINTS_PER_SLIDE = 8
+PPT_MAX_CHARS_PER_SLIDE = 700
+# Trace Python allocations per report (adds overhead, off by default)
+REPORT_MEMORY_PROFILE = os.getenv("REPORT_MEMORY_PROFILE", "0") != "0"
+
 
 # ============================================================================
 # COLOR PALETTE - Professional Blue Theme
@@ -23,6 +57,91 @@ COLORS = {
 }
 
 
+# Typographic characters outside latin-1 that have a close ASCII equivalent
+_PDF_TRANSLATION = str.maketrans({
+    '\u2013': '-', '\u2014': '-', '\u2018': "'", '\u2019': "'",
+    '\u201c': '"', '\u201d': '"', '\u2026': '...', '\u2022': '-',
+})
+
+
+def pdf_text(text) -> str:
+    """Text FPDF's core fonts can encode: common typography mapped to ASCII, anything else '?'."""
+    return str(text).translate(_PDF_TRANSLATION).encode('latin-1', 'replace').decode('latin-1')
+
+
+@contextmanager
+def measure_peak_memory(label):
+    """
+    Log the peak memory used while building one report.
+    
+    Python allocations are traced with tracemalloc when REPORT_MEMORY_PROFILE
+    is set; the process high-water RSS is logged where the platform reports
+    it (not on Windows). tracemalloc is process-wide, so concurrent reports
+    share one peak.
+    """
+    started_tracing = REPORT_MEMORY_PROFILE and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    elif REPORT_MEMORY_PROFILE:
+        tracemalloc.reset_peak()
+    try:
+        yield
+    finally:
+        # ru_maxrss is reported in kilobytes on Linux
+        rss = ""
+        if resource is not None:
+            rss = ", process max RSS %.0f MB" % (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+        if REPORT_MEMORY_PROFILE:
+            _, peak = tracemalloc.get_traced_memory()
+            logger.debug("%s peak traced memory %.1f MB%s", label, peak / 1024 / 1024, rss)
+            if started_tracing:
+                tracemalloc.stop()
+        else:
+            logger.debug("%s done%s", label, rss)
+
+
+def prepare_report_images(image_paths, width_inches, dpi):
+    """
+    Render and resize every chart of a document up front.
+    
+    Chart tiers are rendered in one Kaleido batch and the embed copies are
+    decoded/resized in the image worker pool; the sequential layout pass then
+    only does cache lookups.
+    """
+    charts = [p for p in image_paths if dynamic_visualization.chart_exists(p)]
+    if not charts:
+        return
+    try:
+        sources = dynamic_visualization.render_chart_tiers(charts, 'document')
+    except Exception as e:
+        # Charts are rendered one at a time during layout instead
+        logger.warning("Batch chart rendering failed, falling back per chart: %s", e)
+        return
+    image_cache.prefetch_embeddable_images(sources, width_inches, dpi)
+
+
+class _StreamBuffer:
+    """
+    Stand-in for FPDF's in-memory string buffer that appends to a file.
+    
+    FPDF only ever does `buffer += str` and `len(buffer)` (for xref offsets),
+    and every character is one latin-1 byte, so both map directly onto a file.
+    """
+    
+    def __init__(self, fh):
+        self.fh = fh
+        self.size = 0
+    
+    def __iadd__(self, text):
+        data = text.encode('latin1')
+        self.fh.write(data)
+        self.size += len(data)
+        return self
+    
+    def __len__(self):
+        return self.size
+
+
 # ============================================================================
 # PDF REPORT GENERATOR
 # ============================================================================
@@ -33,6 +152,92 @@ class PDFReport(FPDF):
         super().__init__()
         self.title = title
         self.set_auto_page_break(auto=True, margin=20)
+        self._stream = None
+        self._page_objects = []
+    
+    # ------------------------------------------------------------------
+    # Incremental output: each page and its images are written to disk as
+    # soon as the page is finished instead of when the document closes.
+    # Report pages use no internal links or {nb} aliases, which would need
+    # the whole document first.
+    # ------------------------------------------------------------------
+    def open_stream(self, path):
+        """Start writing the PDF to path; must be called before the first page."""
+        self._stream = open(path, 'wb')
+        self.buffer = _StreamBuffer(self._stream)
+        self._putheader()
+    
+    def close_stream(self, finish=True):
+        """Finish the document (unless abandoning it) and close the output file."""
+        if self._stream is None:
+            return
+        try:
+            if finish and self.state < 3:
+                self.close()
+        finally:
+            self._stream.close()
+            self._stream = None
+    
+    def _putheader(self):
+        # Already written by open_stream when streaming
+        if self._stream is None or len(self.buffer) == 0:
+            super()._putheader()
+    
+    def _endpage(self):
+        super()._endpage()
+        if self._stream is not None:
+            self._flush_page(self.page)
+            self._flush_images()
+    
+    def _flush_page(self, n):
+        w_pt, h_pt = (self.fw_pt, self.fh_pt) if self.def_orientation == 'P' else (self.fh_pt, self.fw_pt)
+        self._newobj()
+        self._page_objects.append(self.n)
+        self._out('<</Type /Page')
+        self._out('/Parent 1 0 R')
+        if n in self.orientation_changes:
+            self._out('/MediaBox [0 0 %.2f %.2f]' % (h_pt, w_pt))
+        self._out('/Resources 2 0 R')
+        if self.pdf_version > '1.3':
+            self._out('/Group <</Type /Group /S /Transparency /CS /DeviceRGB>>')
+        self._out('/Contents ' + str(self.n + 1) + ' 0 R>>')
+        self._out('endobj')
+        
+        content = self.pages[n].encode('latin1')
+        if self.compress:
+            content = zlib.compress(content)
+        self._newobj()
+        self._out('<<' + ('/Filter /FlateDecode ' if self.compress else '') + '/Length ' + str(len(content)) + '>>')
+        self._putstream(content)
+        self._out('endobj')
+        # The page is on disk; drop its content stream
+        self.pages[n] = ''
+    
+    def _flush_images(self):
+        for info in sorted(self.images.values(), key=lambda i: i['i']):
+            if 'data' in info:
+                self._putimage(info)
+                del info['data']
+                info.pop('smask', None)
+    
+    def _putpages(self):
+        if self._stream is None:
+            return super()._putpages()
+        w_pt, h_pt = (self.fw_pt, self.fh_pt) if self.def_orientation == 'P' else (self.fh_pt, self.fw_pt)
+        # Pages root, referencing the page objects written so far
+        self.offsets[1] = len(self.buffer)
+        self._out('1 0 obj')
+        self._out('<</Type /Pages')
+        self._out('/Kids [' + ''.join(f'{n} 0 R ' for n in self._page_objects) + ']')
+        self._out('/Count ' + str(len(self._page_objects)))
+        self._out('/MediaBox [0 0 %.2f %.2f]' % (w_pt, h_pt))
+        self._out('>>')
+        self._out('endobj')
+    
+    def _putimages(self):
+        if self._stream is None:
+            return super()._putimages()
+        self._flush_images()
     
     def header(self):
         if self.page_no() == 1:
@@ -52,8 +257,11 @@ class PDFReport(FPDF):
         self.set_text_color(128, 128, 128)
         self.cell(0, 10, f'Page {self.page_no()} | Generated on {datetime.now().strftime("%Y-%m-%d")}', 0, 0, 'C')
 
-    def add_title_page(self):
+    def add_title_page(self, title='Data Analysis Report',
+                       subtitle='Comprehensive Data Insights & Recommendations'):
         """Create a professional title page."""
+        title = pdf_text(title)
+        subtitle = pdf_text(subtitle)
         self.add_page()
         # Background
         self.set_fill_color(*COLORS['primary'])
@@ -63,12 +271,12 @@ class PDFReport(FPDF):
         self.set_font('Arial', 'B', 36)
         self.set_text_color(*COLORS['white'])
         self.set_y(100)
-        self.cell(0, 20, 'Data Analysis Report', 0, 1, 'C')
+        self.multi_cell(0, 16, title, 0, 'C')
         
         # Subtitle
         self.set_font('Arial', '', 16)
         self.set_text_color(200, 220, 255)
-        self.cell(0, 10, 'Comprehensive Data Insights & Recommendations', 0, 1, 'C')
+        self.cell(0, 10, subtitle, 0, 1, 'C')
         
         # Date
         self.set_y(250)
@@ -79,7 +287,7 @@ class PDFReport(FPDF):
         """Add a styled section header."""
         self.ln(5)
         self.set_fill_color(*COLORS['primary'])
-        header_text = f"{number}. {title}" if number else title
+        header_text = pdf_text(f"{number}. {title}" if number else title)
         self.set_font('Arial', 'B', 16)
         self.set_text_color(*COLORS['primary'])
         self.cell(0, 10, header_text, 0, 1, 'L')
@@ -94,72 +302,80 @@ class PDFReport(FPDF):
         self.ln(3)
         self.set_font('Arial', 'B', 12)
         self.set_text_color(*COLORS['secondary'])
-        self.cell(0, 8, title, 0, 1, 'L')
+        self.cell(0, 8, pdf_text(title), 0, 1, 'L')
         self.set_text_color(*COLORS['dark'])
         self.set_font('Arial', '', 11)
         self.ln(2)
 
     def add_paragraph(self, text):
         """Add a paragraph of text."""
-        safe_text = clean_text(text).encode('latin-1', 'replace').decode('latin-1')
+        safe_text = pdf_text(clean_text(text))
         self.multi_cell(0, 6, safe_text)
         self.ln(3)
 
     def add_bullet_point(self, text):
         """Add a bullet point."""
-        safe_text = clean_text(text).encode('latin-1', 'replace').decode('latin-1')
+        safe_text = pdf_text(clean_text(text))
         self.set_x(15)
         self.set_font('Arial', '', 11)
         self.cell(5, 6, chr(149), 0, 0)  # Bullet character
         self.multi_cell(0, 6, safe_text)
 
+    def add_sections(self, sections):
+        """Add parsed content sections (see content_parser.parse_sections)."""
+        for section in sections:
+            if not section['generated_title']:
+                self.add_subsection(section['title'])
+            paragraph = []
+            for line in section['content']:
+                if is_bullet(line):
+                    if paragraph:
+                        self.add_paragraph('\n'.join(paragraph))
+                        paragraph = []
+                    self.add_bullet_point(strip_bullet(line))
+                else:
+                    paragraph.append(line)
+            if paragraph:
+                self.add_paragraph('\n'.join(paragraph))
+            self.ln(2)
+
     def add_key_value(self, key, value):
         """Add a key-value pair."""
         self.set_font('Arial', 'B', 11)
         self.set_text_color(*COLORS['secondary'])
-        self.cell(60, 7, f"{key}:", 0, 0)
+        self.cell(60, 7, pdf_text(f"{key}:"), 0, 0)
         self.set_font('Arial', '', 11)
         self.set_text_color(*COLORS['dark'])
-        safe_value = str(value).encode('latin-1', 'replace').decode('latin-1')
+        safe_value = pdf_text(value)
         self.cell(0, 7, safe_value, 0, 1)
 
-    def add_image_with_caption(self, img_path, caption="", width=170):
+    def add_image_with_caption(self, img_path, caption="", width=PDF_IMAGE_WIDTH_MM):
         """Add an image with a caption."""
-        if os.path.exists(img_path):
+        if dynamic_visualization.chart_exists(img_path):
             try:
                 # Check if we need a new page
                 if self.get_y() > 200:
                     self.add_page()
-                self.image(img_path, x=20, w=width)
+                source = dynamic_visualization.render_chart_tier(img_path, 'document')
+                self.image(image_cache.get_embeddable_image(source, width / 25.4, PDF_IMAGE_DPI), x=20, w=width)
                 if caption:
                     self.ln(3)
                     self.set_font('Arial', 'I', 9)
                     self.set_text_color(100, 100, 100)
-                    self.cell(0, 5, caption, 0, 1, 'C')
+                    self.cell(0, 5, pdf_text(caption), 0, 1, 'C')
                     self.set_text_color(*COLORS['dark'])
                 self.ln(5)
             except Exception as e:
                 self.add_paragraph(f"[Image could not be loaded: {e}]")
 
 
-def clean_text(text):
-    """Remove markdown artifacts from text."""
-    if not text:
-        return ""
-    text = str(text)
-    text = text.replace('**', '').replace('*', '')
-    text = text.replace('### ', '').replace('## ', '').replace('# ', '')
-    text = text.replace('```python', '').replace('```', '')
-    text = text.replace('\n\n\n', '\n\n')
-    return text.strip()
-
-
 def create_pdf_report(report_data, image_paths=None, output_filename=None):
     """
     Creates a comprehensive professional PDF report.
     
     Args:
-        report_data: Either a string (simple text) or dict with structured sections:
+        report_data: A validated report_schema.ReportPayload, a string (simple
+            text) or dict with structured sections:
             {
                 'executive_summary': str,
                 'data_overview': str,
@@ -172,7 +388,7 @@ def create_pdf_report(report_data, image_paths=None, output_filename=None):
                 'recommendations': list[str],
                 'image_descriptions': dict[str, str]  # {filename: description}
             }
-        image_paths: List of image file paths
+        image_paths: List of image file paths (a ReportPayload brings its own figures)
         output_filename: Output filename
         
     Returns:
@@ -182,13 +398,77 @@ def create_pdf_report(report_data, image_paths=None, output_filename=None):
         output_filename = f"report_{uuid.uuid4().hex[:8]}.pdf"
     
     image_paths = image_paths or []
+    if isinstance(report_data, report_schema.ReportPayload):
+        build = _build_pdf_payload
+        image_paths = [figure.path for figure in report_data.figures()]
+    else:
+        build = _build_pdf_report
+    
+    # PDFs go to this session's directory in the artifact store
+    output_dir = artifact_store.store.output_dir("pdfs")
+    output_path = os.path.join(output_dir, output_filename)
     
-    pdf = PDFReport()
+    # Pages are streamed to a partial file and moved into place once complete
+    partial_path = output_path + ".part"
+    with measure_peak_memory(f"PDF report {output_filename}"), tracing.file_write(output_path, "pdf"):
+        prepare_report_images(image_paths, PDF_IMAGE_WIDTH_MM / 25.4, PDF_IMAGE_DPI)
+        pdf = PDFReport()
+        pdf.open_stream(partial_path)
+        try:
+            build(pdf, report_data, image_paths)
+            pdf.close_stream()
+            os.replace(partial_path, output_path)
+        except BaseException:
+            pdf.close_stream(finish=False)
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+    artifact_store.store.register(output_path, "pdfs")
+    return output_path
+
+
+def _build_pdf_payload(pdf, payload, image_paths):
+    """Lay out a validated ReportPayload onto pdf, one numbered section per entry."""
+    pdf.title = pdf_text(payload.title)  # Also written to the document info
+    pdf.add_title_page(payload.title, payload.subtitle or 'Comprehensive Data Insights & Recommendations')
     
-    # Handle simple string input (backward compatibility)
+    pdf.add_page()
+    number = 1
+    pdf.add_section_header("Executive Summary", number)
+    pdf.add_paragraph(payload.executive_summary)
+    if payload.kpis:
+        pdf.add_subsection("Key Metrics")
+        for kpi in payload.kpis:
+            pdf.add_key_value(kpi.label, f"{kpi.value} ({kpi.change})" if kpi.change else kpi.value)
+    
+    for section in payload.sections:
+        number += 1
+        pdf.add_section_header(section.title, number)
+        for paragraph in section.paragraphs:
+            pdf.add_paragraph(paragraph)
+        for bullet in section.bullets:
+            pdf.add_bullet_point(bullet)
+        if section.bullets:
+            pdf.ln(3)
+        for figure in section.figures:
+            pdf.add_image_with_caption(figure.path, figure.caption or "")
+    
+    for heading, items in (("Key Findings", payload.key_findings),
+                           ("Recommendations & Next Steps", payload.recommendations)):
+        if items:
+            number += 1
+            pdf.add_section_header(heading, number)
+            for item in items:
+                pdf.add_bullet_point(item)
+
+
+def _build_pdf_report(pdf, report_data, image_paths):
+    """Lay out every section of the report onto pdf."""
+    # Handle simple string input (backward compatibility); the text is split
+    # into sections with the same tokenizer the PPT generator uses
     if isinstance(report_data, str):
         report_data = {
-            'executive_summary': report_data,
+            'executive_summary': parse_sections(report_data),
             'key_findings': [],
             'recommendations': []
         }
@@ -199,7 +479,11 @@ def create_pdf_report(report_data, image_paths=None, output_filename=None):
     # 2. Executive Summary
     pdf.add_page()
     pdf.add_section_header("Executive Summary", 1)
-    pdf.add_paragraph(report_data.get('executive_summary', 'Analysis completed successfully.'))
+    summary = report_data.get('executive_summary', 'Analysis completed successfully.')
+    if isinstance(summary, list):
+        pdf.add_sections(summary)
+    else:
+        pdf.add_paragraph(summary)
     
     # 3. Data Overview
     pdf.add_section_header("Data Overview", 2)
@@ -258,50 +542,27 @@ def create_pdf_report(report_data, image_paths=None, output_filename=None):
             pdf.add_bullet_point(rec)
     else:
         pdf.add_paragraph("Based on the analysis, further investigation of identified patterns is recommended.")
-    
-    # Create output directory for PDFs
-    output_dir = os.path.join(os.getcwd(), "outputs", "pdfs")
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Save
-    output_path = os.path.join(output_dir, output_filename)
-    pdf.output(output_path)
-    return output_path
 
 
 # ============================================================================
 # POWERPOINT REPORT GENERATOR
 # ============================================================================
 
+def _fill_placeholder(slide, idx, text):
+    """Set a placeholder's text, or drop the placeholder when there is nothing to show."""
+    placeholder = slide.placeholders[idx]
+    if text:
+        placeholder.text = text
+    else:
+        placeholder._element.getparent().remove(placeholder._element)
+    return placeholder
+
+
 def add_title_slide(prs, title, subtitle):
     """Add a professional title slide."""
-    slide_layout = prs.slide_layouts[6]  # Blank
-    slide = prs.slides.add_slide(slide_layout)
-    
-    # Full background
-    bg = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, 0, 0, prs.slide_width, prs.slide_height)
-    bg.fill.solid()
-    bg.fill.fore_color.rgb = RGBColor(*COLORS['primary'])
-    bg.line.fill.background()
-    
-    # Title
-    title_box = slide.shapes.add_textbox(Inches(0.5), Inches(2.5), Inches(12.3), Inches(1.5))
-    tf = title_box.text_frame
-    p = tf.paragraphs[0]
-    p.text = title
-    p.font.size = Pt(54)
-    p.font.bold = True
-    p.font.color.rgb = RGBColor(*COLORS['white'])
-    p.alignment = PP_ALIGN.CENTER
-    
-    # Subtitle
-    sub_box = slide.shapes.add_textbox(Inches(0.5), Inches(4.2), Inches(12.3), Inches(0.8))
-    tf = sub_box.text_frame
-    p = tf.paragraphs[0]
-    p.text = subtitle
-    p.font.size = Pt(22)
-    p.font.color.rgb = RGBColor(200, 220, 255)
-    p.alignment = PP_ALIGN.CENTER
+    slide = prs.slides.add_slide(ppt_template.get_layout(prs, ppt_template.LAYOUT_TITLE))
+    _fill_placeholder(slide, 0, title)
+    _fill_placeholder(slide, 1, subtitle)
     
     # Date
     date_box = slide.shapes.add_textbox(Inches(0.5), Inches(6.5), Inches(12.3), Inches(0.5))
@@ -315,77 +576,36 @@ def add_title_slide(prs, title, subtitle):
 
 def add_content_slide(prs, title, content, bullet_points=None):
     """Add a content slide with header and text."""
-    slide_layout = prs.slide_layouts[6]  # Blank
-    slide = prs.slides.add_slide(slide_layout)
-    
-    # Header bar
-    header = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, 0, 0, prs.slide_width, Inches(1.2))
-    header.fill.solid()
-    header.fill.fore_color.rgb = RGBColor(*COLORS['primary'])
-    header.line.fill.background()
-    
-    # Header text
-    header_box = slide.shapes.add_textbox(Inches(0.5), Inches(0.35), Inches(12), Inches(0.6))
-    tf = header_box.text_frame
-    p = tf.paragraphs[0]
-    p.text = title
-    p.font.size = Pt(28)
-    p.font.bold = True
-    p.font.color.rgb = RGBColor(*COLORS['white'])
+    slide = prs.slides.add_slide(ppt_template.get_layout(prs, ppt_template.LAYOUT_CONTENT))
+    _fill_placeholder(slide, 0, title)
     
-    # Content
+    paragraphs = []
     if content:
-        content_box = slide.shapes.add_textbox(Inches(0.5), Inches(1.5), Inches(12.3), Inches(5.5))
-        tf = content_box.text_frame
-        tf.word_wrap = True
-        p = tf.paragraphs[0]
         cleaned = clean_text(content)
         if len(cleaned) > 800:
             cleaned = cleaned[:800] + "..."
-        p.text = cleaned
-        p.font.size = Pt(16)
-        p.font.color.rgb = RGBColor(*COLORS['dark'])
-    
-    # Bullet points
-    if bullet_points:
-        y_pos = Inches(1.5) if not content else Inches(4.5)
-        for i, point in enumerate(bullet_points[:6]):  # Max 6 points
-            bp_box = slide.shapes.add_textbox(Inches(0.7), y_pos + Inches(i * 0.6), Inches(11.5), Inches(0.5))
-            tf = bp_box.text_frame
-            p = tf.paragraphs[0]
-            p.text = f"• {clean_text(point)}"
-            p.font.size = Pt(14)
-            p.font.color.rgb = RGBColor(*COLORS['dark'])
+        paragraphs.append(cleaned)
+    for point in (bullet_points or [])[:6]:  # Max 6 points
+        paragraphs.append(f"• {clean_text(point)}")
     
+    # Each newline becomes its own paragraph in the body placeholder
+    _fill_placeholder(slide, 1, "\n".join(paragraphs))
     return slide
 
 
 def add_image_slide(prs, title, img_path, description=""):
     """Add a slide with an image and description."""
-    slide_layout = prs.slide_layouts[6]  # Blank
-    slide = prs.slides.add_slide(slide_layout)
-    
-    # Header bar
-    header = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, 0, 0, prs.slide_width, Inches(1.0))
-    header.fill.solid()
-    header.fill.fore_color.rgb = RGBColor(*COLORS['primary'])
-    header.line.fill.background()
-    
-    # Header text
-    header_box = slide.shapes.add_textbox(Inches(0.5), Inches(0.25), Inches(12), Inches(0.5))
-    tf = header_box.text_frame
-    p = tf.paragraphs[0]
-    p.text = title
-    p.font.size = Pt(24)
-    p.font.bold = True
-    p.font.color.rgb = RGBColor(*COLORS['white'])
+    slide = prs.slides.add_slide(ppt_template.get_layout(prs, ppt_template.LAYOUT_IMAGE))
+    _fill_placeholder(slide, 0, title)
     
     # Add image
-    if os.path.exists(img_path):
+    if dynamic_visualization.chart_exists(img_path):
         try:
-            slide.shapes.add_picture(img_path, Inches(1), Inches(1.2), width=Inches(8))
+            source = dynamic_visualization.render_chart_tier(img_path, 'document')
+            image_file = image_cache.get_embeddable_image(source, PPT_IMAGE_WIDTH_IN, PPT_IMAGE_DPI)
+            slide.shapes.add_picture(image_file, Inches(1), Inches(1.2), width=Inches(PPT_IMAGE_WIDTH_IN))
         except Exception as e:
-            print(f"Error adding image: {e}")
+            logger.error("Error adding image %s: %s", img_path, e)
     
     # Description
     if description:
@@ -402,33 +622,84 @@ def add_image_slide(prs, title, img_path, description=""):
 
 def add_closing_slide(prs):
     """Add a thank you / closing slide."""
-    slide_layout = prs.slide_layouts[6]
-    slide = prs.slides.add_slide(slide_layout)
-    
-    # Background
-    bg = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, 0, 0, prs.slide_width, prs.slide_height)
-    bg.fill.solid()
-    bg.fill.fore_color.rgb = RGBColor(*COLORS['secondary'])
-    bg.line.fill.background()
-    
-    # Text
-    title_box = slide.shapes.add_textbox(Inches(0.5), Inches(3), Inches(12.3), Inches(1.5))
-    tf = title_box.text_frame
-    p = tf.paragraphs[0]
-    p.text = "Thank You"
-    p.font.size = Pt(54)
-    p.font.bold = True
-    p.font.color.rgb = RGBColor(*COLORS['white'])
-    p.alignment = PP_ALIGN.CENTER
+    slide = prs.slides.add_slide(ppt_template.get_layout(prs, ppt_template.LAYOUT_CLOSING))
+    _fill_placeholder(slide, 0, "Thank You")
+    _fill_placeholder(slide, 1, "Questions & Discussion")
+
+
+def add_dynamic_slide(prs, slide_title, content):
+    """Add a slide with content that fits within boundaries.
+    Each point on new line, subpoints with proper indentation. Text is never
+    cut: long lines wrap and the layout's autofit shrinks the body, so callers
+    split content that needs more room across slides."""
+    slide = prs.slides.add_slide(ppt_template.get_layout(prs, ppt_template.LAYOUT_CONTENT))
+    _fill_placeholder(slide, 0, slide_title[:50])  # Limit title length
+    
+    # Content area - body placeholder with one paragraph per point;
+    # sizes, colour and spacing per level come from the layout
+    tf = slide.placeholders[1].text_frame
+    
+    if isinstance(content, list):
+        # Process list items - each as separate paragraph
+        first_para = True
+        for point in content:
+            if first_para:
+                p = tf.paragraphs[0]
+                first_para = False
+            else:
+                p = tf.add_paragraph()
+            
+            point_text = point  # already cleaned by the parser
+            
+            # Check if this is a subpoint (starts with space, tab, or -)
+            is_subpoint = point_text.startswith('  ') or point_text.startswith('\t') or point_text.startswith('- ')
+            
+            if is_subpoint:
+                # Subpoint - add indentation
+                p.text = f"     ○ {point_text.strip().lstrip('-').strip()}"
+                p.level = 1  # Indent level
+            else:
+                # Main point
+                p.text = f"• {point_text}"
+                p.level = 0
+            
+    else:
+        # Paragraph content - parse line by line for proper formatting
+        content_text = clean_text(str(content))
+        lines = content_text.split('\n')
+        
+        first_para = True
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+                
+            if first_para:
+                p = tf.paragraphs[0]
+                first_para = False
+            else:
+                p = tf.add_paragraph()
+            
+            # Check for bullet points or subpoints
+            is_bullet = line.startswith('•') or line.startswith('-') or line.startswith('*')
+            is_subpoint = line.startswith('  ') or line.startswith('\t')
+            
+            if is_bullet:
+                # Already a bullet - keep it
+                p.text = line if line.startswith('•') else f"• {line.lstrip('-*').strip()}"
+                p.level = 0
+            elif is_subpoint:
+                # Subpoint
+                p.text = f"     ○ {line.strip().lstrip('-*').strip()}"
+                p.level = 1
+            else:
+                # Regular text
+                p.text = line
+                p.level = 0
+            
+            p.space_after = Pt(8)  # Tighter than the layout's list spacing
     
-    # Subtitle
-    sub_box = slide.shapes.add_textbox(Inches(0.5), Inches(4.5), Inches(12.3), Inches(0.8))
-    tf = sub_box.text_frame
-    p = tf.paragraphs[0]
-    p.text = "Questions & Discussion"
-    p.font.size = Pt(24)
-    p.font.color.rgb = RGBColor(220, 220, 255)
-    p.alignment = PP_ALIGN.CENTER
+    return slide
 
 
 def create_ppt_report(report_data, image_paths=None, output_filename=None, title=None):
@@ -437,8 +708,9 @@ def create_ppt_report(report_data, image_paths=None, output_filename=None, title
     Uses consistent text style and color scheme across all slides.
     
     Args:
-        report_data: Either a string (text content) or dict with sections
-        image_paths: Optional list of image file paths
+        report_data: A validated report_schema.ReportPayload, a string (text
+            content) or dict with sections
+        image_paths: Optional list of image file paths (a ReportPayload brings its own figures)
         output_filename: Output filename
         title: Optional title for the presentation (from user prompt)
         
@@ -450,108 +722,21 @@ def create_ppt_report(report_data, image_paths=None, output_filename=None, title
     
     image_paths = image_paths or []
     
-    prs = Presentation()
-    prs.slide_width = Inches(13.333)
-    prs.slide_height = Inches(7.5)
-    
-    # Helper function to extract sections from paragraph content
-    def parse_content_into_slides(content_text, presentation_title):
-        """
-        Parse user content intelligently into slides with unique titles.
-        Looks for headers, numbered sections, or creates meaningful titles.
-        """
-        slides_data = []
-        content_text = clean_text(str(content_text))
-        
-        # Try to split by common section markers
-        # Look for patterns like: "1.", "Section:", "Topic:", headers with :
-        import re
-        
-        # Pattern 1: Numbered sections (1., 2., etc.)
-        numbered_pattern = r'(?:^|\n)(\d+\.?\s*)([^\n:]+[:\n])'
-        
-        # Pattern 2: Sections with colons (Topic: content)
-        colon_pattern = r'(?:^|\n)([A-Z][^:\n]{2,40}):\s*'
-        
-        # Try to find natural section breaks
-        lines = content_text.split('\n')
-        current_section_title = None
-        current_section_content = []
-        slide_index = 1
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Check if this line looks like a title/header
-            is_title = False
-            new_title = None
-            
-            # Numbered section (1. Topic, 2. Topic)
-            num_match = re.match(r'^(\d+)[.)\s]+(.+)$', line)
-            if num_match:
-                is_title = True
-                new_title = num_match.group(2).strip()[:45]
-            
-            # Colon-based section (Topic: content)
-            elif ':' in line and len(line.split(':')[0]) < 40:
-                parts = line.split(':', 1)
-                if len(parts[0]) > 3 and parts[0][0].isupper():
-                    is_title = True
-                    new_title = parts[0].strip()[:45]
-                    # Add the content after colon to current
-                    if parts[1].strip():
-                        current_section_content.append(parts[1].strip())
-            
-            # All caps line (likely a header)
-            elif line.isupper() and len(line) > 3 and len(line) < 50:
-                is_title = True
-                new_title = line.title()[:45]
-            
-            if is_title and new_title:
-                # Save previous section if exists
-                if current_section_content:
-                    slides_data.append({
-                        'title': current_section_title or f"Section {slide_index}",
-                        'content': current_section_content.copy()
-                    })
-                    slide_index += 1
-                
-                current_section_title = new_title
-                current_section_content = []
-            else:
-                # Add as content
-                current_section_content.append(line)
-        
-        # Don't forget the last section
-        if current_section_content:
-            slides_data.append({
-                'title': current_section_title or f"Content",
-                'content': current_section_content.copy()
-            })
-        
-        # If no sections were found, split content into chunks with generated titles
-        if not slides_data:
-            all_lines = [l.strip() for l in lines if l.strip()]
-            chunk_size = 8  # 8 points per slide
-            for i in range(0, len(all_lines), chunk_size):
-                chunk = all_lines[i:i+chunk_size]
-                # Generate title from first line or index
-                if chunk:
-                    first_line = chunk[0][:40].replace('•', '').replace('-', '').strip()
-                    title = first_line if first_line and len(first_line) > 5 else f"Key Points {i//chunk_size + 1}"
-                    slides_data.append({
-                        'title': title,
-                        'content': chunk
-                    })
-        
-        return slides_data
+    # Copy of the cached themed deck; backgrounds and header bars come from its layouts
+    prs = ppt_template.new_presentation(COLORS)
+    
+    if isinstance(report_data, report_schema.ReportPayload):
+        prepare_report_images([f.path for f in report_data.figures()], PPT_IMAGE_WIDTH_IN, PPT_IMAGE_DPI)
+        _build_ppt_payload(prs, report_data)
+        return _save_presentation(prs, output_filename)
+    
+    image_paths = image_paths[:PPT_MAX_IMAGE_SLIDES]
+    prepare_report_images(image_paths, PPT_IMAGE_WIDTH_IN, PPT_IMAGE_DPI)
     
     # Parse content into sections if string
     if isinstance(report_data, str):
-        # Use intelligent parsing
-        sections = parse_content_into_slides(report_data, title or "Presentation")
+        # Single-pass tokenizer shared with the PDF generator
+        sections = parse_sections(report_data)
         
         # Generate title from first section if not provided
         if not title and sections:
@@ -563,7 +748,8 @@ def create_ppt_report(report_data, image_paths=None, output_filename=None, title
             if key not in ['image_descriptions', 'title'] and value:
                 section_title = key.replace('_', ' ').title()
                 if isinstance(value, list):
-                    sections.append({'title': section_title, 'content': value})
+                    # Clean list items once here; slide drawing uses them as-is
+                    sections.append({'title': section_title, 'content': [clean_text(str(v)) for v in value]})
                 else:
                     sections.append({'title': section_title, 'content': str(value)})
         # Use provided title or generate from content
@@ -573,112 +759,6 @@ def create_ppt_report(report_data, image_paths=None, output_filename=None, title
     # Slide 1: Title slide with user-provided or generated title
     add_title_slide(prs, title or "Presentation", "Generated Report")
     
-    # Create slides dynamically based on content
-    def add_dynamic_slide(prs, slide_title, content):
-        """Add a slide with content that fits within boundaries.
-        Each point on new line, subpoints with proper indentation."""
-        from pptx.enum.text import MSO_AUTO_SIZE
-        
-        slide_layout = prs.slide_layouts[6]  # Blank
-        slide = prs.slides.add_slide(slide_layout)
-        
-        # White background
-        bg = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, 0, 0, prs.slide_width, prs.slide_height)
-        bg.fill.solid()
-        bg.fill.fore_color.rgb = RGBColor(255, 255, 255)
-        bg.line.fill.background()
-        
-        # Header bar - consistent primary blue
-        header = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, 0, 0, prs.slide_width, Inches(1.0))
-        header.fill.solid()
-        header.fill.fore_color.rgb = RGBColor(*COLORS['primary'])
-        header.line.fill.background()
-        
-        # Title text
-        title_box = slide.shapes.add_textbox(Inches(0.5), Inches(0.3), Inches(12), Inches(0.5))
-        tf = title_box.text_frame
-        p = tf.paragraphs[0]
-        p.text = slide_title[:50]  # Limit title length
-        p.font.size = Pt(28)
-        p.font.bold = True
-        p.font.color.rgb = RGBColor(255, 255, 255)
-        
-        # Content area - single text box with multiple paragraphs
-        content_box = slide.shapes.add_textbox(Inches(0.5), Inches(1.3), Inches(12), Inches(5.8))
-        tf = content_box.text_frame
-        tf.word_wrap = True
-        
-        if isinstance(content, list):
-            # Process list items - each as separate paragraph
-            first_para = True
-            for i, point in enumerate(content[:12]):  # Max 12 points per slide
-                if first_para:
-                    p = tf.paragraphs[0]
-                    first_para = False
-                else:
-                    p = tf.add_paragraph()
-                
-                point_text = clean_text(str(point))
-                
-                # Check if this is a subpoint (starts with space, tab, or -)
-                is_subpoint = point_text.startswith('  ') or point_text.startswith('\t') or point_text.startswith('- ')
-                
-                if is_subpoint:
-                    # Subpoint - add indentation
-                    p.text = f"     ○ {point_text.strip().lstrip('-').strip()}"
-                    p.font.size = Pt(14)
-                    p.level = 1  # Indent level
-                else:
-                    # Main point
-                    p.text = f"• {point_text[:100]}"
-                    p.font.size = Pt(16)
-                    p.level = 0
-                
-                p.font.color.rgb = RGBColor(30, 41, 59)
-                p.space_after = Pt(12)  # Space between points
-                
-        else:
-            # Paragraph content - parse line by line for proper formatting
-            content_text = clean_text(str(content))
-            lines = content_text.split('\n')
-            
-            first_para = True
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                if first_para:
-                    p = tf.paragraphs[0]
-                    first_para = False
-                else:
-                    p = tf.add_paragraph()
-                
-                # Check for bullet points or subpoints
-                is_bullet = line.startswith('•') or line.startswith('-') or line.startswith('*')
-                is_subpoint = line.startswith('  ') or line.startswith('\t')
-                
-                if is_bullet:
-                    # Already a bullet - keep it
-                    p.text = line if line.startswith('•') else f"• {line.lstrip('-*').strip()}"
-                    p.font.size = Pt(16)
-                    p.level = 0
-                elif is_subpoint:
-                    # Subpoint
-                    p.text = f"     ○ {line.strip().lstrip('-*').strip()}"
-                    p.font.size = Pt(14)
-                    p.level = 1
-                else:
-                    # Regular text
-                    p.text = line[:150]
-                    p.font.size = Pt(16)
-                    p.level = 0
-                
-                p.font.color.rgb = RGBColor(30, 41, 59)
-                p.space_after = Pt(8)  # Space between lines
-        
-        return slide
-    
     # Split content into slides - ensure minimum 10 slides
     slide_count = 1  # Already have title slide
     
@@ -720,8 +800,8 @@ def create_ppt_report(report_data, image_paths=None, output_filename=None, title
             slide_count += 1
     
     # Add image slides
-    for i, img_path in enumerate(image_paths[:4]):
-        if os.path.exists(img_path):
+    for i, img_path in enumerate(image_paths):
+        if dynamic_visualization.chart_exists(img_path):
             add_image_slide(prs, f"Visualization {i+1}", img_path)
             slide_count += 1
     
@@ -744,11 +824,83 @@ def create_ppt_report(report_data, image_paths=None, output_filename=None, title
     # Closing slide
     add_closing_slide(prs)
     
-    # Create output directory
-    output_dir = os.path.join(os.getcwd(), "outputs", "ppts")
-    os.makedirs(output_dir, exist_ok=True)
+    return _save_presentation(prs, output_filename)
+
+
+def _split_sentences(text, limit):
+    """Break a paragraph longer than limit into sentence groups that each fit (a single long sentence stays whole)."""
+    if len(text) <= limit:
+        return [text]
+    pieces, current = [], ""
+    for sentence in re.split(r'(?<=[.!?])\s+', text):
+        if current and len(current) + len(sentence) + 1 > limit:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    pieces.append(current)
+    return pieces
+
+
+def _add_text_slides(prs, title, items, as_bullets):
+    """
+    Spread payload text over as many slides as it needs instead of cutting it.
+    
+    Args:
+        prs: Presentation to add to
+        title: Title of the first slide; later ones are marked "(cont.)"
+        items: Paragraphs or bullet points, in order
+        as_bullets: Draw items as bullets (True) or as paragraphs
+    """
+    slides, current, size = [], [], 0
+    for item in items:
+        for piece in _split_sentences(item, PPT_MAX_CHARS_PER_SLIDE):
+            if current and (len(current) >= PPT_MAX_POINTS_PER_SLIDE or size + len(piece) > PPT_MAX_CHARS_PER_SLIDE):
+                slides.append(current)
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece)
+    if current:
+        slides.append(current)
+    for i, chunk in enumerate(slides):
+        add_dynamic_slide(prs, title if i == 0 else f"{title} (cont.)", chunk if as_bullets else "\n".join(chunk))
+
+
+def _build_ppt_payload(prs, payload):
+    """Add one slide group per ReportPayload section, with a slide per figure."""
+    add_title_slide(prs, payload.title, payload.subtitle or "Generated Report")
+    summary = [line.strip() for line in payload.executive_summary.split("\n") if line.strip()]
+    _add_text_slides(prs, "Executive Summary", summary, as_bullets=False)
+    if payload.kpis:
+        _add_text_slides(prs, "Key Metrics", [
+            f"{kpi.label}: {kpi.value}" + (f" ({kpi.change})" if kpi.change else "")
+            for kpi in payload.kpis
+        ], as_bullets=True)
+    
+    for section in payload.sections:
+        slide_title = section.title
+        if section.paragraphs:
+            _add_text_slides(prs, slide_title, section.paragraphs, as_bullets=False)
+            slide_title = f"{section.title} (cont.)"
+        if section.bullets:
+            _add_text_slides(prs, slide_title, section.bullets, as_bullets=True)
+        for figure in section.figures:
+            add_image_slide(prs, section.title, figure.path, figure.caption or "")
+    
+    if payload.key_findings:
+        _add_text_slides(prs, "Key Findings", payload.key_findings, as_bullets=True)
+    if payload.recommendations:
+        _add_text_slides(prs, "Recommendations", payload.recommendations, as_bullets=True)
+    add_closing_slide(prs)
+
+
+def _save_presentation(prs, output_filename):
+    # Presentations go to this session's directory in the artifact store
+    output_dir = artifact_store.store.output_dir("ppts")
     
     # Save
     output_path = os.path.join(output_dir, output_filename)
-    prs.save(output_path)
+    with tracing.file_write(output_path, "pptx", **{"ppt.slides": len(prs.slides)}):
+        prs.save(output_path)
+    artifact_store.store.register(output_path, "ppts")
     return output_path
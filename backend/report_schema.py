@@ -0,0 +1,103 @@
+"""
+Report Schema - Typed payload accepted by the PDF and PPT report tools
+
+The agents fill this structure directly instead of writing one free-text
+summary for the generators to re-parse. It is validated before anything is
+rendered, so a bad call fails fast with field-level errors the agent can fix
+in a single retry.
+"""
+from typing import List, Optional, Union
+
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+import dynamic_visualization
+from content_parser import clean_text
+
+
+MAX_SECTIONS = 12
+MAX_BULLETS = 10
+MAX_KPIS = 8
+
+
+def _clean_items(items: List[str]) -> List[str]:
+    """Strip markdown and drop blank entries."""
+    return [text for text in (clean_text(item) for item in items) if text]
+
+
+class KPI(BaseModel):
+    """A headline metric shown before the detailed sections."""
+    label: str = Field(description="Metric name, e.g. 'Total Revenue'", max_length=60)
+    value: str = Field(description="Formatted value, e.g. '$1.2M' or '34.5%'", max_length=40)
+    change: Optional[str] = Field(default=None, description="Optional comparison, e.g. '+12% vs last year'",
+                                  max_length=60)
+
+
+class FigureRef(BaseModel):
+    """A chart created earlier with a chart tool, referenced by its returned path."""
+    path: str = Field(description="Image path returned by the chart tool")
+    caption: Optional[str] = Field(default=None, description="One sentence explaining what the chart shows",
+                                   max_length=300)
+
+    @field_validator('path')
+    @classmethod
+    def chart_must_exist(cls, path: str) -> str:
+        # Chart tools return "path|CHART_DESC: ..."; accept that form as well
+        path = path.split('|', 1)[0].strip()
+        if not dynamic_visualization.chart_exists(path):
+            raise ValueError(f"chart '{path}' does not exist; use a path returned by a chart tool")
+        return path
+
+
+class ReportSection(BaseModel):
+    """One titled section: prose, bullet points and the charts that support it."""
+    title: str = Field(description="Section heading", min_length=1, max_length=80)
+    paragraphs: List[str] = Field(default_factory=list, description="Plain-text paragraphs, no markdown")
+    bullets: List[str] = Field(default_factory=list, max_length=MAX_BULLETS,
+                               description="Short bullet points with specific numbers")
+    figures: List[FigureRef] = Field(default_factory=list, description="Charts shown in this section")
+
+    @field_validator('paragraphs', 'bullets')
+    @classmethod
+    def strip_markdown(cls, items: List[str]) -> List[str]:
+        return _clean_items(items)
+
+
+class ReportPayload(BaseModel):
+    """Complete content of a PDF report or data-driven presentation."""
+    title: str = Field(description="Report or presentation title", min_length=1, max_length=80)
+    subtitle: Optional[str] = Field(default=None, max_length=120)
+    executive_summary: str = Field(description="2-3 paragraph overview of the most important insights",
+                                   min_length=1)
+    kpis: List[KPI] = Field(default_factory=list, max_length=MAX_KPIS)
+    sections: List[ReportSection] = Field(min_length=1, max_length=MAX_SECTIONS)
+    key_findings: List[str] = Field(default_factory=list, max_length=MAX_BULLETS)
+    recommendations: List[str] = Field(default_factory=list, max_length=MAX_BULLETS)
+
+    @field_validator('key_findings', 'recommendations')
+    @classmethod
+    def strip_markdown(cls, items: List[str]) -> List[str]:
+        return _clean_items(items)
+
+    def figures(self) -> List[FigureRef]:
+        """All figures in document order."""
+        return [figure for section in self.sections for figure in section.figures]
+
+
+def validate_report(report: Union[dict, ReportPayload]):
+    """
+    Validate a report payload coming from a tool call.
+
+    Returns:
+        (ReportPayload, None) on success, or (None, error message) listing every
+        invalid field so the agent can correct them in one retry.
+    """
+    if isinstance(report, ReportPayload):
+        return report, None
+    try:
+        return ReportPayload.model_validate(report), None
+    except ValidationError as e:
+        problems = "\n".join(
+            f"- {'.'.join(str(part) for part in error['loc']) or 'report'}: {error['msg']}"
+            for error in e.errors()
+        )
+        return None, f"Error: the report payload is invalid. Fix these fields and call the tool again:\n{problems}"
@@ -0,0 +1,14 @@
+"""
+Request Context - Per-request values shared by otherwise unrelated modules
+
+Kept in context variables so they follow the request through awaits and
+into worker threads started with contextvars.copy_context(), without
+threading a parameter through every agent and tool:
+- current_session: session the request belongs to; the LLM rate limiter
+  queues its calls fairly per session and the artifact store writes its
+  files under the session's directory
+"""
+import contextvars
+
+# Session the current request belongs to (set per request by the orchestrator)
+current_session = contextvars.ContextVar("session", default="default")
@@ -1,26 +1,72 @@
 import os
-import shutil
 import uvicorn
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Dict, Optional, List
+from email.utils import parsedate_to_datetime
+import mimetypes
 import re
+import time
+from contextlib import asynccontextmanager
 
 # Import existing modules
 import data_loader
-from analysis_agent import AnalysisAgent
+import dynamic_visualization
+import analysis_agent
+import app_logging
+import artifact_store
+import llm_client
+import metrics
+import plot_sandbox
+import rate_limiter
+import sessions
+import state_store
+import tracing
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = app_logging.get_logger(__name__)
+
+# Worker processes for `python server.py`; above 1 needs a shared STATE_BACKEND
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
+
+# Artifacts created within this many seconds are attached to a response that does not name them
+RECENT_ARTIFACT_SECONDS = 60
+
+# Artifact names carry a random suffix and are written once, so browsers may keep them
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
 # Thread pool for CPU-bound tasks (visualizations, PDF/PPT generation)
 executor = ThreadPoolExecutor(max_workers=4)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start and stop the server's background resources.
+
+    Startup indexes existing artifacts and starts their collector; shutdown
+    stops it, stops the plot workers, releases the pooled LLM connections
+    and exports spans still buffered in the trace exporters.
+    """
+    loop = asyncio.get_event_loop()
+    await loop.run_in_executor(executor, artifact_store.store.load)
+    artifact_store.store.start_gc()
+    try:
+        yield
+    finally:
+        artifact_store.store.stop_gc()
+        plot_sandbox.shutdown()
+        await llm_client.aclose()
+        tracing.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -31,8 +77,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global variable to store the active agent
-active_agent: Optional[AnalysisAgent] = None
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count and time every request by its route template."""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        metrics.http_requests.inc(method=request.method, route=path, status=str(status))
+        metrics.http_request_seconds.observe(time.perf_counter() - started, method=request.method, route=path)
+
+
+# Scrape-time gauges: worker queues, LLM limiter state, disk use, artifacts and log drops
+metrics.register_executor("server_executor", executor)
+metrics.register_executor("agent_executor", analysis_agent.executor)
+metrics.register_outputs_dir(artifact_store.store.root)
+for _field, _kind, _help in (
+    ("in_flight", "gauge", "LLM requests holding a concurrency slot"),
+    ("queued", "gauge", "LLM requests waiting for the rate limiter"),
+    ("concurrency_limit", "gauge", "Current adaptive LLM concurrency limit"),
+    ("granted", "counter", "LLM requests let through by the rate limiter"),
+    ("throttled", "counter", "LLM responses rejected with HTTP 429"),
+):
+    metrics.REGISTRY.register(metrics.Gauge(
+        f"llm_limiter_{_field}{'_total' if _kind == 'counter' else ''}", _help, kind=_kind,
+        collect=lambda field=_field: rate_limiter.limiter.get_stats()[field]))
+for _field, _kind, _help in (
+    ("artifacts", "gauge", "Artifacts in the artifact store index"),
+    ("bytes", "gauge", "Bytes held by indexed artifacts"),
+    ("collected", "counter", "Artifacts deleted by the artifact collector"),
+):
+    metrics.REGISTRY.register(metrics.Gauge(
+        f"artifact_store_{_field}{'_total' if _kind == 'counter' else ''}", _help, kind=_kind,
+        collect=lambda field=_field: artifact_store.store.get_stats()[field]))
+metrics.REGISTRY.register(metrics.Gauge(
+    "log_records_dropped_total", "Log records dropped because the log queue was full",
+    collect=app_logging.dropped_records, kind="counter"))
+
+
+# Session agents; dataset and conversation state live in the state backend
+session_manager = sessions.SessionManager()
+
+
+def _session_id(request: Request) -> str:
+    """Session named by the X-Session-Id header or session_id cookie (default: the shared session)."""
+    try:
+        return sessions.resolve_session_id(request.headers.get(sessions.SESSION_HEADER),
+                                           request.cookies.get(sessions.SESSION_COOKIE))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
 class AnalyzeRequest(BaseModel):
     prompt: str
@@ -40,19 +140,30 @@ class AnalyzeRequest(BaseModel):
 
 @app.post("/analyze")
 async def analyze(
+    request: Request,
+    response: Response,
     file: Optional[UploadFile] = File(None),
     prompt: str = Form(...),
     agent_type: Optional[str] = Form(None)  # Optional: force specific agent
 ):
-    global active_agent
+    session_id = _session_id(request)
+    # Echoed so clients and load balancers can pin the session to a worker
+    response.headers[sessions.SESSION_HEADER] = session_id
+    # One request per session at a time on this worker, so no turn is lost or reloaded mid-run
+    async with session_manager.lock(session_id):
+        return await _analyze_session(session_id, file, prompt, agent_type)
+
+
+async def _analyze_session(session_id: str, file: Optional[UploadFile], prompt: str,
+                           agent_type: Optional[str]):
+    """Body of /analyze, run while holding the session's lock."""
+    active_agent = None
     
     # 1. Handle File Upload
     if file and file.filename:
         try:
-            # Save file temporarily
-            file_location = f"temp_{file.filename}"
-            with open(file_location, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
+            # Keep the upload where every worker can reload it
+            file_location = session_manager.save_upload(session_id, file.filename, file.file)
             
             # Load data
             df = data_loader.load_data(file_location)
@@ -63,15 +174,17 @@ async def analyze(
             # Initialize Agent
             # Get API Key from env
             api_key = os.getenv("GROQ_API_KEY")
-            if not api_key:
+            if not api_key and llm_client.requires_api_key():
                  raise HTTPException(status_code=500, detail="GROQ_API_KEY not found in environment variables.")
 
-            active_agent = AnalysisAgent(df, api_key=api_key)
+            active_agent = session_manager.start(session_id, df, file_location, api_key=api_key)
             
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
     # 2. Check if agent is initialized
+    if active_agent is None:
+        active_agent = session_manager.get(session_id)
     if active_agent is None:
         # Determine if this is a request that can work without data
         ppt_keywords = ['ppt', 'presentation', 'powerpoint', 'slides', 'create ppt', 'make ppt', 'generate ppt']
@@ -81,18 +194,16 @@ async def analyze(
         
         # For PPT/PDF requests with text content, create agent with empty dataframe to enable agent conversation
         if is_ppt_request or (is_pdf_request and len(prompt) > 100):
-            import pandas as pd
             api_key = os.getenv("GROQ_API_KEY")
-            if not api_key:
+            if not api_key and llm_client.requires_api_key():
                 raise HTTPException(status_code=500, detail="GROQ_API_KEY not found in environment variables.")
             
             # Create agent with empty dataframe to enable conversation
             # The agent will still work for text-based content
-            empty_df = pd.DataFrame({'info': ['No data file uploaded. Working with text content.']})
-            active_agent = AnalysisAgent(empty_df, api_key=api_key)
+            active_agent = session_manager.start(session_id, sessions.text_only_frame(), None, api_key=api_key)
             
             # Mark that we're working without real data
-            print("DEBUG: Created agent without data file for text-based request")
+            logger.info("Created agent without data file for text-based request")
         else:
             # Return a helpful conversational response
             helpful_message = """Hello! I'm your Data Analysis Assistant. 
@@ -121,15 +232,13 @@ Once you upload a file, I can help you with:
     try:
         # Pass agent_type for forced routing (if user selected specific agent)
         response_text = await active_agent.analyze(prompt, agent_type=agent_type)
+        session_manager.save(active_agent)
         
         # 4. Extract Artifacts (Images/PDFs) from response text using parallel processing
         loop = asyncio.get_event_loop()
         
         def extract_paths(response: str):
             """Extract file paths from response text or check outputs folder - runs in thread pool"""
-            import glob
-            import time
-            
             result = {
                 "images": [],  # Changed to include descriptions
                 "image_paths": [],  # Keep for backward compatibility
@@ -138,14 +247,15 @@ Once you upload a file, I can help you with:
                 "dashboard_path": None
             }
             
-            outputs_dir = os.path.join(os.path.dirname(__file__), "outputs")
-            current_time = time.time()
+            # Artifacts this session produced while answering (indexed, no directory scans)
+            def recent(kind):
+                return artifact_store.store.recent(kind, RECENT_ARTIFACT_SECONDS, session=session_id)
             
             # Find all pngs with context for descriptions
             # Match paths like: D:\path\to\file.png or /path/to/file.png
             png_matches = re.findall(r'[A-Za-z]:[\\\/][^\s]+\.png|\/[^\s]+\.png', response)
             for i, match in enumerate(png_matches):
-                if os.path.exists(match):
+                if dynamic_visualization.chart_exists(match):
                     filename = os.path.basename(match)
                     url = f"http://localhost:8000/download/{filename}"
                     result["image_paths"].append(url)
@@ -167,6 +277,7 @@ Once you upload a file, I can help you with:
                     
                     result["images"].append({
                         "url": url,
+                        "preview_url": f"{url}?tier=preview",
                         "title": f"{chart_type} {i+1}",
                         "description": f"Generated {chart_type.lower()} based on data analysis"
                     })
@@ -179,17 +290,12 @@ Once you upload a file, I can help you with:
                     filename = os.path.basename(last_pdf)
                     result["pdf_path"] = f"http://localhost:8000/download/{filename}"
             
-            # If not found in response, check outputs/pdfs folder for recent files
+            # If not found in response, use the session's most recent PDF
             if not result["pdf_path"]:
-                pdf_folder = os.path.join(outputs_dir, "pdfs")
-                if os.path.exists(pdf_folder):
-                    pdf_files = glob.glob(os.path.join(pdf_folder, "*.pdf"))
-                    # Get files modified in last 60 seconds
-                    recent_pdfs = [f for f in pdf_files if current_time - os.path.getmtime(f) < 60]
-                    if recent_pdfs:
-                        latest_pdf = max(recent_pdfs, key=os.path.getmtime)
-                        filename = os.path.basename(latest_pdf)
-                        result["pdf_path"] = f"http://localhost:8000/download/{filename}"
+                recent_pdfs = recent("pdfs")
+                if recent_pdfs:
+                    filename = os.path.basename(recent_pdfs[0])
+                    result["pdf_path"] = f"http://localhost:8000/download/{filename}"
             
             # Find pptx - first check response, then check outputs folder
             pptx_matches = re.findall(r'[A-Za-z]:[\\\/][^\s]+\.pptx|\/[^\s]+\.pptx', response)
@@ -199,17 +305,12 @@ Once you upload a file, I can help you with:
                     filename = os.path.basename(last_pptx)
                     result["ppt_path"] = f"http://localhost:8000/download/{filename}"
             
-            # If not found in response, check outputs/ppts folder for recent files
+            # If not found in response, use the session's most recent presentation
             if not result["ppt_path"]:
-                ppt_folder = os.path.join(outputs_dir, "ppts")
-                if os.path.exists(ppt_folder):
-                    ppt_files = glob.glob(os.path.join(ppt_folder, "*.pptx"))
-                    # Get files modified in last 60 seconds
-                    recent_ppts = [f for f in ppt_files if current_time - os.path.getmtime(f) < 60]
-                    if recent_ppts:
-                        latest_ppt = max(recent_ppts, key=os.path.getmtime)
-                        filename = os.path.basename(latest_ppt)
-                        result["ppt_path"] = f"http://localhost:8000/download/{filename}"
+                recent_ppts = recent("ppts")
+                if recent_ppts:
+                    filename = os.path.basename(recent_ppts[0])
+                    result["ppt_path"] = f"http://localhost:8000/download/{filename}"
             
             # Find html dashboards - first check response, then outputs folder
             html_matches = re.findall(r'[A-Za-z]:[\\\/][^\s]*dashboard[^\s]*\.html|\/[^\s]*dashboard[^\s]*\.html', response)
@@ -219,44 +320,36 @@ Once you upload a file, I can help you with:
                     filename = os.path.basename(last_html)
                     result["dashboard_path"] = f"http://localhost:8000/download/{filename}"
             
-            # If not found in response, check outputs/dashboards folder for recent files
+            # If not found in response, use the session's most recent dashboard
             if not result["dashboard_path"]:
-                dashboard_folder = os.path.join(outputs_dir, "dashboards")
-                if os.path.exists(dashboard_folder):
-                    html_files = glob.glob(os.path.join(dashboard_folder, "*.html"))
-                    # Get files modified in last 60 seconds
-                    recent_htmls = [f for f in html_files if current_time - os.path.getmtime(f) < 60]
-                    if recent_htmls:
-                        latest_html = max(recent_htmls, key=os.path.getmtime)
-                        filename = os.path.basename(latest_html)
-                        result["dashboard_path"] = f"http://localhost:8000/download/{filename}"
+                recent_dashboards = recent("dashboards")
+                if recent_dashboards:
+                    filename = os.path.basename(recent_dashboards[0])
+                    result["dashboard_path"] = f"http://localhost:8000/download/{filename}"
             
-            # Also check outputs/graphs for recent images
+            # Also use the session's recent charts if the response named none
             if not result["image_paths"]:
-                graphs_folder = os.path.join(outputs_dir, "graphs")
-                if os.path.exists(graphs_folder):
-                    graph_files = glob.glob(os.path.join(graphs_folder, "*.png"))
-                    recent_graphs = [f for f in graph_files if current_time - os.path.getmtime(f) < 60]
-                    for i, graph_path in enumerate(sorted(recent_graphs, key=os.path.getmtime, reverse=True)[:5]):
-                        filename = os.path.basename(graph_path)
-                        url = f"http://localhost:8000/download/{filename}"
-                        result["image_paths"].append(url)
-                        
-                        chart_type = "Chart"
-                        if "bar" in filename.lower():
-                            chart_type = "Bar Chart"
-                        elif "line" in filename.lower():
-                            chart_type = "Line Chart"
-                        elif "pie" in filename.lower():
-                            chart_type = "Pie Chart"
-                        elif "hist" in filename.lower():
-                            chart_type = "Histogram"
-                        
-                        result["images"].append({
-                            "url": url,
-                            "title": f"{chart_type} {i+1}",
-                            "description": f"Generated visualization"
-                        })
+                for i, chart_path in enumerate(recent("graphs")[:5]):
+                    filename = os.path.basename(chart_path)
+                    url = f"http://localhost:8000/download/{filename}"
+                    result["image_paths"].append(url)
+                    
+                    chart_type = "Chart"
+                    if "bar" in filename.lower():
+                        chart_type = "Bar Chart"
+                    elif "line" in filename.lower():
+                        chart_type = "Line Chart"
+                    elif "pie" in filename.lower():
+                        chart_type = "Pie Chart"
+                    elif "hist" in filename.lower():
+                        chart_type = "Histogram"
+                    
+                    result["images"].append({
+                        "url": url,
+                        "preview_url": f"{url}?tier=preview",
+                        "title": f"{chart_type} {i+1}",
+                        "description": f"Generated visualization"
+                    })
             
             return result
         
@@ -273,35 +366,109 @@ Once you upload a file, I can help you with:
         }
 
     except Exception as e:
-        import traceback
         error_msg = f"Analysis failed: {str(e)}"
-        print(error_msg)
-        traceback.print_exc()
+        logger.exception(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
-@app.get("/download/{filename}")
-async def download_file(filename: str):
-    # Check in all output directories
-    output_dirs = [
-        os.path.join(os.getcwd(), "outputs", "graphs"),
-        os.path.join(os.getcwd(), "outputs", "pdfs"),
-        os.path.join(os.getcwd(), "outputs", "ppts"),
-        os.path.join(os.getcwd(), "outputs", "dashboards"),
-        os.getcwd()  # Fallback to root
-    ]
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """True if the client's cached copy (If-None-Match / If-Modified-Since) is still current."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison: W/"x" matches "x"
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """Parse Accept-Encoding into {coding: q}; '*' covers codings not listed."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def _negotiate_encoding(request: Request, variants: Dict[str, str]) -> Optional[str]:
+    """The preferred precompressed variant the client accepts, or None for the original file."""
+    accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+    for encoding in variants:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+@app.api_route("/download/{filename}", methods=["GET", "HEAD"])
+async def download_file(filename: str, request: Request, tier: Optional[str] = None):
+    """
+    Serve a generated artifact. Charts accept ?tier=preview|document|full|vector;
+    tiers are rendered from the stored figure spec on first request.
     
-    for output_dir in output_dirs:
-        file_path = os.path.join(output_dir, filename)
-        if os.path.exists(file_path):
-            return FileResponse(file_path)
+    Artifacts are found through the artifact index. Responses carry ETag and
+    Last-Modified, answer conditional requests with 304 and honour Range
+    requests, so large PDFs and presentations can be resumed. Dashboards and
+    SVG charts are sent as their precompressed brotli/gzip variant when the
+    client accepts one.
+    """
+    if tier and tier not in dynamic_visualization.CHART_TIERS:
+        raise HTTPException(status_code=400, detail=f"Unknown tier '{tier}'")
+    
+    entry = artifact_store.store.lookup(filename)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    file_path = artifact_store.store.resolve(filename)
+    
+    if entry["kind"] == "graphs" and (tier or (file_path == entry["path"] and not os.path.exists(file_path))):
+        # Render the requested tier from the chart's spec off the event loop (cached on disk afterwards)
+        loop = asyncio.get_event_loop()
+        try:
+            file_path = await loop.run_in_executor(
+                executor, dynamic_visualization.render_chart_tier, entry["path"], tier or 'document'
+            )
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="File not found")
     
-    raise HTTPException(status_code=404, detail="File not found")
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL if entry["immutable"] else REVALIDATE_CACHE_CONTROL}
+    media_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+    variants = artifact_store.store.encoded_variants(file_path)
+    if variants:
+        headers["Vary"] = "Accept-Encoding"
+        encoding = _negotiate_encoding(request, variants)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            file_path = variants[encoding]
+    
+    try:
+        stat_result = os.stat(file_path)
+    except FileNotFoundError:
+        # Collected or removed since it was indexed
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    response = FileResponse(file_path, stat_result=stat_result, media_type=media_type, headers=headers)
+    if _not_modified(request, response.headers["etag"], stat_result.st_mtime):
+        headers = {name: response.headers[name] for name in ("etag", "last-modified", "cache-control", "vary")
+                   if name in response.headers}
+        return Response(status_code=304, headers=headers)
+    return response
 
 
 @app.get("/history")
-async def get_history():
+async def get_history(request: Request):
     """Get conversation history and cache statistics."""
-    global active_agent
+    active_agent = session_manager.get(_session_id(request))
     
     if active_agent is None:
         return {
@@ -311,26 +478,36 @@ async def get_history():
     
     return {
         "history": active_agent.get_conversation_history(),
-        "stats": active_agent.conversation.get_stats()
+        "stats": active_agent.conversation.get_stats(),
+        "fast_path": active_agent.fast_path.get_stats()
     }
 
 
 @app.delete("/history")
-async def clear_history():
+async def clear_history(request: Request):
     """Clear conversation history and cache."""
-    global active_agent
-    
-    if active_agent is not None:
-        active_agent.clear_history()
-        return {"message": "History and cache cleared successfully"}
+    session_id = _session_id(request)
+    async with session_manager.lock(session_id):
+        active_agent = session_manager.get(session_id)
+        
+        if active_agent is not None:
+            active_agent.clear_history()
+            session_manager.save(active_agent)
+            return {"message": "History and cache cleared successfully"}
     
     return {"message": "No active session to clear"}
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: requests, cache hits, LLM and tool latency, queues, disk use."""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/agent-info")
-async def get_agent_info():
+async def get_agent_info(request: Request):
     """Get information about available agents."""
-    global active_agent
+    active_agent = session_manager.get(_session_id(request))
     
     if active_agent is None:
         return {"error": "No active agent. Upload a file first."}
@@ -339,4 +516,8 @@ async def get_agent_info():
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if SERVER_WORKERS > 1 and not state_store.get_backend().shared:
+        logger.warning("SERVER_WORKERS=%d with the in-memory state backend: workers will not share sessions. "
+                       "Set STATE_BACKEND=sqlite or redis.", SERVER_WORKERS)
+    # Several workers need an import string so each process builds its own app
+    uvicorn.run("server:app" if SERVER_WORKERS > 1 else app, host="0.0.0.0", port=8000, workers=SERVER_WORKERS)
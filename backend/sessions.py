@@ -0,0 +1,184 @@
+"""
+Sessions - Per-session agents backed by the shared state store
+
+Each client session owns a dataset and a conversation. The dataset file
+path and the conversation history/cache live in the state backend, so any
+worker process can answer for any session: a worker keeps recently used
+agents warm in an LRU cache (session affinity) and rebuilds an agent from
+the stored dataset the first time it sees a session, or after another
+worker replaced the session's dataset.
+
+Clients pick a session with the X-Session-Id header or the session_id
+cookie; requests without one share the "default" session, as the
+single-user UI always has.
+
+Concurrent requests: a worker runs one request per session at a time
+(SessionManager.lock), and saving appends the request's turns to the
+stored conversation in one atomic backend update, so turns answered by
+other workers meanwhile are kept. Requests for one session on different
+workers still run side by side: each sees only the turns saved before it
+started, and turns are stored in the order the requests finish.
+"""
+import os
+import re
+import uuid
+import shutil
+import asyncio
+import weakref
+from datetime import datetime
+from typing import BinaryIO, Dict, Optional
+
+import pandas as pd
+
+import app_logging
+import data_loader
+import state_store
+from analysis_agent import AnalysisAgent
+from caching import LRUCache
+
+logger = app_logging.get_logger(__name__)
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(os.getcwd(), "uploads"))
+# Agents (dataframe, stats, specialized agents) kept warm per worker
+SESSION_AGENT_CACHE_SIZE = int(os.getenv("SESSION_AGENT_CACHE_SIZE", "16"))
+
+DEFAULT_SESSION = "default"
+SESSION_HEADER = "X-Session-Id"
+SESSION_COOKIE = "session_id"
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def _session_key(session_id: str) -> str:
+    return f"session:{session_id}"
+
+
+def _conversation_key(session_id: str) -> str:
+    return f"conversation:{session_id}"
+
+
+def text_only_frame() -> pd.DataFrame:
+    """Placeholder data for sessions that build PPTs/PDFs from text without an upload."""
+    return pd.DataFrame({'info': ['No data file uploaded. Working with text content.']})
+
+
+def resolve_session_id(header: Optional[str], cookie: Optional[str]) -> str:
+    """
+    Session named by the request, or DEFAULT_SESSION.
+
+    Raises:
+        ValueError: The id is not 1-64 letters, digits, '_' or '-'.
+    """
+    session_id = header or cookie or DEFAULT_SESSION
+    if not _SESSION_ID.match(session_id):
+        raise ValueError("Session ids must be 1-64 letters, digits, '_' or '-'")
+    return session_id
+
+
+class SessionManager:
+    """Creates, restores and saves session agents through a StateBackend."""
+
+    def __init__(self, backend: Optional[state_store.StateBackend] = None, upload_dir: str = UPLOAD_DIR,
+                 cache_size: int = SESSION_AGENT_CACHE_SIZE):
+        self._backend = backend
+        self.upload_dir = upload_dir
+        # session id -> (agent, session record)
+        self._agents = LRUCache(max_size=cache_size, name="session_agents")
+        # session id -> lock held while a request runs; dropped once nobody holds or awaits it
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    @property
+    def backend(self) -> state_store.StateBackend:
+        return self._backend or state_store.get_backend()
+
+    def lock(self, session_id: str) -> asyncio.Lock:
+        """Lock serializing the requests for session_id on this worker (hold it across get/analyze/save)."""
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[session_id] = lock
+        return lock
+
+    def save_upload(self, session_id: str, filename: str, fileobj: BinaryIO) -> str:
+        """Store an uploaded dataset where every worker can read it; returns its path."""
+        directory = os.path.join(self.upload_dir, session_id)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, os.path.basename(filename))
+        with open(path, "wb") as buffer:
+            shutil.copyfileobj(fileobj, buffer)
+        return path
+
+    def start(self, session_id: str, df: pd.DataFrame, dataset_path: Optional[str],
+              api_key: str = None) -> AnalysisAgent:
+        """
+        Begin a session on a new dataset, replacing any previous one.
+
+        Args:
+            session_id: Session to (re)start
+            df: The loaded dataset
+            dataset_path: File the dataset was loaded from (None for text-only sessions)
+            api_key: LLM API key
+        """
+        record = {
+            "dataset_id": uuid.uuid4().hex,
+            "dataset_path": dataset_path,
+            "created": datetime.now().isoformat(),
+        }
+        agent = AnalysisAgent(df, api_key=api_key, session_id=session_id)
+        self.backend.set(_session_key(session_id), record)
+        self.backend.set(_conversation_key(session_id), agent.conversation.to_dict())
+        self._agents.put(session_id, (agent, record))
+        return agent
+
+    def get(self, session_id: str, api_key: str = None) -> Optional[AnalysisAgent]:
+        """
+        The session's agent with its latest conversation, or None if the session has no dataset yet.
+
+        Uses this worker's warm agent when its dataset is still current,
+        otherwise rebuilds the agent from the stored dataset.
+        """
+        record = self.backend.get(_session_key(session_id))
+        if record is None:
+            return None
+        cached = self._agents.get(session_id)
+        if cached is not None and cached[1]["dataset_id"] == record["dataset_id"]:
+            agent = cached[0]
+        else:
+            agent = self._restore(session_id, record, api_key)
+            if agent is None:
+                return None
+        # Another worker may have answered for this session since; turns this worker
+        # has not saved yet are kept
+        agent.conversation.load(self.backend.get(_conversation_key(session_id)))
+        return agent
+
+    def _restore(self, session_id: str, record: Dict, api_key: str = None) -> Optional[AnalysisAgent]:
+        dataset_path = record.get("dataset_path")
+        if dataset_path:
+            df = data_loader.load_data(dataset_path) if os.path.exists(dataset_path) else None
+            if df is None:
+                logger.warning("Dataset for session is gone", extra={"session": session_id, "path": dataset_path})
+                return None
+        else:
+            df = text_only_frame()
+        agent = AnalysisAgent(df, api_key=api_key or os.getenv("GROQ_API_KEY"), session_id=session_id)
+        self._agents.put(session_id, (agent, record))
+        logger.info("Restored session on this worker", extra={"session": session_id})
+        return agent
+
+    def save(self, agent: AnalysisAgent) -> None:
+        """
+        Persist the agent's new turns and refresh the session's expiry.
+
+        The turns are merged into the stored conversation atomically rather
+        than overwriting it, so a concurrent request's turns are not lost.
+        """
+        # Re-read rather than reuse the cached record: another worker may have replaced the dataset
+        record = self.backend.get(_session_key(agent.session_id))
+        if record is not None:
+            self.backend.set(_session_key(agent.session_id), record)
+        stored = self.backend.update(_conversation_key(agent.session_id), agent.conversation.merged)
+        agent.conversation.mark_saved(stored)
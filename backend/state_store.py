@@ -0,0 +1,242 @@
+"""
+State Store - Key/value backend for state shared by server worker processes
+
+Session records, conversation history and the artifact index are kept
+behind a small get/set/update/delete interface so the server can run as several
+worker processes (uvicorn --workers N). Values are JSON documents.
+
+Backends (STATE_BACKEND):
+- memory: a dict in this process (default; only correct with one worker)
+- sqlite: a SQLite file in WAL mode, shared by the workers on one host
+- redis:  any Redis-protocol server, e.g. a local redis/valkey (needs the redis package)
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional
+
+import app_logging
+
+logger = app_logging.get_logger(__name__)
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory").lower()
+STATE_SQLITE_PATH = os.getenv("STATE_SQLITE_PATH", os.path.join(os.getcwd(), "outputs", "state.db"))
+STATE_REDIS_URL = os.getenv("STATE_REDIS_URL", "redis://localhost:6379/0")
+# Sessions idle for longer than this are forgotten
+STATE_TTL_SECONDS = int(os.getenv("STATE_TTL_SECONDS", str(24 * 3600)))
+
+
+class StateBackend(ABC):
+    """Interface: JSON-serializable dicts stored under string keys, with optional expiry."""
+
+    name = "base"
+    # True if other processes see the same data
+    shared = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict]:
+        """The value stored under key, or None if it is missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: Dict, ttl: Optional[float] = STATE_TTL_SECONDS) -> None:
+        """Store value under key, expiring after ttl seconds (None or 0 keeps it)."""
+
+    @abstractmethod
+    def update(self, key: str, fn: Callable[[Optional[Dict]], Dict],
+               ttl: Optional[float] = STATE_TTL_SECONDS) -> Dict:
+        """
+        Atomically replace the value under key with fn(current value or None).
+
+        No other get/set/update of key interleaves, in this process or
+        another one sharing the backend; fn may be called again if a
+        concurrent write forces a retry. Returns the stored value.
+        """
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove key if present."""
+
+
+class MemoryBackend(StateBackend):
+    """In-process dict. Values are stored serialized so callers never share mutable state."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}  # key -> (json, expires_at or None)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[1] is not None and item[1] < time.time():
+                del self._data[key]
+                return None
+            return json.loads(item[0])
+
+    def set(self, key: str, value: Dict, ttl: Optional[float] = STATE_TTL_SECONDS) -> None:
+        expires = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (json.dumps(value, default=str), expires)
+
+    def update(self, key: str, fn: Callable[[Optional[Dict]], Dict],
+               ttl: Optional[float] = STATE_TTL_SECONDS) -> Dict:
+        with self._lock:
+            item = self._data.get(key)
+            current = json.loads(item[0]) if item and (item[1] is None or item[1] >= time.time()) else None
+            value = fn(current)
+            self._data[key] = (json.dumps(value, default=str), time.time() + ttl if ttl else None)
+            return value
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class SQLiteBackend(StateBackend):
+    """
+    SQLite file shared by every worker on the host.
+
+    WAL mode lets readers proceed while one worker writes; each thread keeps
+    its own connection.
+    """
+
+    name = "sqlite"
+    shared = True
+
+    def __init__(self, path: str = STATE_SQLITE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS state ("
+                         "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)")
+            # Expired rows are ignored by get(); drop them whenever a worker starts
+            conn.execute("DELETE FROM state WHERE expires_at < ?", (time.time(),))
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at >= ?)",
+            (key, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Dict, ttl: Optional[float] = STATE_TTL_SECONDS) -> None:
+        expires = time.time() + ttl if ttl else None
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, json.dumps(value, default=str), expires))
+
+    def update(self, key: str, fn: Callable[[Optional[Dict]], Dict],
+               ttl: Optional[float] = STATE_TTL_SECONDS) -> Dict:
+        conn = self._connection()
+        # Take the write lock before reading so no other worker writes in between
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at >= ?)",
+                (key, time.time())).fetchone()
+            value = fn(json.loads(row[0]) if row else None)
+            conn.execute("INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, json.dumps(value, default=str), time.time() + ttl if ttl else None))
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        return value
+
+    def delete(self, key: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM state WHERE key = ?", (key,))
+
+
+class RedisBackend(StateBackend):
+    """Redis-protocol server (redis, valkey, ...) reachable at STATE_REDIS_URL."""
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, url: str = STATE_REDIS_URL):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("STATE_BACKEND=redis requires the redis package (pip install redis)")
+        self.url = url
+        self._client = redis.Redis.from_url(url)
+        self._watch_error = redis.WatchError
+
+    def get(self, key: str) -> Optional[Dict]:
+        value = self._client.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Dict, ttl: Optional[float] = STATE_TTL_SECONDS) -> None:
+        self._client.set(key, json.dumps(value, default=str), ex=int(ttl) if ttl else None)
+
+    def update(self, key: str, fn: Callable[[Optional[Dict]], Dict],
+               ttl: Optional[float] = STATE_TTL_SECONDS) -> Dict:
+        # Optimistic check-and-set: the transaction fails if key changed after WATCH
+        with self._client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    current = pipe.get(key)
+                    value = fn(json.loads(current) if current is not None else None)
+                    pipe.multi()
+                    pipe.set(key, json.dumps(value, default=str), ex=int(ttl) if ttl else None)
+                    pipe.execute()
+                    return value
+                except self._watch_error:
+                    continue
+
+    def delete(self, key: str) -> None:
+        self._client.delete(key)
+
+
+_BACKENDS = {"memory": MemoryBackend, "sqlite": SQLiteBackend, "redis": RedisBackend}
+
+_backend: Optional[StateBackend] = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(kind: str = None) -> StateBackend:
+    """
+    Build a backend by name.
+
+    Args:
+        kind: memory, sqlite or redis (default STATE_BACKEND)
+
+    Raises:
+        ValueError: Unknown backend name.
+    """
+    kind = kind or STATE_BACKEND
+    if kind not in _BACKENDS:
+        raise ValueError(f"Unknown STATE_BACKEND '{kind}'. Use one of: {', '.join(_BACKENDS)}")
+    return _BACKENDS[kind]()
+
+
+def get_backend() -> StateBackend:
+    """The process-wide backend, created from STATE_BACKEND on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+                logger.info("Using %s state backend", _backend.name)
+    return _backend
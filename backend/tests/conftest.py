@@ -0,0 +1,16 @@
+import os
+import sys
+
+# Backend modules are imported as top-level modules, as the server does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def artifact_root(tmp_path, monkeypatch):
+    """Write generated charts and reports to a per-test artifact store."""
+    import artifact_store
+    store = artifact_store.ArtifactStore(str(tmp_path / "outputs"))
+    monkeypatch.setattr(artifact_store, "store", store)
+    return store
@@ -0,0 +1,138 @@
+"""
+Mock OpenAI Server - Local OpenAI-compatible chat completions endpoint for tests
+
+Answers POST /chat/completions (plain and streamed) with a fixed reply, or
+with scripted errors such as 429s, and records which client connections each
+request arrived on, so tests can check connection reuse and rate limiting
+without a network or API key.
+"""
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        with server.lock:
+            server.requests.append({"path": self.path, "body": body, "client": self.client_address})
+            server.connections.add(self.client_address)
+
+        with server.lock:
+            scripted = server.script.popleft() if server.script else None
+        if scripted is not None:
+            # Scripted error, e.g. (429, {"Retry-After": "1"})
+            status, headers = scripted
+            error = json.dumps({"error": {"message": "scripted error", "type": "mock"}}).encode()
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(error)))
+            self.end_headers()
+            self.wfile.write(error)
+            return
+
+        if not self.path.endswith("/chat/completions"):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        reply = server.reply
+        created = int(time.time())
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            chunks = [{"role": "assistant", "content": ""}] + [{"content": word} for word in reply.split(" ")]
+            for i, delta in enumerate(chunks):
+                if i > 1:
+                    delta["content"] = " " + delta["content"]
+                event = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created,
+                         "model": body.get("model", "mock"),
+                         "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+                self._write_chunk(f"data: {json.dumps(event)}\n\n")
+            done = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created,
+                    "model": body.get("model", "mock"),
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            self._write_chunk(f"data: {json.dumps(done)}\n\n")
+            self._write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+            return
+
+        payload = json.dumps({
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": created,
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": reply}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": len(reply.split()), "total_tokens": 10},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _write_chunk(self, text: str) -> None:
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+
+class MockOpenAIServer:
+    """
+    Threaded mock server; use as a context manager.
+
+    Attributes:
+        base_url: API base to point the client at, e.g. http://127.0.0.1:PORT/v1
+        requests: Every request received ({path, body, client})
+        connections: Distinct (host, port) client connections seen
+    """
+
+    def __init__(self, reply: str = "Hello from the mock model"):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.lock = threading.Lock()
+        self._server.requests = []
+        self._server.connections = set()
+        self._server.reply = reply
+        self._server.script = deque()
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def fail_next(self, count: int, status: int = 429, headers: dict = None) -> None:
+        """Answer the next count requests with an error status and headers."""
+        with self._server.lock:
+            self._server.script.extend([(status, headers or {})] * count)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def requests(self):
+        return self._server.requests
+
+    @property
+    def connections(self):
+        return self._server.connections
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
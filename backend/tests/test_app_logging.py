@@ -0,0 +1,71 @@
+"""
+Tests for the queue-buffered structured logger.
+
+Run from the backend directory:
+    python -m pytest tests/test_app_logging.py -q
+"""
+import io
+import json
+import queue
+
+import pytest
+
+import app_logging
+
+
+@pytest.fixture
+def output():
+    stream = io.StringIO()
+    app_logging.setup(level="DEBUG", fmt="json", stream=stream)
+    yield stream
+    app_logging.setup()
+
+
+def _records(stream):
+    app_logging.shutdown()  # drains the queue
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_records_keep_extra_fields(output):
+    logger = app_logging.get_logger("test")
+    logger.info("Routed %s", "query", extra={"session": "abc", "agent": "pdf"})
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Agent failed")
+
+    routed, failed = _records(output)
+
+    assert routed["msg"] == "Routed query"
+    assert routed["level"] == "INFO"
+    assert routed["logger"] == "data_agent.test"
+    assert (routed["session"], routed["agent"]) == ("abc", "pdf")
+    assert "ValueError: boom" in failed["exc"]
+
+
+def test_level_and_sampling_filters(output, monkeypatch):
+    monkeypatch.setattr(app_logging, "LOG_SAMPLE_RATE", 0.0)
+    logger = app_logging.get_logger("test")
+    logger.setLevel("INFO")
+    try:
+        logger.debug("hidden")
+        logger.info("cache hit", extra=app_logging.SAMPLED)
+        logger.info("kept")
+    finally:
+        logger.setLevel("NOTSET")
+
+    assert [record["msg"] for record in _records(output)] == ["kept"]
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = app_logging._DroppingQueueHandler(queue.Queue(maxsize=1))
+    logger = app_logging.get_logger("test.full")
+    logger.addHandler(handler)
+    try:
+        for _ in range(3):
+            logger.warning("burst")
+    finally:
+        logger.removeHandler(handler)
+
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 2
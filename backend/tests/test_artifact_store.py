@@ -0,0 +1,144 @@
+"""
+Tests for the artifact store index, quotas and collector.
+
+Run from the backend directory:
+    python -m pytest tests/test_artifact_store.py -q
+"""
+import os
+import time
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import artifact_store
+import dynamic_visualization
+import llm_client
+import plot_sandbox
+import request_context
+import server
+import sessions
+import state_store
+import tracing
+
+
+def _write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    return path
+
+
+def test_artifacts_are_indexed_per_session(tmp_path):
+    store = artifact_store.ArtifactStore(str(tmp_path))
+    token = request_context.current_session.set("session-a")
+    try:
+        chart_dir = store.output_dir("graphs")
+    finally:
+        request_context.current_session.reset(token)
+    assert chart_dir == str(tmp_path / "graphs" / "session-a")
+
+    chart = os.path.join(chart_dir, "sales_bar_chart_1a2b.png")
+    spec = _write(os.path.join(chart_dir, "sales_bar_chart_1a2b.json"), 10)
+    store.register(chart, "graphs", files=[spec])
+    preview = _write(os.path.join(chart_dir, "sales_bar_chart_1a2b.preview.webp"), 5)
+    store.attach(chart, preview)
+    pdf = _write(os.path.join(store.output_dir("pdfs", session="session-b"), "report_1.pdf"), 20)
+    store.register(pdf, "pdfs")
+
+    assert store.resolve("sales_bar_chart_1a2b.png") == chart
+    assert store.resolve("sales_bar_chart_1a2b.preview.webp") == preview
+    assert store.lookup("sales_bar_chart_1a2b.preview.webp")["size"] == 15
+    assert store.resolve("missing.pdf") is None
+    assert store.recent("pdfs", 60, session="session-b") == [pdf]
+    assert store.recent("pdfs", 60, session="session-a") == []
+
+
+def test_chart_batch_writes_to_the_callers_session(artifact_root):
+    df = pd.DataFrame({"Region": ["N", "S", "N"], "Sales": [1.0, 2.0, 3.0]})
+    specs = [
+        {"code": "fig = px.bar(df, x='Region', y='Sales', title='Sales by Region')"},
+        {"chart_type": "bar", "x": "Region", "y": "Sales", "agg": "sum", "title": "Total Sales"},
+    ]
+    token = request_context.current_session.set("sessA")
+    try:
+        results = dynamic_visualization.render_chart_batch(df, specs)
+        recent = artifact_root.recent("graphs", 60, session="sessA")
+    finally:
+        request_context.current_session.reset(token)
+
+    paths = [result.split("|")[0] for result in results]
+    assert all("|CHART_DESC:" in result for result in results), results
+    assert all(os.path.dirname(path) == artifact_root.output_dir("graphs", session="sessA") for path in paths)
+    assert sorted(recent) == sorted(paths)
+
+
+def test_existing_files_are_indexed_once(tmp_path):
+    _write(str(tmp_path / "graphs" / "old_chart_ab12.png"), 4)
+    _write(str(tmp_path / "graphs" / "old_chart_ab12.full.png"), 4)
+    _write(str(tmp_path / "ppts" / "abc" / "presentation_1.pptx"), 4)
+    _write(str(tmp_path / "pdfs" / "report_2.pdf.part"), 4)
+    _write(str(tmp_path / "dashboards" / "abc" / "dashboard_1.html"), 4)
+    _write(str(tmp_path / "dashboards" / "abc" / "dashboard_1.html.gz"), 2)
+    store = artifact_store.ArtifactStore(str(tmp_path))
+
+    entry = store.lookup("old_chart_ab12.full.png")
+
+    assert entry["name"] == "old_chart_ab12.png"
+    assert entry["session"] == artifact_store.SHARED_SESSION
+    assert len(entry["files"]) == 2
+    assert store.lookup("presentation_1.pptx")["session"] == "abc"
+    assert store.resolve("report_2.pdf.part") is None
+    assert store.lookup("dashboard_1.html.gz")["name"] == "dashboard_1.html"
+    assert store.get_stats()["artifacts"] == 3
+
+
+def test_collector_enforces_age_and_quotas(tmp_path):
+    store = artifact_store.ArtifactStore(str(tmp_path), max_bytes=250, session_max_bytes=150,
+                                         max_age_seconds=3600)
+    now = time.time()
+    entries = {}
+    for name, session, age in [("expired", "a", 7200), ("a1", "a", 300), ("a2", "a", 200),
+                               ("b1", "b", 250), ("c1", "c", 50)]:
+        path = _write(os.path.join(store.output_dir("pdfs", session=session), f"{name}.pdf"), 100)
+        entries[name] = store.register(path, "pdfs")
+        entries[name]["created"] = now - age
+
+    result = store.collect(now=now)
+
+    # expired by age; a1 over session a's quota; b1 is then the oldest over the total quota
+    assert result == {"removed": 3, "freed_bytes": 300}
+    assert [name for name in entries if store.resolve(f"{name}.pdf")] == ["a2", "c1"]
+    assert not os.path.exists(entries["a1"]["path"])
+    assert os.path.exists(entries["a2"]["path"])
+
+
+def test_server_lifespan_runs_the_collector(artifact_root, monkeypatch):
+    stopped = []
+    monkeypatch.setattr(plot_sandbox, "shutdown", lambda: stopped.append("plot_sandbox"))
+    monkeypatch.setattr(tracing, "shutdown", lambda: stopped.append("tracing"))
+    _write(os.path.join(artifact_root.output_dir("pdfs", session="s1"), "report_1.pdf"), 10)
+
+    with TestClient(server.app):
+        assert artifact_root.resolve("report_1.pdf") is not None
+        gc_thread = artifact_root._gc_thread
+        assert gc_thread.is_alive()
+
+    assert not gc_thread.is_alive()
+    assert stopped == ["plot_sandbox", "tracing"]
+
+
+def test_analyze_response_links_indexed_artifacts(artifact_root, tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_PROVIDER", "mock")
+    monkeypatch.setattr(server, "session_manager", sessions.SessionManager(
+        state_store.MemoryBackend(), upload_dir=str(tmp_path / "uploads")))
+    client = TestClient(server.app)
+    csv = b"Region,Sales\nNorth,10.0\nSouth,20.5\nNorth,7.25\nEast,3.0\n"
+
+    body = client.post("/analyze", data={"prompt": "create a dashboard", "agent_type": "dashboard"},
+                       files={"file": ("sales.csv", csv, "text/csv")}, headers={"X-Session-Id": "e2e"}).json()
+
+    filename = body["dashboard_path"].rsplit("/", 1)[-1]
+    path = artifact_root.resolve(filename)
+    assert os.path.dirname(path) == os.path.join(artifact_root.root, "dashboards", "e2e")
+    assert client.get(f"/download/{filename}").status_code == 200
+    assert client.get("/download/not_there.pdf").status_code == 404
@@ -0,0 +1,121 @@
+"""
+Tests for /download: index lookup, cache validators, range requests and
+precompressed variants.
+
+Run from the backend directory:
+    python -m pytest tests/test_download.py -q
+"""
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import artifact_store
+import server
+
+
+@pytest.fixture
+def pdf(artifact_root):
+    path = os.path.join(artifact_root.output_dir("pdfs", session="abc"), "report_1a2b3c4d.pdf")
+    with open(path, "wb") as f:
+        f.write(bytes(range(256)) * 40)
+    artifact_root.register(path, "pdfs")
+    return path
+
+
+@pytest.fixture
+def client():
+    return TestClient(server.app)
+
+
+def test_download_sets_validators_and_immutable_caching(client, pdf):
+    response = client.get("/download/report_1a2b3c4d.pdf")
+
+    assert response.status_code == 200
+    assert response.content == open(pdf, "rb").read()
+    assert response.headers["cache-control"] == server.IMMUTABLE_CACHE_CONTROL
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["etag"] and response.headers["last-modified"]
+
+
+def test_conditional_requests_get_304(client, pdf):
+    first = client.get("/download/report_1a2b3c4d.pdf")
+
+    by_etag = client.get("/download/report_1a2b3c4d.pdf", headers={"If-None-Match": f'W/{first.headers["etag"]}'})
+    by_date = client.get("/download/report_1a2b3c4d.pdf",
+                         headers={"If-Modified-Since": first.headers["last-modified"]})
+    changed = client.get("/download/report_1a2b3c4d.pdf", headers={"If-None-Match": '"other"'})
+
+    assert by_etag.status_code == 304 and by_etag.content == b""
+    assert by_etag.headers["etag"] == first.headers["etag"]
+    assert by_date.status_code == 304
+    assert changed.status_code == 200
+
+
+def test_range_requests(client, pdf):
+    data = open(pdf, "rb").read()
+
+    partial = client.get("/download/report_1a2b3c4d.pdf", headers={"Range": "bytes=100-199"})
+    head = client.head("/download/report_1a2b3c4d.pdf")
+
+    assert partial.status_code == 206
+    assert partial.content == data[100:200]
+    assert partial.headers["content-range"] == f"bytes 100-199/{len(data)}"
+    assert head.status_code == 200 and head.headers["content-length"] == str(len(data))
+
+
+def test_only_indexed_artifacts_are_served(client, pdf, artifact_root):
+    # Files in the working directory are not served
+    assert client.get("/download/requirements.txt").status_code == 404
+
+    # A name written twice must be revalidated
+    artifact_root.register(pdf, "pdfs")
+    assert client.get("/download/report_1a2b3c4d.pdf").headers["cache-control"] == "no-cache"
+
+    os.remove(pdf)
+    assert client.get("/download/report_1a2b3c4d.pdf").status_code == 404
+
+
+@pytest.fixture
+def dashboard(artifact_root):
+    path = os.path.join(artifact_root.output_dir("dashboards", session="abc"), "dashboard_1a2b3c4d.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<html><script>const data = [" + ",".join(str(i % 97) for i in range(20000)) + "];</script></html>")
+    artifact_root.register(path, "dashboards", files=[path] + artifact_store.precompress(path))
+    return path
+
+
+def test_precompressed_variant_is_negotiated(client, dashboard):
+    original = open(dashboard, "rb").read()
+
+    compressed = client.get("/download/dashboard_1a2b3c4d.html", headers={"Accept-Encoding": "gzip"})
+    identity = client.get("/download/dashboard_1a2b3c4d.html", headers={"Accept-Encoding": "identity"})
+    refused = client.get("/download/dashboard_1a2b3c4d.html", headers={"Accept-Encoding": "gzip;q=0, *;q=0"})
+
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert int(compressed.headers["content-length"]) < len(original) / 5
+    assert compressed.content == original  # decoded by the client
+    assert compressed.headers["content-type"].startswith("text/html")
+    assert "Accept-Encoding" in compressed.headers["vary"]
+    assert "content-encoding" not in identity.headers and identity.content == original
+    assert "content-encoding" not in refused.headers
+    assert compressed.headers["etag"] != identity.headers["etag"]
+
+
+def test_brotli_variant_is_preferred(client, dashboard):
+    brotli = pytest.importorskip("brotli")
+
+    response = client.get("/download/dashboard_1a2b3c4d.html", headers={"Accept-Encoding": "gzip, br"})
+
+    assert response.headers["content-encoding"] == "br"
+    assert brotli.decompress(open(dashboard + ".br", "rb").read()) == open(dashboard, "rb").read()
+
+
+def test_only_text_artifacts_are_precompressed(tmp_path):
+    png = tmp_path / "chart.png"
+    png.write_bytes(b"\x89PNG" + b"0" * 5000)
+    small = tmp_path / "tiny.html"
+    small.write_text("<p>hi</p>")
+
+    assert artifact_store.precompress(str(png)) == []
+    assert artifact_store.precompress(str(small)) == []
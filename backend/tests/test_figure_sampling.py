@@ -0,0 +1,62 @@
+"""
+Tests for server-side histogram binning in figure_sampling.
+
+Run from the backend directory:
+    python -m pytest tests/test_figure_sampling.py -q
+"""
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import pytest
+
+import figure_sampling
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({"v": rng.normal(size=200_000)})
+
+
+def _bars(fig):
+    trace = fig.data[0]
+    assert trace.type == "bar" and trace.meta == figure_sampling.BINNED_HISTOGRAM_META
+    return np.asarray(trace.y, dtype=float)
+
+
+def test_plain_histogram_is_binned_into_counts(df):
+    fig = px.histogram(df, x="v")
+
+    note = figure_sampling.downsample_figure(fig)
+
+    heights = _bars(fig)
+    assert len(heights) == figure_sampling.HISTOGRAM_BINS
+    assert heights.sum() == len(df)
+    assert "50 bins" in note
+
+
+def test_histnorm_cumulative_and_nbins_are_honoured(df):
+    fig = px.histogram(df, x="v", histnorm="percent", cumulative=True, nbins=10)
+
+    figure_sampling.downsample_figure(fig)
+
+    heights = _bars(fig)
+    assert len(heights) == 10
+    assert np.all(np.diff(heights) >= 0)
+    assert heights[-1] == pytest.approx(100)
+
+
+def test_density_integrates_to_one(df):
+    fig = px.histogram(df, x="v", histnorm="probability density")
+
+    figure_sampling.downsample_figure(fig)
+
+    assert (_bars(fig) * np.asarray(fig.data[0].width)).sum() == pytest.approx(1)
+
+
+def test_explicit_bins_are_left_to_plotly(df):
+    fig = px.histogram(df, x="v")
+    fig.update_traces(xbins=dict(start=-4, end=4, size=0.5))
+
+    assert figure_sampling.downsample_figure(fig) is None
+    assert fig.data[0].type == "histogram"
@@ -0,0 +1,90 @@
+"""
+Tests for llm_client against a local OpenAI-compatible mock server.
+
+Run from the backend directory:
+    python -m pytest tests/test_llm_client.py -q
+"""
+import asyncio
+
+import pytest
+from llama_index.core.llms import ChatMessage
+
+import llm_client
+import rate_limiter
+from tests.mock_openai_server import MockOpenAIServer
+
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    with MockOpenAIServer(reply="pooled reply") as server:
+        monkeypatch.setattr(llm_client, "LLM_API_BASE", server.base_url)
+        monkeypatch.setattr(llm_client, "LLM_MAX_RETRIES", 0)
+        monkeypatch.setattr(rate_limiter, "limiter", rate_limiter.RateLimiter(requests_per_minute=6000))
+        yield server
+    asyncio.run(llm_client.aclose())
+
+
+def test_llm_is_shared_between_sessions(mock_server):
+    first = llm_client.get_llm("key-a")
+    second = llm_client.get_llm("key-a")
+    other_key = llm_client.get_llm("key-b")
+
+    assert first is second
+    assert other_key is not first
+    # A new key still reuses the same connection pool
+    assert other_key._async_http_client is first._async_http_client
+    assert other_key._http_client is first._http_client
+
+
+def test_sequential_async_calls_reuse_one_connection(mock_server):
+    async def run():
+        llm = llm_client.get_llm("key")
+        replies = [await llm.achat([ChatMessage(role="user", content=f"question {i}")]) for i in range(5)]
+        await llm_client.aclose()
+        return replies
+
+    replies = asyncio.run(run())
+
+    assert [r.message.content for r in replies] == ["pooled reply"] * 5
+    assert len(mock_server.requests) == 5
+    assert len(mock_server.connections) == 1
+
+
+def test_sync_calls_reuse_one_connection(mock_server):
+    llm = llm_client.get_llm("key")
+    for _ in range(3):
+        assert llm.complete("hello").text == "pooled reply"
+    # A second session gets the same LLM and the same keep-alive connection
+    assert llm_client.get_llm("key").complete("again").text == "pooled reply"
+
+    assert len(mock_server.connections) == 1
+
+
+def test_concurrent_calls_stay_within_pool_limit(mock_server, monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_MAX_CONNECTIONS", 3)
+    monkeypatch.setattr(llm_client, "LLM_MAX_KEEPALIVE_CONNECTIONS", 3)
+
+    async def run():
+        llm = llm_client.get_llm("key")
+        replies = await asyncio.gather(*(llm.acomplete(f"q{i}") for i in range(12)))
+        await llm_client.aclose()
+        return replies
+
+    replies = asyncio.run(run())
+
+    assert all(r.text == "pooled reply" for r in replies)
+    assert len(mock_server.requests) == 12
+    assert len(mock_server.connections) <= 3
+
+
+def test_streaming_through_pool(mock_server):
+    async def run():
+        llm = llm_client.get_llm("key")
+        text = ""
+        async for chunk in await llm.astream_chat([ChatMessage(role="user", content="stream")]):
+            text = chunk.message.content
+        await llm_client.aclose()
+        return text
+
+    assert asyncio.run(run()) == "pooled reply"
+    assert mock_server.requests[0]["body"]["stream"] is True
@@ -0,0 +1,73 @@
+"""
+Tests for the Prometheus-style metrics registry and the /metrics endpoint.
+
+Run from the backend directory:
+    python -m pytest tests/test_metrics.py -q
+"""
+import asyncio
+
+from fastapi.testclient import TestClient
+from llama_index.core.tools import FunctionTool
+
+import metrics
+import server
+import tracing
+
+
+def test_text_format():
+    registry = metrics.Registry()
+    requests = registry.register(metrics.Counter("jobs_total", "Jobs run", ("queue",)))
+    latency = registry.register(metrics.Histogram("job_seconds", "Job latency", buckets=(0.1, 1)))
+    registry.register(metrics.Gauge("queue_depth", "Waiting jobs", collect=lambda: 3))
+
+    requests.inc(queue='a"b')
+    requests.inc(2, queue='a"b')
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(7)
+
+    assert registry.render().splitlines() == [
+        "# HELP jobs_total Jobs run",
+        "# TYPE jobs_total counter",
+        'jobs_total{queue="a\\"b"} 3',
+        "# HELP job_seconds Job latency",
+        "# TYPE job_seconds histogram",
+        'job_seconds_bucket{le="0.1"} 1',
+        'job_seconds_bucket{le="1"} 2',
+        'job_seconds_bucket{le="+Inf"} 3',
+        "job_seconds_sum 7.55",
+        "job_seconds_count 3",
+        "# HELP queue_depth Waiting jobs",
+        "# TYPE queue_depth gauge",
+        "queue_depth 3",
+    ]
+
+
+def test_tool_calls_are_counted_by_outcome():
+    def failing_chart(column: str) -> str:
+        """Chart a column."""
+        return f"Error: column {column} not found"
+
+    tool = tracing.traced_tools([FunctionTool.from_defaults(fn=failing_chart)])[0]
+    before = metrics.tool_calls.get(tool="failing_chart", outcome="error")
+
+    asyncio.run(tool.acall(column="Sales"))
+
+    assert metrics.tool_calls.get(tool="failing_chart", outcome="error") == before + 1
+    assert metrics.tool_seconds.get_count(tool="failing_chart") >= 1
+
+
+def test_metrics_endpoint(tmp_path, monkeypatch):
+    client = TestClient(server.app)
+    client.get("/history")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/history",status="200"}' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/history",le="+Inf"}' in body
+    for name in ("server_executor_queue_depth", "agent_executor_workers", "llm_limiter_in_flight",
+                 "llm_limiter_throttled_total", "cache_hits_total", "analyze_requests_total"):
+        assert f"# TYPE {name} " in body
@@ -0,0 +1,56 @@
+"""
+Tests for the offline scripted model used with LLM_PROVIDER=mock.
+
+Run from the backend directory:
+    python -m pytest tests/test_mock_llm.py -q
+"""
+import asyncio
+
+import pandas as pd
+from llama_index.core.agent import FunctionAgent
+from llama_index.core.tools import FunctionTool
+
+import facts_pack
+from mock_llm import ScriptedMockLLM, _dataset_columns
+
+
+def _frame():
+    return pd.DataFrame({
+        "Region": ["North", "South", "North", "East"],
+        "Customer": ["a", "b", "c", "d"],
+        "Sales": [10.0, 20.5, 7.25, 3.0],
+    })
+
+
+def test_columns_are_read_from_the_facts_pack():
+    prompt = "The user has uploaded data with:\n" + facts_pack.build_facts_pack(_frame())
+    assert _dataset_columns(prompt) == ("Region", "Sales")
+
+
+def test_agent_is_driven_through_its_tools():
+    calls = []
+
+    def data_analysis_tool(input: str) -> str:
+        """Answer a question about the data."""
+        calls.append(("data_analysis_tool", input))
+        return "Sales total 40.75"
+
+    def create_bar_chart(x_column: str, y_column: str, title: str = "Bar Chart") -> str:
+        """Create a bar chart."""
+        calls.append(("create_bar_chart", x_column, y_column))
+        return "/tmp/outputs/graphs/sales_by_region.png|CHART_DESC: Sales by Region (Bar Chart)"
+
+    agent = FunctionAgent(
+        tools=[FunctionTool.from_defaults(fn=data_analysis_tool),
+               FunctionTool.from_defaults(fn=create_bar_chart)],
+        llm=ScriptedMockLLM(),
+        system_prompt="Data:\n" + facts_pack.build_facts_pack(_frame()),
+    )
+
+    async def run():
+        return str(await agent.run(user_msg="chart sales by region"))
+
+    response = asyncio.run(run())
+
+    assert calls == [("data_analysis_tool", "Summarize Sales"), ("create_bar_chart", "Region", "Sales")]
+    assert "/tmp/outputs/graphs/sales_by_region.png" in response
@@ -0,0 +1,54 @@
+"""
+Tests for the plot sandbox: wall-clock timeouts stop only the stuck worker.
+
+Run from the backend directory:
+    python -m pytest tests/test_plot_sandbox.py -q
+"""
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import plot_sandbox
+
+
+@pytest.fixture
+def sandbox():
+    sandbox = plot_sandbox.PlotSandbox(workers=2, wall_seconds=3)
+    yield sandbox
+    sandbox.shutdown()
+
+
+def test_timeout_kills_only_the_stuck_snippet(sandbox):
+    df = pd.DataFrame({"x": [1.0, 2.0, 3.0]})
+    sandbox.run(df, "fig = px.bar(df, y='x')")  # Workers are up before timing starts
+    results = {}
+
+    def run(name, code):
+        try:
+            results[name] = sandbox.run(df, code)[0]
+        except plot_sandbox.PlotSandboxError as e:
+            results[name] = e
+
+    stuck = threading.Thread(target=run, args=("stuck", "while True:\n    pass"))
+    stuck.start()
+    time.sleep(1.5)
+    # Still running when the stuck worker is killed
+    run("concurrent", "import time\ntime.sleep(2.5)\nfig = px.bar(df, y='x')")
+    stuck.join()
+    run("after", "fig = px.bar(df, y='x')")
+
+    assert "timed out" in str(results["stuck"])
+    assert isinstance(results["concurrent"], str)
+    assert isinstance(results["after"], str)
+
+
+def test_shutdown_unlinks_published_datasets(sandbox):
+    df = pd.DataFrame({"x": [1.0, 2.0, 3.0]})
+    _, name, _, _ = sandbox.publish(df)
+
+    sandbox.shutdown()
+
+    with pytest.raises(FileNotFoundError):
+        plot_sandbox.shared_memory.SharedMemory(name=name)
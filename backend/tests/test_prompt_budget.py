@@ -0,0 +1,22 @@
+"""
+Tests for query-aware column ranking in prompt_budget.
+
+Run from the backend directory:
+    python -m pytest tests/test_prompt_budget.py -q
+"""
+import prompt_budget
+
+
+def test_short_names_do_not_match_inside_words():
+    ranked = prompt_budget.rank_columns(["Price", "Stock", "id", "age", "x"],
+                                        "average Price paid per region by max stage")
+
+    assert ranked == ["Price", "Stock", "id", "age", "x"]
+
+
+def test_full_names_match_as_whole_words():
+    ranked = prompt_budget.rank_columns(["region", "unit_price", "OrderDate", "id"],
+                                        "average unit prices by order date for each id")
+
+    assert ranked[:3] == ["unit_price", "OrderDate", "id"]
+    assert prompt_budget.rank_columns(["a", "b"], None) == ["a", "b"]
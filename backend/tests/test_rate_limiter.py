@@ -0,0 +1,162 @@
+"""
+Tests for rate_limiter: budgets, AIMD backoff on 429s and fairness across sessions.
+
+Run from the backend directory:
+    python -m pytest tests/test_rate_limiter.py -q
+"""
+import asyncio
+import time
+
+import pytest
+
+import llm_client
+import rate_limiter
+from rate_limiter import RateLimiter
+from tests.mock_openai_server import MockOpenAIServer
+
+
+@pytest.fixture
+def shared_limiter(monkeypatch):
+    limiter = RateLimiter(requests_per_minute=6000, max_concurrency=4)
+    monkeypatch.setattr(rate_limiter, "limiter", limiter)
+    return limiter
+
+
+@pytest.fixture
+def mock_server(monkeypatch, shared_limiter):
+    with MockOpenAIServer(reply="limited reply") as server:
+        monkeypatch.setattr(llm_client, "LLM_API_BASE", server.base_url)
+        monkeypatch.setattr(llm_client, "LLM_MAX_RETRIES", 0)
+        yield server
+    asyncio.run(llm_client.aclose())
+
+
+def test_request_budget_delays_calls_once_exhausted():
+    limiter = RateLimiter(requests_per_minute=600, max_concurrency=10)  # refills 10/s
+    limiter._requests.level = 0
+
+    start = time.monotonic()
+    limiter.acquire()
+    limiter.release(200)
+
+    assert 0.05 < time.monotonic() - start < 1.0
+
+
+def test_token_budget_is_charged_per_request():
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=6000, max_concurrency=10)  # 100 tokens/s
+    limiter.acquire(tokens=5900)
+    limiter.release(200)
+
+    start = time.monotonic()
+    limiter.acquire(tokens=150)
+    limiter.release(200)
+
+    assert time.monotonic() - start > 0.2
+
+
+def test_429_honors_retry_after_and_halves_concurrency(mock_server, shared_limiter):
+    mock_server.fail_next(1, status=429, headers={"Retry-After": "0.3"})
+
+    async def run():
+        llm = llm_client.get_llm("key")
+        start = time.monotonic()
+        reply = await llm.acomplete("hello")
+        elapsed = time.monotonic() - start
+        await llm_client.aclose()
+        return reply, elapsed
+
+    reply, elapsed = asyncio.run(run())
+
+    assert reply.text == "limited reply"
+    assert len(mock_server.requests) == 2
+    assert elapsed >= 0.3
+    stats = shared_limiter.get_stats()
+    assert stats["throttled"] == 1
+    assert stats["concurrency_limit"] == 2
+    assert stats["in_flight"] == 0
+
+
+def test_throttled_calls_are_retried_only_by_the_limiter(mock_server, shared_limiter, monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_MAX_RETRIES", 2)
+    monkeypatch.setattr(rate_limiter, "LLM_RATE_LIMIT_RETRIES", 1)
+    mock_server.fail_next(10, status=429, headers={"Retry-After": "0"})
+
+    async def run():
+        try:
+            await llm_client.get_llm("key").acomplete("hello")
+        finally:
+            await llm_client.aclose()
+
+    with pytest.raises(Exception):
+        asyncio.run(run())
+
+    assert len(mock_server.requests) == 2
+    assert shared_limiter.get_stats()["in_flight"] == 0
+
+
+def test_server_errors_are_retried(mock_server, shared_limiter, monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_MAX_RETRIES", 2)
+    mock_server.fail_next(2, status=503, headers={"Retry-After": "0"})
+
+    async def run():
+        reply = await llm_client.get_llm("key").acomplete("hello")
+        await llm_client.aclose()
+        return reply
+
+    assert asyncio.run(run()).text == "limited reply"
+    assert len(mock_server.requests) == 3
+    assert shared_limiter.get_stats()["throttled"] == 0
+
+
+def test_success_grows_concurrency_back():
+    limiter = RateLimiter(requests_per_minute=0, max_concurrency=4)
+    limiter.acquire()
+    limiter.release(429, retry_after=0)
+    assert limiter.get_stats()["concurrency_limit"] == 2
+
+    for _ in range(10):
+        limiter.acquire()
+        limiter.release(200)
+    assert limiter.get_stats()["concurrency_limit"] == 4
+
+
+def test_waiters_are_served_round_robin_across_sessions():
+    limiter = RateLimiter(requests_per_minute=0, max_concurrency=1)
+    order = []
+
+    async def call(session, name):
+        await limiter.aacquire(session=session)
+        order.append(name)
+        await asyncio.sleep(0.01)
+        limiter.release(200)
+
+    async def run():
+        await limiter.aacquire(session="busy")  # hold the only slot
+        tasks = [asyncio.create_task(call("busy", f"busy-{i}")) for i in range(3)]
+        tasks.append(asyncio.create_task(call("other", "other-0")))
+        await asyncio.sleep(0.01)
+        limiter.release(200)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    assert order == ["busy-0", "other-0", "busy-1", "busy-2"]
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    limiter = RateLimiter(requests_per_minute=0, max_concurrency=1)
+
+    async def run():
+        await limiter.aacquire()
+        waiting = asyncio.create_task(limiter.aacquire())
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        limiter.release(200)
+        await asyncio.wait_for(limiter.aacquire(), timeout=1)
+        limiter.release(200)
+
+    asyncio.run(run())
+    assert limiter.get_stats()["in_flight"] == 0
+    assert limiter.get_stats()["queued"] == 0
@@ -0,0 +1,72 @@
+"""
+Tests for PDF and PPT report generation.
+
+Run from the backend directory:
+    python -m pytest tests/test_report_generator.py -q
+"""
+from pptx import Presentation
+
+import report_generator
+import report_schema
+
+
+def _slide_texts(path):
+    return [
+        [paragraph.text for shape in slide.shapes if shape.has_text_frame
+         for paragraph in shape.text_frame.paragraphs]
+        for slide in Presentation(path).slides
+    ]
+
+
+def test_payload_bullets_are_marked_once():
+    payload = report_schema.ReportPayload(
+        title="Sales Review",
+        executive_summary="Sales grew in every region.",
+        sections=[{"title": "Regions", "bullets": ["North led growth", "South recovered"]}],
+        key_findings=["Margins held"],
+    )
+
+    path = report_generator.create_ppt_report(payload)
+
+    paragraphs = [text for texts in _slide_texts(path) for text in texts]
+    assert "• North led growth" in paragraphs
+    assert "• South recovered" in paragraphs
+    assert "• Margins held" in paragraphs
+    assert not any(text.startswith("• •") for text in paragraphs)
+
+
+def test_pdf_accepts_text_outside_latin1():
+    payload = report_schema.ReportPayload(
+        title="Q3 Review \u2013 EMEA",
+        subtitle="Sales \u201cdeep dive\u201d",
+        executive_summary="Revenue rose \u2013 again.",
+        kpis=[{"label": "Net \u2013 margin", "value": "12%", "change": "+1 pt \u2191"}],
+        sections=[{"title": "Regions \u2014 overview", "paragraphs": ["\u6771\u4eac led growth."],
+                   "bullets": ["North \u2013 up"]}],
+    )
+
+    path = report_generator.create_pdf_report(payload)
+
+    with open(path, "rb") as f:
+        assert f.read(5) == b"%PDF-"
+    assert report_generator.pdf_text("Q3 \u2013 \u201cEMEA\u201d \u6771") == 'Q3 - "EMEA" ?'
+
+
+def test_long_payload_text_continues_on_new_slides():
+    sentence = "Revenue in the northern region grew steadily across every product line this quarter. "
+    summary = (sentence * 12).strip()
+    bullets = [f"Finding {i}: " + sentence * 2 for i in range(10)]
+    payload = report_schema.ReportPayload(
+        title="Sales Review",
+        executive_summary=summary,
+        sections=[{"title": "Regions", "bullets": bullets}],
+    )
+
+    slides = _slide_texts(report_generator.create_ppt_report(payload))
+
+    titles = [texts[0] for texts in slides if texts]
+    assert "Executive Summary (cont.)" in titles and "Regions (cont.)" in titles
+    body = " ".join(text for texts in slides for text in texts)
+    assert body.count(sentence.strip()) == 12 + 10 * 2
+    for bullet in bullets:
+        assert f"• {bullet.strip()}" in [text.strip() for texts in slides for text in texts]
@@ -0,0 +1,190 @@
+"""
+Tests for the shared state backends and session handling across workers.
+
+Two SessionManagers or ArtifactStores on one SQLite file stand in for two
+worker processes.
+
+Run from the backend directory:
+    python -m pytest tests/test_sessions.py -q
+"""
+import asyncio
+import os
+import threading
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import artifact_store
+import llm_client
+import server
+import sessions
+import state_store
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return state_store.SQLiteBackend(str(tmp_path / "state.db"))
+    return state_store.MemoryBackend()
+
+
+def test_backend_round_trip_and_expiry(backend):
+    backend.set("session:a", {"dataset_id": "1", "history": [{"query": "q"}]})
+    backend.set("session:old", {"dataset_id": "2"}, ttl=-1)
+
+    assert backend.get("session:a") == {"dataset_id": "1", "history": [{"query": "q"}]}
+    assert backend.get("session:old") is None
+    backend.delete("session:a")
+    assert backend.get("session:a") is None
+
+
+def test_update_is_atomic(backend):
+    backend.set("counter", {"n": 0})
+
+    def bump(current):
+        return {"n": current["n"] + 1}
+
+    threads = [threading.Thread(target=lambda: [backend.update("counter", bump) for _ in range(20)])
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert backend.get("counter") == {"n": 80}
+    assert backend.update("missing", lambda current: {"was": current}) == {"was": None}
+
+
+def test_sqlite_is_shared_between_connections(tmp_path):
+    first = state_store.SQLiteBackend(str(tmp_path / "state.db"))
+    second = state_store.SQLiteBackend(str(tmp_path / "state.db"))
+
+    first.set("conversation:a", {"history": []})
+
+    assert second.shared
+    assert second.get("conversation:a") == {"history": []}
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        state_store.create_backend("memcached")
+
+
+def test_incomplete_backend_cannot_be_created():
+    class ReadOnlyBackend(state_store.StateBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        ReadOnlyBackend()
+
+
+def test_sessions_move_between_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_PROVIDER", "mock")
+    shared = state_store.SQLiteBackend(str(tmp_path / "state.db"))
+    worker_a = sessions.SessionManager(shared, upload_dir=str(tmp_path / "uploads"))
+    worker_b = sessions.SessionManager(state_store.SQLiteBackend(shared.path), upload_dir=str(tmp_path / "uploads"))
+    csv_path = tmp_path / "sales.csv"
+    pd.DataFrame({"Sales": [1.0, 2.0, 3.0]}).to_csv(csv_path, index=False)
+
+    agent_a = worker_a.start("s1", pd.read_csv(csv_path), str(csv_path))
+    answer = asyncio.run(agent_a.analyze("how many rows"))
+    worker_a.save(agent_a)
+
+    # Worker B has never seen s1: it rebuilds the agent from the stored dataset and history
+    agent_b = worker_b.get("s1")
+    assert agent_b is not agent_a and agent_b.session_id == "s1"
+    assert agent_b.df.equals(agent_a.df)
+    assert agent_b.conversation.get_cached_response("how many rows")["response"] == answer
+    assert worker_b.get("s1") is agent_b  # warm on the second request
+
+    # A new upload on worker A replaces the dataset worker B holds
+    pd.DataFrame({"Sales": [5.0]}).to_csv(csv_path, index=False)
+    worker_a.start("s1", pd.read_csv(csv_path), str(csv_path))
+    assert len(worker_b.get("s1").df) == 1
+    assert worker_b.get("unknown") is None
+
+
+def test_concurrent_turns_are_all_kept(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_PROVIDER", "mock")
+    shared = state_store.SQLiteBackend(str(tmp_path / "state.db"))
+    worker_a = sessions.SessionManager(shared, upload_dir=str(tmp_path / "uploads"))
+    worker_b = sessions.SessionManager(state_store.SQLiteBackend(shared.path), upload_dir=str(tmp_path / "uploads"))
+    csv_path = tmp_path / "sales.csv"
+    pd.DataFrame({"Sales": [1.0, 2.0, 3.0]}).to_csv(csv_path, index=False)
+    worker_a.start("s1", pd.read_csv(csv_path), str(csv_path))
+
+    # Both workers load the session before either saves
+    agent_a, agent_b = worker_a.get("s1"), worker_b.get("s1")
+    agent_a.conversation.add_to_history("first", "one", "data_analysis")
+    agent_b.conversation.add_to_history("second", "two", "data_analysis")
+    worker_a.get("s1")  # a refresh keeps the unsaved turn
+    worker_b.save(agent_b)
+    worker_a.save(agent_a)
+
+    queries = [turn["query"] for turn in worker_b.get("s1").get_conversation_history()]
+    assert queries == ["second", "first"]
+    assert agent_a.conversation.get_cached_response("second")["response"] == "two"
+
+    agent_a.clear_history()
+    worker_a.save(agent_a)
+    assert worker_b.get("s1").get_conversation_history() == []
+
+
+def test_requests_for_a_session_run_one_at_a_time():
+    manager = sessions.SessionManager(state_store.MemoryBackend())
+    running = []
+
+    async def request(name):
+        async with manager.lock("s1"):
+            running.append(name)
+            await asyncio.sleep(0.01)
+            assert running == [name]
+            running.remove(name)
+
+    async def main():
+        assert manager.lock("s1") is manager.lock("s1")
+        assert manager.lock("s1") is not manager.lock("s2")
+        await asyncio.gather(*(request(i) for i in range(3)))
+
+    asyncio.run(main())
+
+
+def test_server_keeps_sessions_apart(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_PROVIDER", "mock")
+    monkeypatch.setattr(server, "session_manager", sessions.SessionManager(
+        state_store.MemoryBackend(), upload_dir=str(tmp_path / "uploads")))
+    client = TestClient(server.app)
+
+    for session, rows in (("alice", 3), ("bob", 5)):
+        csv = "Sales\n" + "\n".join(str(i) for i in range(rows))
+        response = client.post("/analyze", data={"prompt": "how many rows"}, headers={"X-Session-Id": session},
+                               files={"file": ("data.csv", csv.encode(), "text/csv")})
+        assert response.headers["X-Session-Id"] == session
+        assert str(rows) in response.json()["response"]
+
+    client.cookies.set("session_id", "alice")
+    assert client.get("/history").json()["stats"]["history_count"] == 1
+    client.cookies.clear()
+    assert client.get("/history").json()["stats"]["history_count"] == 0  # default session is empty
+    assert client.get("/history", headers={"X-Session-Id": "../etc"}).status_code == 400
+    assert os.path.exists(tmp_path / "uploads" / "bob" / "data.csv")
+
+
+def test_artifact_index_is_shared(tmp_path):
+    shared = state_store.SQLiteBackend(str(tmp_path / "state.db"))
+    store_a = artifact_store.ArtifactStore(str(tmp_path / "outputs"), shared=shared)
+    store_b = artifact_store.ArtifactStore(str(tmp_path / "outputs"), shared=state_store.SQLiteBackend(shared.path))
+    path = os.path.join(store_a.output_dir("dashboards", session="s1"), "dashboard_1.html")
+    with open(path, "w") as f:
+        f.write("<html></html>")
+    store_a.register(path, "dashboards")
+    store_a.attach("dashboard_1.html", path + ".gz")
+
+    assert store_b.resolve("dashboard_1.html") == path
+    assert store_b.lookup("dashboard_1.html.gz")["name"] == "dashboard_1.html"
+
+    store_a.max_age_seconds = -1
+    store_a.collect()
+    assert shared.get("artifact:dashboard_1.html") is None
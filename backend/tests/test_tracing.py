@@ -0,0 +1,92 @@
+"""
+Tests for the tracing spans around analyze, LLM calls, tools and file writes.
+
+Run from the backend directory:
+    python -m pytest tests/test_tracing.py -q
+"""
+import asyncio
+import json
+
+import pandas as pd
+import pytest
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+import llm_client
+import tracing
+from analysis_agent import AnalysisAgent
+
+
+@pytest.fixture
+def exporter():
+    exporter = InMemorySpanExporter()
+    tracing.configure([exporter])
+    yield exporter
+    tracing.shutdown()
+
+
+def _finished(exporter):
+    tracing.flush()
+    return {span.name: span for span in exporter.get_finished_spans()}
+
+
+def test_analyze_trace_covers_agent_llm_tools_and_files(exporter, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(llm_client, "LLM_PROVIDER", "mock")
+    agent = AnalysisAgent(pd.DataFrame({
+        "Region": ["North", "South", "North", "East"],
+        "Sales": [10.0, 20.5, 7.25, 3.0],
+    }))
+
+    asyncio.run(agent.analyze("chart sales by region", agent_type="data_analysis"))
+    spans = _finished(exporter)
+
+    root = spans["analyze"]
+    assert root.parent is None
+    assert root.attributes["agent.type"] == "data_analysis"
+    assert spans["agent data_analysis"].parent.span_id == root.context.span_id
+    # Every span belongs to the one analyze trace
+    assert {span.context.trace_id for span in spans.values()} == {root.context.trace_id}
+
+    chart_tool = spans["tool create_bar_chart"]
+    assert chart_tool.attributes["tool.input_chars"] > 0
+    assert chart_tool.attributes["tool.is_error"] is False
+    spec_write = spans["write chart spec"]
+    assert spec_write.parent.span_id == chart_tool.context.span_id
+    assert spec_write.attributes["file.size_bytes"] > 0
+
+    assert spans["llm chat"].attributes["llm.prompt_chars"] > 0
+    # The pandas query engine completes inside the data analysis tool
+    assert spans["llm complete"].parent.span_id == spans["tool data_analysis_tool"].context.span_id
+
+
+def test_fast_path_answer_is_traced(exporter, monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_PROVIDER", "mock")
+    agent = AnalysisAgent(pd.DataFrame({"Sales": [1.0, 2.0, 3.0]}))
+
+    asyncio.run(agent.analyze("how many rows"))
+
+    assert _finished(exporter)["analyze"].attributes["analyze.path"] == "fast_path"
+
+
+def test_json_exporter_writes_one_line_per_span(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.configure([tracing.JsonFileSpanExporter(str(path))])
+    try:
+        with tracing.span("outer", **{"query.chars": 5}):
+            with tracing.file_write(str(tmp_path / "out.txt"), "txt"):
+                (tmp_path / "out.txt").write_text("hello")
+    finally:
+        tracing.shutdown()
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    by_name = {record["name"]: record for record in records}
+    assert by_name["write txt"]["parent_span_id"] == by_name["outer"]["span_id"]
+    assert by_name["write txt"]["attributes"]["file.size_bytes"] == 5
+    assert by_name["outer"]["attributes"]["query.chars"] == 5
+    assert by_name["outer"]["duration_ms"] >= 0
+
+
+def test_spans_are_noops_when_tracing_is_off():
+    with tracing.span("ignored") as current:
+        current.set_attribute("key", "value")
+    assert not tracing.current_span().is_recording()
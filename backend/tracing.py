@@ -0,0 +1,379 @@
+"""
+Tracing - Per-request spans across the orchestrator, LLM calls, tools and file writes
+
+One trace per analyze call, with child spans for the specialized agent run,
+every LLM call, every tool call and every output file written (chart
+renders, PDF, PPT, dashboard HTML). Spans carry durations plus sizes:
+prompt/response characters and token counts, tool input/output sizes and
+file sizes in bytes.
+
+TRACE_EXPORTER picks where finished spans go, comma separated:
+- otlp: a local OpenTelemetry collector over OTLP/HTTP
+  (endpoint from OTEL_EXPORTER_OTLP_ENDPOINT, default http://localhost:4318)
+- json: one JSON object per span, appended to TRACE_JSON_PATH
+Unset (the default), or without the opentelemetry packages installed,
+no spans are recorded. The same hooks always feed the latency and size
+metrics in the metrics module.
+"""
+import os
+import json
+import time
+import asyncio
+import threading
+import functools
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.instrumentation.event_handlers import BaseEventHandler
+from llama_index.core.instrumentation.events.llm import (
+    LLMChatEndEvent,
+    LLMChatStartEvent,
+    LLMCompletionEndEvent,
+    LLMCompletionStartEvent,
+)
+from llama_index.core.tools.types import AsyncBaseTool, BaseTool, ToolMetadata, ToolOutput, adapt_to_async_tool
+
+import app_logging
+import metrics
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExportResult
+except ImportError:  # tracing is optional
+    trace = None
+
+logger = app_logging.get_logger(__name__)
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "").strip().lower()
+TRACE_JSON_PATH = os.getenv("TRACE_JSON_PATH", os.path.join(os.getcwd(), "outputs", "traces.jsonl"))
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "data-analysis-agent")
+MAX_OPEN_LLM_CALLS = 256  # LLM calls that fail never send an end event
+
+_provider = None
+_tracer = None
+_configure_lock = threading.Lock()
+
+
+class _NoopSpan:
+    """Stands in for a span when tracing is off."""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def is_recording(self) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _attributes(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop None values and stringify anything OpenTelemetry cannot store."""
+    return {key: value if isinstance(value, (str, bool, int, float)) else str(value)
+            for key, value in attributes.items() if value is not None}
+
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+class JsonFileSpanExporter:
+    """Appends finished spans to a JSON-lines file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence) -> "SpanExportResult":
+        lines = []
+        for span in spans:
+            context = span.get_span_context()
+            lines.append(json.dumps({
+                "name": span.name,
+                "trace_id": f"{context.trace_id:032x}",
+                "span_id": f"{context.span_id:016x}",
+                "parent_span_id": f"{span.parent.span_id:016x}" if span.parent else None,
+                "start": datetime.fromtimestamp(span.start_time / 1e9, timezone.utc).isoformat(),
+                "duration_ms": round((span.end_time - span.start_time) / 1e6, 3),
+                "status": span.status.status_code.name,
+                "attributes": dict(span.attributes or {}),
+            }, default=str))
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            logger.warning("Could not write traces to %s: %s", self.path, e)
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+    def shutdown(self) -> None:
+        pass
+
+
+def _exporters_from_config() -> List:
+    exporters = []
+    for name in filter(None, (part.strip() for part in TRACE_EXPORTER.split(","))):
+        if name == "json":
+            exporters.append(JsonFileSpanExporter(TRACE_JSON_PATH))
+        elif name == "otlp":
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            exporters.append(OTLPSpanExporter())
+        else:
+            logger.warning("Unknown TRACE_EXPORTER %r ignored (use otlp or json)", name)
+    return exporters
+
+
+def configure(exporters: Optional[List] = None) -> bool:
+    """
+    Start tracing with the given span exporters (default: from TRACE_EXPORTER).
+
+    Replaces any earlier configuration, flushing its spans first.
+
+    Returns:
+        bool: True if tracing is now on.
+    """
+    global _provider, _tracer
+    if trace is None:
+        if TRACE_EXPORTER:
+            logger.warning("TRACE_EXPORTER is set but opentelemetry-sdk is not installed; tracing is off")
+        return False
+
+    exporters = _exporters_from_config() if exporters is None else exporters
+    with _configure_lock:
+        shutdown()
+        if not exporters:
+            return False
+        provider = TracerProvider(resource=Resource.create({"service.name": TRACE_SERVICE_NAME}))
+        for exporter in exporters:
+            provider.add_span_processor(BatchSpanProcessor(exporter))
+        _provider = provider
+        _tracer = provider.get_tracer(__name__)
+    logger.info("Tracing enabled", extra={"exporters": [type(e).__name__ for e in exporters]})
+    return True
+
+
+def is_enabled() -> bool:
+    return _tracer is not None
+
+
+def flush() -> None:
+    """Export every finished span now."""
+    if _provider is not None:
+        _provider.force_flush()
+
+
+def shutdown() -> None:
+    """Flush and stop the exporters; later spans are no-ops until configure() is called again."""
+    global _provider, _tracer
+    provider, _provider, _tracer = _provider, None, None
+    if provider is not None:
+        provider.shutdown()
+
+
+# ============================================================================
+# SPANS
+# ============================================================================
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Run the block in a child span of the current one.
+
+    Attribute names may use dots by passing a dict: span("x", **{"file.kind": "pdf"}).
+    Exceptions are recorded on the span and re-raised.
+    """
+    if _tracer is None:
+        yield _NOOP_SPAN
+        return
+    with _tracer.start_as_current_span(name, attributes=_attributes(attributes)) as current:
+        yield current
+
+
+def current_span():
+    """The active span, to add attributes from deeper in the call."""
+    if _tracer is None:
+        return _NOOP_SPAN
+    return trace.get_current_span()
+
+
+def traced(name: str, **attributes):
+    """Decorator running each call of a sync or async function in a span."""
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, **attributes):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def file_write(path: str, kind: str, **attributes):
+    """Span around writing an output file; records its write time and size once written."""
+    started = time.perf_counter()
+    with span(f"write {kind}", **{"file.kind": kind, "file.path": path}, **attributes) as current:
+        yield current
+        size = os.path.getsize(path) if os.path.exists(path) else None
+        if size is not None:
+            current.set_attribute("file.size_bytes", size)
+    metrics.observe_file_write(kind, time.perf_counter() - started, size)
+
+
+# ============================================================================
+# TOOLS
+# ============================================================================
+class TracedTool(AsyncBaseTool):
+    """Runs each call of the wrapped tool in a span with its input and output sizes, and times it."""
+
+    def __init__(self, tool: BaseTool):
+        self._tool = adapt_to_async_tool(tool)
+
+    @property
+    def metadata(self) -> ToolMetadata:
+        return self._tool.metadata
+
+    @contextmanager
+    def _measure(self, kwargs: Dict):
+        name = self.metadata.get_name()
+        started = time.perf_counter()
+        outcome = {"error": True}  # stays True if the tool raises
+        attributes = {"tool.name": name}
+        if _tracer is not None:
+            attributes["tool.input_chars"] = len(json.dumps(kwargs, default=str))
+        try:
+            with span(f"tool {name}", **attributes) as current:
+                yield current, outcome
+        finally:
+            metrics.observe_tool(name, time.perf_counter() - started, outcome["error"])
+
+    @staticmethod
+    def _record(current, outcome: Dict, output: ToolOutput) -> ToolOutput:
+        content = str(output.content)
+        # Tools report failures to the agent as "Error ..." strings
+        outcome["error"] = bool(output.is_error) or content.startswith("Error")
+        current.set_attributes({"tool.output_chars": len(content), "tool.is_error": outcome["error"]})
+        return output
+
+    def call(self, *args: Any, **kwargs: Any) -> ToolOutput:
+        with self._measure(kwargs) as (current, outcome):
+            return self._record(current, outcome, self._tool.call(*args, **kwargs))
+
+    async def acall(self, *args: Any, **kwargs: Any) -> ToolOutput:
+        with self._measure(kwargs) as (current, outcome):
+            return self._record(current, outcome, await self._tool.acall(*args, **kwargs))
+
+
+def traced_tools(tools: List[BaseTool]) -> List[BaseTool]:
+    """Wrap an agent's tools for tracing and tool metrics."""
+    return [TracedTool(tool) for tool in tools]
+
+
+# ============================================================================
+# LLM CALLS
+# ============================================================================
+_llm_calls: "OrderedDict[str, List]" = OrderedDict()  # llama-index span id -> open calls
+_llm_calls_lock = threading.Lock()
+
+
+def _message_chars(messages) -> int:
+    return sum(len(message.content or "") for message in messages or [])
+
+
+def _start_llm_call(event) -> None:
+    is_chat = isinstance(event, LLMChatStartEvent)
+    kind = "chat" if is_chat else "complete"
+    llm_span = None
+    if _tracer is not None:
+        model = event.model_dict or {}
+        attributes = {
+            "llm.class": model.get("class_name"),
+            "llm.model": model.get("model"),
+        }
+        if is_chat:
+            attributes.update({"llm.messages": len(event.messages),
+                               "llm.prompt_chars": _message_chars(event.messages)})
+        else:
+            attributes["llm.prompt_chars"] = len(event.prompt or "")
+        # Parented on the caller's current span (the tool or agent run making the call)
+        llm_span = _tracer.start_span(f"llm {kind}", attributes=_attributes(attributes))
+
+    with _llm_calls_lock:
+        _llm_calls.setdefault(str(event.span_id), []).append((kind, time.perf_counter(), llm_span))
+        while len(_llm_calls) > MAX_OPEN_LLM_CALLS:
+            _, stale = _llm_calls.popitem(last=False)
+            for stale_kind, started, abandoned in stale:
+                metrics.observe_llm(stale_kind, time.perf_counter() - started, ok=False)
+                if abandoned is not None:
+                    abandoned.set_attribute("llm.abandoned", True)
+                    abandoned.end()
+
+
+def _end_llm_call(event) -> None:
+    with _llm_calls_lock:
+        open_calls = _llm_calls.get(str(event.span_id))
+        if not open_calls:
+            return
+        kind, started, llm_span = open_calls.pop()
+        if not open_calls:
+            del _llm_calls[str(event.span_id)]
+    metrics.observe_llm(kind, time.perf_counter() - started)
+
+    response = event.response
+    if llm_span is None:
+        return
+    if response is not None:
+        if isinstance(event, LLMChatEndEvent):
+            message = response.message
+            text = message.content or ""
+            tool_calls = sum(1 for block in message.blocks if getattr(block, "block_type", "") == "tool_call") \
+                or len(message.additional_kwargs.get("tool_calls") or [])
+            llm_span.set_attribute("llm.tool_calls", tool_calls)
+        else:
+            text = response.text or ""
+        llm_span.set_attribute("llm.response_chars", len(text))
+        usage = response.additional_kwargs or {}
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            if isinstance(usage.get(key), int):
+                llm_span.set_attribute(f"llm.{key}", usage[key])
+    llm_span.end()
+
+
+class _LLMEventHandler(BaseEventHandler):
+    """Turns llama-index LLM start/end events into spans and latency metrics."""
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LLMEventHandler"
+
+    def handle(self, event, **kwargs) -> None:
+        if isinstance(event, (LLMChatStartEvent, LLMCompletionStartEvent)):
+            _start_llm_call(event)
+        elif isinstance(event, (LLMChatEndEvent, LLMCompletionEndEvent)):
+            _end_llm_call(event)
+
+
+get_dispatcher().add_event_handler(_LLMEventHandler())
+
+if TRACE_EXPORTER:
+    configure()
@@ -240,7 +240,7 @@ export const AgentPage: React.FC<AgentPageProps> = ({
                                                 <div className="image-card-header">
                                                     <span className="image-title">📊 {img.title}</span>
                                                 </div>
-                                                <img src={img.url} alt={img.title} className="analysis-image" />
+                                                <img src={img.preview_url || img.url} alt={img.title} className="analysis-image" />
                                                 <div className="image-description">{img.description}</div>
                                             </div>
                                         ))}
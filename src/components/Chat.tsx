@@ -320,7 +320,7 @@ export const Chat: React.FC = () => {
                           <span className="image-title">📊 {img.title}</span>
                         </div>
                         <img
-                          src={img.url}
+                          src={img.preview_url || img.url}
                           alt={img.title}
                           className="analysis-image"
                         />
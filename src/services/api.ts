@@ -2,6 +2,7 @@ const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
 
 export interface ImageData {
   url: string;
+  preview_url?: string;  // Small WebP rendition for inline display
   title: string;
   description: string;
 }